@@ -0,0 +1,233 @@
+"""短链编码分配器。
+
+默认的 ``feistel`` 分配器从数据库序列中按块预留整数区间，逐个经过带密钥
+的 Feistel 置换映射到 ``62^SHORT_CODE_LEN`` 的编码空间后编码为 base62：
+置换是一一映射，序列值不重复则编码不重复，看起来仍是随机的。唯一可能的
+冲突来自用户自定义的编码，由 Bloom 过滤器判定，绝大多数分配不需要查询
+数据库。``CODE_ALLOCATOR=random`` 保留原来的随机探测方式。
+
+``CODE_ALLOCATOR_KEY`` 与 ``SHORT_CODE_LEN`` 决定置换本身，所有 worker 必须
+一致，部署后也不应再修改，否则新旧编码可能互相冲突。
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import secrets
+import string
+import threading
+from typing import Protocol
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .cache import short_codes
+from .models import CodeSequence, SessionLocal, ShortLink
+
+CODE_ALLOCATOR = os.getenv("CODE_ALLOCATOR", "feistel").strip().lower()
+CODE_ALLOCATOR_KEY = os.getenv("CODE_ALLOCATOR_KEY", "yetla-code-allocator").encode("utf-8")
+CODE_BLOCK_SIZE = int(os.getenv("CODE_BLOCK_SIZE", "1000"))
+SHORT_CODE_LEN = int(os.getenv("SHORT_CODE_LEN", "6"))
+CODE_ALPHABET = string.digits + string.ascii_uppercase + string.ascii_lowercase
+MAX_CODE_ATTEMPTS = 10
+FEISTEL_ROUNDS = 4
+
+
+class CodeAllocationError(RuntimeError):
+    """无法分配到未被占用的编码。"""
+
+
+class CodeAllocator(Protocol):
+    def allocate(self, db: Session) -> str: ...
+
+    def allocate_many(self, db: Session, count: int) -> list[str]: ...
+
+    def stats(self) -> dict[str, int | str]: ...
+
+
+def encode_base62(value: int, length: int) -> str:
+    digits = []
+    for _ in range(length):
+        value, remainder = divmod(value, len(CODE_ALPHABET))
+        digits.append(CODE_ALPHABET[remainder])
+    if value:
+        raise ValueError("value does not fit in the requested length")
+    return "".join(reversed(digits))
+
+
+def _existing_codes(db: Session, codes: list[str]) -> set[str]:
+    if not codes:
+        return set()
+    return set(db.scalars(select(ShortLink.code).where(ShortLink.code.in_(codes))))
+
+
+class FeistelPermutation:
+    """``[0, domain)`` 上带密钥的伪随机置换。
+
+    在覆盖 ``domain`` 的最小偶数位宽上做平衡 Feistel 网络，结果超出范围时
+    继续置换（cycle walking），平均只需约 1.2 次。
+    """
+
+    def __init__(self, domain: int, key: bytes, rounds: int = FEISTEL_ROUNDS) -> None:
+        bits = max((domain - 1).bit_length(), 2)
+        self.domain = domain
+        self._half_bits = (bits + 1) // 2
+        self._mask = (1 << self._half_bits) - 1
+        self._round_keys = [
+            hashlib.blake2b(key, digest_size=16, person=b"yetla-feistel", salt=bytes([index]) * 16).digest()
+            for index in range(rounds)
+        ]
+
+    def _round(self, index: int, value: int) -> int:
+        digest = hashlib.blake2b(
+            value.to_bytes(8, "big"), digest_size=8, key=self._round_keys[index]
+        ).digest()
+        return int.from_bytes(digest, "big") & self._mask
+
+    def _encrypt(self, value: int) -> int:
+        left, right = value >> self._half_bits, value & self._mask
+        for index in range(len(self._round_keys)):
+            left, right = right, left ^ self._round(index, right)
+        return (left << self._half_bits) | right
+
+    def permute(self, value: int) -> int:
+        if not 0 <= value < self.domain:
+            raise ValueError("value outside the permutation domain")
+        value = self._encrypt(value)
+        while value >= self.domain:
+            value = self._encrypt(value)
+        return value
+
+
+class SequenceCodeAllocator:
+    """按块预留序列值并经 Feistel 置换生成编码。"""
+
+    name = "feistel"
+
+    def __init__(self, length: int, key: bytes, block_size: int) -> None:
+        self._length = length
+        self._sequence = f"short_code:{length}"
+        self._permutation = FeistelPermutation(len(CODE_ALPHABET) ** length, key)
+        self._block_size = max(block_size, 1)
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+        self.blocks = 0
+        self.allocated = 0
+        self.skipped = 0
+
+    def _reserve_block(self) -> None:
+        """在独立事务中推进序列，预留 ``[start, start + block_size)``。"""
+
+        size = self._block_size
+        for _ in range(MAX_CODE_ATTEMPTS):
+            try:
+                with SessionLocal.begin() as session:
+                    end = session.scalar(
+                        update(CodeSequence)
+                        .where(CodeSequence.name == self._sequence)
+                        .values(next_value=CodeSequence.next_value + size)
+                        .returning(CodeSequence.next_value)
+                    )
+                    if end is None:
+                        session.add(CodeSequence(name=self._sequence, next_value=size))
+                        end = size
+            except IntegrityError:
+                # 其他 worker 同时创建了该序列，重试即可拿到递增后的区间
+                continue
+            self._next, self._end = end - size, end
+            self.blocks += 1
+            return
+        raise CodeAllocationError("failed to reserve a code sequence block")
+
+    def _candidate(self) -> str:
+        with self._lock:
+            if self._next >= self._end:
+                self._reserve_block()
+            value = self._next
+            self._next += 1
+        if value >= self._permutation.domain:
+            raise CodeAllocationError("short code space exhausted")
+        return encode_base62(self._permutation.permute(value), self._length)
+
+    def allocate_many(self, db: Session, count: int) -> list[str]:
+        if count <= 0:
+            return []
+        if not short_codes.loaded:
+            short_codes.load()
+        codes: list[str] = []
+        for _ in range(MAX_CODE_ATTEMPTS):
+            candidates = [self._candidate() for _ in range(count - len(codes))]
+            # 只有 Bloom 判定“可能存在”的候选（自定义编码或假阳性）才查询数据库
+            uncertain = [code for code in candidates if short_codes.might_exist(code)]
+            taken = _existing_codes(db, uncertain)
+            for code in candidates:
+                if code in taken:
+                    self.skipped += 1
+                else:
+                    codes.append(code)
+            if len(codes) == count:
+                self.allocated += count
+                return codes
+        raise CodeAllocationError("no free short code found")
+
+    def allocate(self, db: Session) -> str:
+        return self.allocate_many(db, 1)[0]
+
+    def stats(self) -> dict[str, int | str]:
+        with self._lock:
+            remaining = self._end - self._next
+        return {
+            "allocator": self.name,
+            "blocks": self.blocks,
+            "block_remaining": remaining,
+            "allocated": self.allocated,
+            "skipped": self.skipped,
+        }
+
+
+class RandomCodeAllocator:
+    """随机生成编码并查询数据库确认未被占用。"""
+
+    name = "random"
+
+    def __init__(self, length: int) -> None:
+        self._length = length
+        self.allocated = 0
+        self.skipped = 0
+
+    def allocate_many(self, db: Session, count: int) -> list[str]:
+        codes: list[str] = []
+        for _ in range(MAX_CODE_ATTEMPTS):
+            missing = count - len(codes)
+            if missing <= 0:
+                break
+            candidates = {
+                "".join(secrets.choice(CODE_ALPHABET) for _ in range(self._length))
+                for _ in range(missing)
+            } - set(codes)
+            taken = _existing_codes(db, list(candidates))
+            self.skipped += len(taken)
+            codes.extend(candidates - taken)
+        if len(codes) < count:
+            raise CodeAllocationError("no free short code found")
+        self.allocated += count
+        return codes
+
+    def allocate(self, db: Session) -> str:
+        return self.allocate_many(db, 1)[0]
+
+    def stats(self) -> dict[str, int | str]:
+        return {"allocator": self.name, "allocated": self.allocated, "skipped": self.skipped}
+
+
+def create_allocator(name: str = CODE_ALLOCATOR) -> CodeAllocator:
+    if name == RandomCodeAllocator.name:
+        return RandomCodeAllocator(SHORT_CODE_LEN)
+    if name != SequenceCodeAllocator.name:
+        raise ValueError(f"unknown CODE_ALLOCATOR: {name}")
+    return SequenceCodeAllocator(SHORT_CODE_LEN, CODE_ALLOCATOR_KEY, CODE_BLOCK_SIZE)
+
+
+code_allocator = create_allocator()
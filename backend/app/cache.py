@@ -0,0 +1,503 @@
+"""公共重定向路径使用的进程内缓存。"""
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Generic, TypeVar
+from urllib.parse import quote
+
+from sqlalchemy import Row, Select, func, select
+
+from .models import SessionLocal, ShortLink, SubdomainRedirect
+
+SHORT_LINK_CACHE_SIZE = int(os.getenv("SHORT_LINK_CACHE_SIZE", "10000"))
+SHORT_LINK_CACHE_TTL = float(os.getenv("SHORT_LINK_CACHE_TTL", "300"))
+SHORT_CODE_BLOOM_ERROR_RATE = float(os.getenv("SHORT_CODE_BLOOM_ERROR_RATE", "0.01"))
+NEGATIVE_CACHE_SIZE = int(os.getenv("NEGATIVE_CACHE_SIZE", "10000"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+_BLOOM_MIN_CAPACITY = 1024
+
+_LOCATION_SAFE = ":/%#?=@[]!$&'()*+,;"
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+def cache_control_header(max_age: int | None, immutable: bool = False) -> str | None:
+    """按规则的缓存策略生成 ``Cache-Control`` 值。
+
+    未设置时不发送该头，``0`` 表示 ``no-store``（每次点击都回源计数），
+    其余为可被浏览器与 CDN 共享缓存的 ``public, max-age=N``。
+    """
+
+    if max_age is None:
+        return None
+    if max_age <= 0:
+        return "no-store"
+    value = f"public, max-age={max_age}"
+    if immutable:
+        value += ", immutable"
+    return value
+
+
+def build_redirect_headers(url: str, cache_control: str | None = None) -> list[tuple[bytes, bytes]]:
+    """生成与 ``RedirectResponse`` 一致的原始 ASGI 响应头。"""
+
+    location = quote(url, safe=_LOCATION_SAFE)
+    headers = [(b"content-length", b"0"), (b"location", location.encode("latin-1"))]
+    if cache_control:
+        headers.append((b"cache-control", cache_control.encode("latin-1")))
+    return headers
+
+
+@dataclass(frozen=True, slots=True)
+class SubdomainRoute:
+    """子域跳转规则的只读快照，避免在请求路径上加载 ORM 对象。"""
+
+    id: int
+    host: str
+    target_url: str
+    code: int
+    cache_control: str | None = None
+
+
+_ROUTE_COLUMNS = (
+    SubdomainRedirect.id,
+    SubdomainRedirect.host,
+    SubdomainRedirect.target_url,
+    SubdomainRedirect.code,
+    SubdomainRedirect.cache_max_age,
+    SubdomainRedirect.cache_immutable,
+)
+
+
+def select_routes() -> Select:
+    """读取子域规则快照所需列的查询。"""
+
+    return select(*_ROUTE_COLUMNS)
+
+
+def route_from_row(row: Row) -> SubdomainRoute:
+    return SubdomainRoute(
+        id=row.id,
+        host=row.host,
+        target_url=row.target_url,
+        code=row.code,
+        cache_control=cache_control_header(row.cache_max_age, row.cache_immutable),
+    )
+
+
+WILDCARD_PREFIX = "*."
+
+
+class HostSuffixTrie:
+    """按反转标签组织的通配规则前缀树。
+
+    ``*.docs.yet.la`` 存放在 ``la → yet → docs`` 节点上；查找时自顶级标签
+    逐级下降，记录最深的、且后面仍有剩余标签的通配节点，实现“最长后缀
+    优先”。耗时只与 Host 的标签数有关，与规则总数无关。
+    """
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self) -> None:
+        self._root: dict[str, dict] = {}
+        self._size = 0
+
+    def insert(self, suffix: str, route: SubdomainRoute) -> None:
+        node = self._root
+        for label in reversed(suffix.split(".")):
+            node = node.setdefault(label, {})
+        if None not in node:
+            self._size += 1
+        node[None] = route
+
+    def remove(self, suffix: str) -> None:
+        path = [self._root]
+        for label in reversed(suffix.split(".")):
+            node = path[-1].get(label)
+            if node is None:
+                return
+            path.append(node)
+        if path[-1].pop(None, None) is not None:
+            self._size -= 1
+
+    def match(self, host: str) -> SubdomainRoute | None:
+        labels = host.split(".")
+        node = self._root
+        best: SubdomainRoute | None = None
+        for remaining in range(len(labels) - 1, 0, -1):
+            node = node.get(labels[remaining])
+            if node is None:
+                break
+            route = node.get(None)
+            if route is not None:
+                best = route
+        return best
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class SubdomainRouteTable:
+    """Host → 跳转规则的内存路由表。
+
+    启动时整表加载，增删改子域规则提交后调用 :meth:`invalidate`，
+    下一次查询时重新加载。精确 Host 匹配是一次字典查找，``*.`` 开头的
+    通配规则由 :class:`HostSuffixTrie` 按最长后缀匹配，精确规则优先。
+    """
+
+    def __init__(self) -> None:
+        self._routes: dict[str, SubdomainRoute] = {}
+        self._wildcards = HostSuffixTrie()
+        self._loaded = False
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        """从数据库重新加载全部子域规则。"""
+
+        generation = self._generation
+        with SessionLocal() as session:
+            rows = session.execute(select_routes()).all()
+        routes: dict[str, SubdomainRoute] = {}
+        wildcards = HostSuffixTrie()
+        for row in rows:
+            route = route_from_row(row)
+            if row.host.startswith(WILDCARD_PREFIX):
+                wildcards.insert(row.host[len(WILDCARD_PREFIX):], route)
+            else:
+                routes[row.host] = route
+        with self._lock:
+            self._routes = routes
+            self._wildcards = wildcards
+            # 加载期间若有写入触发失效，保持未加载状态以便下次重新读取。
+            self._loaded = generation == self._generation
+
+    def invalidate(self) -> None:
+        """标记路由表失效，下一次查询时重新加载。"""
+
+        with self._lock:
+            self._generation += 1
+            self._loaded = False
+
+    def refresh(self, hosts: set[str]) -> None:
+        """只重新读取指定 Host 的规则，用于应用其他 worker 的写入。"""
+
+        if not self._loaded or not hosts:
+            return
+        with SessionLocal() as session:
+            rows = session.execute(
+                select_routes().where(SubdomainRedirect.host.in_(hosts))
+            ).all()
+        current = {row.host: route_from_row(row) for row in rows}
+        with self._lock:
+            # 与并发的整表加载互斥：让加载结果作废，下一次查询重新读取。
+            self._generation += 1
+            for host in hosts:
+                route = current.get(host)
+                if host.startswith(WILDCARD_PREFIX):
+                    suffix = host[len(WILDCARD_PREFIX):]
+                    self._wildcards.remove(suffix)
+                    if route is not None:
+                        self._wildcards.insert(suffix, route)
+                elif route is None:
+                    self._routes.pop(host, None)
+                else:
+                    self._routes[host] = route
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def lookup(self, host: str) -> SubdomainRoute | None:
+        """按 Host 查找跳转规则。"""
+
+        if not self._loaded:
+            self.load()
+        route = self._routes.get(host)
+        if route is not None:
+            return route
+        return self._wildcards.match(host)
+
+    def __len__(self) -> int:
+        return len(self._routes) + len(self._wildcards)
+
+
+@dataclass(frozen=True, slots=True)
+class ShortLinkTarget:
+    """短链解析结果，只保留跳转所需字段。"""
+
+    id: int
+    target_url: str
+    cache_control: str | None = None
+    redirect_headers: list[tuple[bytes, bytes]] = field(
+        init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        object.__setattr__(
+            self, "redirect_headers", build_redirect_headers(self.target_url, self.cache_control)
+        )
+
+
+class TTLCache(Generic[K, V]):
+    """带容量上限与 TTL 的 LRU 缓存。
+
+    写入接口提交后按键失效；:meth:`generation` 用于丢弃在失效之前
+    读出、失效之后才写回的旧结果。
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self._max_entries = max(max_entries, 0)
+        self._ttl = ttl
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: K, *, record_miss: bool = True) -> V | None:
+        """读取缓存，命中时刷新 LRU 顺序。"""
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += record_miss
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += record_miss
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: K, value: V, generation: int | None = None) -> None:
+        """写入缓存；若读取后发生过失效则放弃写入。"""
+
+        if self._max_entries == 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys: K) -> None:
+        """移除指定键的缓存项。"""
+
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """返回命中、未命中与淘汰计数。"""
+
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self._max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class ShortLinkCache(TTLCache[str, ShortLinkTarget]):
+    """code → 短链目标的 LRU 缓存。"""
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """会话认证使用的用户快照，字段与 ``User`` 模型同名，可直接替代。"""
+
+    id: int
+    username: str
+    email: str
+    is_admin: bool
+    session_version: int
+
+
+class BloomFilter:
+    """基于 blake2b 双重哈希的定长 Bloom 过滤器。"""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        capacity = max(capacity, 1)
+        bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.capacity = capacity
+        self.num_bits = max(bits, 8)
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: str) -> list[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class ShortCodeMembership:
+    """全部短链 code 的成员判定：Bloom 过滤器加一个小型负结果 LRU。
+
+    Bloom 判定不存在的 code 可以直接返回 404；判定“可能存在”但数据库
+    未命中的 code 记入负结果缓存，重复扫描时同样不再访问数据库。Bloom
+    不支持删除，删除的 code 只会成为假阳性，累计过多或超出容量时整体重建。
+    """
+
+    def __init__(self, error_rate: float, negative_size: int) -> None:
+        self._error_rate = error_rate
+        self._negative_size = max(negative_size, 0)
+        self._bloom: BloomFilter | None = None
+        self._negative: OrderedDict[str, None] = OrderedDict()
+        self._removed = 0
+        self._generation = 0
+        self._loading = False
+        self._pending_adds: list[str] = []
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.filtered = 0
+        self.negative_hits = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._bloom is not None
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def load(self) -> None:
+        """从数据库重建 Bloom 过滤器；已有重建在进行时直接返回。"""
+
+        if not self._load_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                self._loading = True
+                self._pending_adds = []
+            with SessionLocal() as session:
+                total = session.scalar(select(func.count()).select_from(ShortLink)) or 0
+                bloom = BloomFilter(max(total * 2, _BLOOM_MIN_CAPACITY), self._error_rate)
+                for code in session.scalars(
+                    select(ShortLink.code).execution_options(yield_per=5000)
+                ):
+                    bloom.add(code)
+            with self._lock:
+                for code in self._pending_adds:
+                    bloom.add(code)
+                self._bloom = bloom
+                self._removed = 0
+                self._loading = False
+                self._pending_adds = []
+        finally:
+            self._load_lock.release()
+
+    def invalidate(self) -> None:
+        """丢弃过滤器与负结果缓存，下一次访问时重建。"""
+
+        with self._lock:
+            self._generation += 1
+            self._bloom = None
+            self._negative.clear()
+
+    def might_exist(self, code: str) -> bool:
+        """返回 ``False`` 表示 code 一定不存在；未加载时保守返回 ``True``。"""
+
+        bloom = self._bloom
+        if bloom is None:
+            return True
+        if code not in bloom:
+            self.filtered += 1
+            return False
+        if code in self._negative:
+            self.negative_hits += 1
+            return False
+        return True
+
+    def add(self, code: str) -> None:
+        """记录新写入的 code。"""
+
+        with self._lock:
+            self._generation += 1
+            self._negative.pop(code, None)
+            if self._loading:
+                self._pending_adds.append(code)
+            bloom = self._bloom
+            if bloom is None:
+                return
+            bloom.add(code)
+            if bloom.count > bloom.capacity:
+                self._bloom = None
+
+    def remove(self, code: str) -> None:
+        """记录被删除或改名的 code，假阳性过多时触发重建。"""
+
+        with self._lock:
+            self._removed += 1
+            bloom = self._bloom
+            if bloom is not None and self._removed > bloom.capacity // 4:
+                self._bloom = None
+
+    def remember_missing(self, code: str, generation: int) -> None:
+        """缓存一次数据库未命中；读取后若有新写入则放弃。"""
+
+        if self._negative_size == 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._negative[code] = None
+            self._negative.move_to_end(code)
+            while len(self._negative) > self._negative_size:
+                self._negative.popitem(last=False)
+
+    def stats(self) -> dict[str, int]:
+        bloom = self._bloom
+        return {
+            "loaded": bloom is not None,
+            "capacity": bloom.capacity if bloom else 0,
+            "bits": bloom.num_bits if bloom else 0,
+            "codes": bloom.count if bloom else 0,
+            "negative_size": len(self._negative),
+            "filtered": self.filtered,
+            "negative_hits": self.negative_hits,
+        }
+
+
+subdomain_routes = SubdomainRouteTable()
+short_codes = ShortCodeMembership(SHORT_CODE_BLOOM_ERROR_RATE, NEGATIVE_CACHE_SIZE)
+short_link_cache = ShortLinkCache(SHORT_LINK_CACHE_SIZE, SHORT_LINK_CACHE_TTL)
+user_cache: TTLCache[int, UserSnapshot] = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
@@ -0,0 +1,204 @@
+"""按时间分桶的点击统计。
+
+跳转命中先由 :class:`~.hits.HitCounter` 在内存中按 ``(实体, 分钟)`` 聚合，
+写回 ``hits_int`` 的同一事务中累加到 ``click_minutes``；后台压缩线程把超过
+保留期的分钟桶汇总为小时桶、小时桶汇总为天桶。三张表只保存有点击的桶，
+行数取决于活跃实体数与时间跨度，与点击总量无关。查询时按所需粒度合并
+各层，同一时刻的点击只会出现在其中一层。
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Mapping
+
+from sqlalchemy import Connection, delete, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .models import ClickDay, ClickHour, ClickMinute, SessionLocal, ShortLink, SubdomainRedirect
+
+CLICK_MINUTE_RETENTION_HOURS = int(os.getenv("CLICK_MINUTE_RETENTION_HOURS", "48"))
+CLICK_HOUR_RETENTION_DAYS = int(os.getenv("CLICK_HOUR_RETENTION_DAYS", "30"))
+CLICK_COMPACT_INTERVAL = float(os.getenv("CLICK_COMPACT_INTERVAL", "300"))
+CLICK_SERIES_MAX_POINTS = int(os.getenv("CLICK_SERIES_MAX_POINTS", "1500"))
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+
+RESOLUTIONS: dict[str, int] = {"minute": MINUTE, "hour": HOUR, "day": DAY}
+DEFAULT_WINDOWS: dict[str, int] = {"minute": 60 * MINUTE, "hour": 48 * HOUR, "day": 30 * DAY}
+
+# 由细到粗排列，查询某一粒度时合并所有不比它更粗的层。
+_TIERS: tuple[tuple[Any, int], ...] = ((ClickMinute, MINUTE), (ClickHour, HOUR), (ClickDay, DAY))
+_ENTITY_TABLES = {
+    "short_link": ShortLink.__table__,
+    "subdomain": SubdomainRedirect.__table__,
+}
+
+logger = logging.getLogger(__name__)
+
+
+def minute_bucket(timestamp: float) -> int:
+    return int(timestamp) // MINUTE * MINUTE
+
+
+def _accumulate(statement: Any, model: Any) -> Any:
+    return statement.on_conflict_do_update(
+        index_elements=[model.kind, model.entity_id, model.bucket_start],
+        set_={"hits": model.hits + statement.excluded.hits},
+    )
+
+
+def add_minute_buckets(connection: Connection, rows: list[dict[str, Any]]) -> None:
+    """在调用方的事务中把 ``kind/entity_id/bucket_start/hits`` 增量累加到分钟表。"""
+
+    if rows:
+        connection.execute(_accumulate(sqlite_insert(ClickMinute), ClickMinute), rows)
+
+
+def delete_click_buckets(db: Session, kind: str, entity_id: int) -> None:
+    """删除实体时一并清理各层分桶，避免复用的 ID 继承旧的统计。"""
+
+    for model, _ in _TIERS:
+        db.execute(delete(model).where(model.kind == kind, model.entity_id == entity_id))
+
+
+def _rollup(connection: Connection, source: Any, target: Any, step: int, cutoff: int) -> int:
+    """把 ``source`` 中早于 ``cutoff`` 的桶按 ``step`` 汇总进 ``target`` 并删除。"""
+
+    for kind, table in _ENTITY_TABLES.items():
+        # 实体已删除但内存中仍有待写增量时会留下孤立的桶，汇总前丢弃。
+        connection.execute(
+            delete(source).where(
+                source.kind == kind,
+                source.bucket_start < cutoff,
+                source.entity_id.not_in(select(table.c.id)),
+            )
+        )
+    bucket = source.bucket_start - source.bucket_start % step
+    rows = (
+        select(source.kind, source.entity_id, bucket, func.sum(source.hits))
+        .where(source.bucket_start < cutoff)
+        .group_by(source.kind, source.entity_id, bucket)
+    )
+    statement = sqlite_insert(target).from_select(["kind", "entity_id", "bucket_start", "hits"], rows)
+    connection.execute(_accumulate(statement, target))
+    return connection.execute(delete(source).where(source.bucket_start < cutoff)).rowcount
+
+
+def series(
+    db: Session,
+    kind: str,
+    entity_id: int,
+    resolution: str,
+    start: int,
+    end: int,
+    pending: Mapping[int, int] | None = None,
+) -> list[tuple[int, int]]:
+    """返回 ``[start, end)`` 内按 ``resolution`` 对齐的 ``(桶起点, 点击数)``，没有点击的桶为 0。
+
+    每层都是一次主键范围扫描。细粒度查询超出对应层的保留期时，已被汇总
+    到更粗层的点击不会出现在结果中。``pending`` 为尚未写回的按分钟增量，
+    会并入对应的桶。
+    """
+
+    step = RESOLUTIONS[resolution]
+    first = start // step * step
+    totals = dict.fromkeys(range(first, end, step), 0)
+    for model, tier_step in _TIERS:
+        if tier_step > step:
+            break
+        bucket = model.bucket_start - model.bucket_start % step
+        rows = db.execute(
+            select(bucket, func.sum(model.hits))
+            .where(
+                model.kind == kind,
+                model.entity_id == entity_id,
+                model.bucket_start >= first,
+                model.bucket_start < end,
+            )
+            .group_by(bucket)
+        )
+        for bucket_start, hits in rows:
+            totals[bucket_start] = totals.get(bucket_start, 0) + hits
+    for minute, hits in (pending or {}).items():
+        if first <= minute < end:
+            bucket_start = minute - minute % step
+            totals[bucket_start] = totals.get(bucket_start, 0) + hits
+    return sorted(totals.items())
+
+
+class ClickCompactor:
+    """定期把分钟桶汇总为小时桶、小时桶汇总为天桶。
+
+    截止点按目标粒度对齐，汇总后的桶不会再被拆开；多个 worker 同时执行时
+    由数据库写锁串行化，后执行者只会看到已被删除的源桶。
+    """
+
+    def __init__(self, interval: float, minute_retention: int, hour_retention: int) -> None:
+        self._interval = interval
+        self._minute_retention = minute_retention
+        self._hour_retention = hour_retention
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.runs = 0
+        self.minutes_rolled = 0
+        self.hours_rolled = 0
+        self.failures = 0
+
+    def compact(self, now: float | None = None) -> tuple[int, int]:
+        """执行一次汇总，返回被汇总的分钟桶与小时桶数量。"""
+
+        now = time.time() if now is None else now
+        minute_cutoff = int(now - self._minute_retention) // HOUR * HOUR
+        hour_cutoff = int(now - self._hour_retention) // DAY * DAY
+        with SessionLocal.begin() as session:
+            connection = session.connection()
+            minutes = _rollup(connection, ClickMinute, ClickHour, HOUR, minute_cutoff)
+            hours = _rollup(connection, ClickHour, ClickDay, DAY, hour_cutoff)
+        self.runs += 1
+        self.minutes_rolled += minutes
+        self.hours_rolled += hours
+        return minutes, hours
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self._interval):
+            try:
+                self.compact()
+            except SQLAlchemyError:
+                self.failures += 1
+                logger.exception("failed to compact click buckets")
+
+    def start(self) -> None:
+        if self._interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="yetla-click-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        thread = self._thread
+        self._thread = None
+        if thread is not None:
+            thread.join(timeout=max(self._interval, 1.0) * 2)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "runs": self.runs,
+            "minutes_rolled": self.minutes_rolled,
+            "hours_rolled": self.hours_rolled,
+            "failures": self.failures,
+        }
+
+
+click_compactor = ClickCompactor(
+    CLICK_COMPACT_INTERVAL,
+    CLICK_MINUTE_RETENTION_HOURS * HOUR,
+    CLICK_HOUR_RETENTION_DAYS * DAY,
+)
@@ -1,20 +1,68 @@
 """Shared dependencies for FastAPI routes."""
 from __future__ import annotations
 
-from typing import Generator, Literal
+import os
+import time
+from typing import AsyncGenerator, Generator, Literal
 from urllib.parse import quote
 
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .models import SessionLocal, User
-from .security import needs_rehash, rehash_password, verify_password
-from .session import get_session, set_session
+from .cache import UserSnapshot, user_cache
+from .models import AsyncSessionLocal, CodeSequence, SessionLocal, User
+from .security import credential_cache, needs_rehash, password_pool, rehash_password
+from .session import get_session, refresh_session, set_session
+from .throttle import auth_throttle, client_ip
+from .tokens import find_token, token_allows, token_usage
 
 security = HTTPBasic(auto_error=False)
 
+SESSION_MAX_AGE = int(os.getenv("SESSION_MAX_AGE", str(7 * 24 * 3600)))
+# Unix timestamp until which cookies issued before ``issued_at`` existed are
+# honoured (and re-stamped on first use). Unset: recorded once in the database.
+SESSION_LEGACY_UNTIL = os.getenv("SESSION_LEGACY_UNTIL", "").strip()
+_LEGACY_DEADLINE_KEY = "session:legacy_deadline"
+_legacy_deadline: int | None = None
+
+
+def legacy_session_deadline() -> int:
+    """Return the fixed cutoff for cookies that carry no ``issued_at``.
+
+    ``SESSION_LEGACY_UNTIL`` wins when set. Otherwise the first process to ask
+    stores ``now + SESSION_MAX_AGE`` in ``code_sequences`` and every later
+    process (and restart) reads that same value back, so the grace window
+    never moves.
+    """
+
+    global _legacy_deadline
+    if _legacy_deadline is not None:
+        return _legacy_deadline
+    if SESSION_LEGACY_UNTIL:
+        _legacy_deadline = int(SESSION_LEGACY_UNTIL)
+        return _legacy_deadline
+    with SessionLocal() as session:
+        deadline = session.get(CodeSequence, _LEGACY_DEADLINE_KEY)
+        if deadline is None:
+            session.add(
+                CodeSequence(
+                    name=_LEGACY_DEADLINE_KEY,
+                    next_value=int(time.time()) + SESSION_MAX_AGE,
+                )
+            )
+            try:
+                session.commit()
+            except IntegrityError:
+                # Another worker recorded it first; use theirs.
+                session.rollback()
+            deadline = session.get(CodeSequence, _LEGACY_DEADLINE_KEY)
+        _legacy_deadline = deadline.next_value
+    return _legacy_deadline
+
 
 def get_db() -> Generator[Session, None, None]:
     """Provide a SQLAlchemy session for request lifecycle."""
@@ -26,57 +74,149 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession | None, None]:
+    """Provide an asyncio session, or ``None`` when no async driver is configured."""
+
+    if AsyncSessionLocal is None:
+        yield None
+        return
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def _authenticate(
-    db: Session, username: str, password: str
+    db: Session, username: str, password: str, remote_ip: str | None = None
 ) -> tuple[bool, Literal["username", "password", None], User | None]:
-    """Validate credential pairs and return status plus failure reason."""
+    """Validate credential pairs and return status plus failure reason.
+
+    Raises :class:`~app.throttle.AuthThrottled` before any key derivation
+    when the client IP, or this username from the same IP, has too many
+    recent failures.
+    """
 
     normalized_username = (username or "").strip().lower()
     if not normalized_username:
         return False, "username", None
 
+    auth_throttle.check(remote_ip, normalized_username)
     user = db.scalar(select(User).where(User.username == normalized_username))
     if user is None:
+        auth_throttle.record_failure(remote_ip, normalized_username)
         return False, "username", None
 
-    if not verify_password(password or "", user.password_hash):
+    if not credential_cache.verify(
+        user.id, normalized_username, password or "", user.password_hash
+    ):
+        auth_throttle.record_failure(remote_ip, normalized_username)
         return False, "password", None
 
+    auth_throttle.record_success(remote_ip, normalized_username)
+
     if needs_rehash(user.password_hash):
-        user.password_hash = rehash_password(password or "", user.password_hash)
+        user.password_hash = password_pool.call(
+            rehash_password, password or "", user.password_hash
+        )
         db.add(user)
         db.commit()
 
     return True, None, user
 
 
-def _session_user(request: Request, db: Session) -> User | None:
+def load_user_snapshot(db: Session, user_id: int) -> UserSnapshot | None:
+    """Return the cached user snapshot, reading the row only on a cache miss."""
+
+    snapshot = user_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+    generation = user_cache.generation
+    user = db.get(User, user_id)
+    if user is None:
+        return None
+    snapshot = UserSnapshot(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        is_admin=user.is_admin,
+        session_version=user.session_version,
+    )
+    user_cache.put(user_id, snapshot, generation)
+    return snapshot
+
+
+def _session_user(request: Request, db: Session) -> UserSnapshot | None:
+    """Resolve the session cookie without touching the database when cached.
+
+    Sessions are rejected once the user's ``session_version`` moves past the
+    one recorded in the cookie (password change) or after ``SESSION_MAX_AGE``.
+    Legacy cookies without ``issued_at`` are accepted and re-issued with the
+    current time instead of logging everyone out on upgrade.
+    """
+
     session = get_session(request)
     user_id = session.get("user_id")
     if not user_id:
         return None
-    user = db.get(User, user_id)
-    if user is None:
+    issued_at = session.get("issued_at")
+    now = time.time()
+    legacy = issued_at is None and now < legacy_session_deadline()
+    if SESSION_MAX_AGE > 0 and not legacy and (
+        not isinstance(issued_at, int) or now - issued_at > SESSION_MAX_AGE
+    ):
+        return None
+    user = load_user_snapshot(db, user_id)
+    if user is None or session.get("session_version", 0) != user.session_version:
         return None
+    if legacy:
+        refresh_session(request, {**session, "issued_at": int(now)})
     return user
 
 
+def _bearer_token(request: Request) -> str | None:
+    scheme, _, value = (request.headers.get("authorization") or "").partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    return value.strip()
+
+
+def _token_user(request: Request, db: Session, token: str) -> User:
+    """Resolve the owner of an API token, enforcing expiry and scopes."""
+
+    record = find_token(db, token)
+    if record is None:
+        raise HTTPException(
+            status.HTTP_401_UNAUTHORIZED,
+            detail="令牌无效或已过期",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not token_allows(record, request.method):
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="令牌缺少写入权限")
+    token_usage.record(record.id)
+    request.state.api_token_id = record.id
+    return record.owner
+
+
 def require_authenticated_user(
     request: Request,
     db: Session = Depends(get_db),
     credentials: HTTPBasicCredentials | None = Depends(security),
-) -> User:
+) -> User | UserSnapshot:
     """Resolve the current authenticated user or raise if unauthenticated."""
 
     user = _session_user(request, db)
     if user is not None:
         return user
 
+    token = _bearer_token(request)
+    if token is not None:
+        return _token_user(request, db, token)
+
     accept_header = (request.headers.get("accept") or "").lower()
     expects_html = "text/html" in accept_header
 
     if credentials is not None and (not request.url.path.startswith("/admin") or not expects_html):
-        ok, _, basic_user = _authenticate(db, credentials.username, credentials.password)
+        ok, _, basic_user = _authenticate(
+            db, credentials.username, credentials.password, client_ip(request)
+        )
         if ok and basic_user is not None:
             return basic_user
         raise HTTPException(
@@ -105,7 +245,9 @@ def require_authenticated_user(
     )
 
 
-def require_admin_user(current_user: User = Depends(require_authenticated_user)) -> User:
+def require_admin_user(
+    current_user: User | UserSnapshot = Depends(require_authenticated_user),
+) -> User | UserSnapshot:
     """Ensure the current user has administrator privileges."""
 
     if not current_user.is_admin:
@@ -114,14 +256,18 @@ def require_admin_user(current_user: User = Depends(require_authenticated_user))
 
 
 def validate_credentials(
-    username: str, password: str, db: Session
+    username: str, password: str, db: Session, remote_ip: str | None = None
 ) -> tuple[bool, Literal["username", "password", None], User | None]:
-    """Expose credential validation for the login flow."""
+    """Expose credential validation for the login flow.
+
+    Blocks the calling worker thread on the password pool; async callers
+    should run it via ``run_in_threadpool``.
+    """
 
-    return _authenticate(db, username, password)
+    return _authenticate(db, username, password, remote_ip)
 
 
-def establish_session(response, request: Request, user: User) -> None:
+def establish_session(response, request: Request, user: User | UserSnapshot) -> None:
     """Persist user identity into the signed session cookie."""
 
     set_session(
@@ -132,5 +278,7 @@ def establish_session(response, request: Request, user: User) -> None:
             "user_id": user.id,
             "username": user.username,
             "is_admin": user.is_admin,
+            "session_version": user.session_version,
+            "issued_at": int(time.time()),
         },
     )
@@ -0,0 +1,123 @@
+"""公共跳转的原生 ASGI 快速通道，绕过 FastAPI 路由与依赖注入。"""
+from __future__ import annotations
+
+from collections import Counter
+from typing import Iterable
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .cache import build_redirect_headers, short_link_cache, subdomain_routes
+from .hits import hit_counter
+from .hotkeys import hot_keys
+from .throttle import resolve_client_ip
+from .visitors import visitor_sketches
+
+_EMPTY_BODY = {"type": "http.response.body", "body": b""}
+
+fast_path_counters: Counter[str] = Counter(served=0, passed=0)
+
+
+def compose_redirect_target(base_url: str, path: str, query: str) -> str:
+    """组合目标 URL，将当前请求的 path/query 透传给上游。"""
+
+    destination = base_url.rstrip("/")
+    normalized_path = path.lstrip("/")
+    if normalized_path:
+        destination = f"{destination}/{normalized_path}"
+    if query:
+        separator = "&" if "?" in destination else "?"
+        destination = f"{destination}{separator}{query}"
+    return destination
+
+
+def _visitor(scope: Scope) -> tuple[str | None, str | None]:
+    """与 ``throttle.client_ip`` 相同的规则读取客户端 IP，并取 User-Agent。"""
+
+    real_ip = user_agent = None
+    forwarded: list[str] = []
+    for key, value in scope["headers"]:
+        if key == b"x-real-ip":
+            real_ip = value.decode("latin-1")
+        elif key == b"x-forwarded-for":
+            forwarded.append(value.decode("latin-1"))
+        elif key == b"user-agent":
+            user_agent = value.decode("latin-1")
+    client = scope.get("client")
+    peer = client[0] if client else None
+    return resolve_client_ip(peer, real_ip, ",".join(forwarded)), user_agent
+
+
+class RedirectFastPath:
+    """在 FastAPI 之前处理最热的跳转请求。
+
+    只处理 GET/HEAD，且仅当内存中已有结果时直接应答：Host 命中子域规则，
+    或基础域名下单段路径命中短链缓存。其余请求（包括首段属于已注册路由
+    的路径、缓存未命中与 404）一律交给 FastAPI 应用，行为与 ``catch_all``
+    保持一致。
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        reserved_segments: Iterable[str] = (),
+        base_domain: str = "",
+    ) -> None:
+        self.app = app
+        self._reserved = frozenset(reserved_segments)
+        self._base_domain = base_domain
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        path: str = scope["path"]
+        if path.lstrip("/").split("/", 1)[0] in self._reserved:
+            await self.app(scope, receive, send)
+            return
+
+        resolved = self._resolve(scope, path)
+        if resolved is None:
+            fast_path_counters["passed"] += 1
+            await self.app(scope, receive, send)
+            return
+
+        fast_path_counters["served"] += 1
+        status_code, response_headers = resolved
+        await send(
+            {"type": "http.response.start", "status": status_code, "headers": response_headers}
+        )
+        await send(_EMPTY_BODY)
+
+    def _resolve(self, scope: Scope, path: str) -> tuple[int, list[tuple[bytes, bytes]]] | None:
+        raw_host = b""
+        for key, value in scope["headers"]:
+            if key == b"host":
+                raw_host = value
+                break
+        host = raw_host.decode("latin-1").strip().lower().split(":", 1)[0]
+        if not host or not subdomain_routes.loaded:
+            return None
+
+        route = subdomain_routes.lookup(host)
+        if route is not None:
+            hit_counter.record_subdomain(route.id)
+            hot_keys.record_host(host)
+            destination = compose_redirect_target(
+                route.target_url, path=path, query=scope["query_string"].decode("latin-1")
+            )
+            return route.code, build_redirect_headers(destination, route.cache_control)
+
+        if self._base_domain and host != self._base_domain:
+            return None
+        code = path.strip("/")
+        if not code or "/" in code:
+            return None
+        target = short_link_cache.get(code, record_miss=False)
+        if target is None:
+            return None
+        hit_counter.record_short_link(target.id)
+        hot_keys.record_code(code)
+        visitor_sketches.record(target.id, *_visitor(scope))
+        return 302, target.redirect_headers
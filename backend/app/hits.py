@@ -0,0 +1,200 @@
+"""跳转命中次数的写后（write-behind）累加器。"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import Iterable, TypeVar
+
+from sqlalchemy import Table, bindparam, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .clicks import add_minute_buckets, minute_bucket
+from .models import SessionLocal, ShortLink, SubdomainRedirect
+
+HIT_FLUSH_INTERVAL = float(os.getenv("HIT_FLUSH_INTERVAL", "5"))
+HIT_FLUSH_THRESHOLD = int(os.getenv("HIT_FLUSH_THRESHOLD", "1000"))
+
+logger = logging.getLogger(__name__)
+
+_Record = TypeVar("_Record", ShortLink, SubdomainRedirect)
+
+_TABLES: dict[str, Table] = {
+    "short_link": ShortLink.__table__,
+    "subdomain": SubdomainRedirect.__table__,
+}
+
+
+class HitCounter:
+    """在内存中按记录 ID 与分钟聚合命中增量，定期批量写回数据库。
+
+    跳转请求只做一次加锁的计数累加；后台线程按时间间隔或待写条目数
+    触发 :meth:`flush`，每次刷新在单个事务内执行
+    ``UPDATE ... SET hits_int = hits_int + ?`` 并累加分钟分桶，关闭时做
+    最后一次刷新。
+
+    读取接口不触发写回，写入完全由后台线程负责；需要实时计数时用
+    :meth:`overlay`、:meth:`pending_totals` 等方法把本 worker 尚未写回的
+    增量叠加到查询结果上。
+    """
+
+    def __init__(self, interval: float, threshold: int) -> None:
+        self._interval = interval
+        self._threshold = max(threshold, 1)
+        self._pending: Counter[tuple[str, int, int]] = Counter()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.flushes = 0
+        self.flushed_hits = 0
+        self.failed_flushes = 0
+
+    def record(self, kind: str, entity_id: int, count: int = 1, at: float | None = None) -> None:
+        """累加一次命中，不触发任何磁盘写入；``at`` 为命中时间，默认当前时间。"""
+
+        bucket = minute_bucket(time.time() if at is None else at)
+        with self._lock:
+            self._pending[(kind, entity_id, bucket)] += count
+            pending = len(self._pending)
+        if pending >= self._threshold:
+            self._wake.set()
+
+    def record_short_link(self, link_id: int) -> None:
+        self.record("short_link", link_id)
+
+    def record_subdomain(self, redirect_id: int) -> None:
+        self.record("subdomain", redirect_id)
+
+    def pending_totals(self, kind: str) -> Counter[int]:
+        """返回本 worker 尚未写回的各记录命中增量。"""
+
+        totals: Counter[int] = Counter()
+        with self._lock:
+            for (pending_kind, entity_id, _), delta in self._pending.items():
+                if pending_kind == kind:
+                    totals[entity_id] += delta
+        return totals
+
+    def pending_buckets(self, kind: str, entity_id: int) -> Counter[int]:
+        """返回单条记录尚未写回的按分钟命中增量。"""
+
+        buckets: Counter[int] = Counter()
+        with self._lock:
+            for (pending_kind, pending_id, bucket), delta in self._pending.items():
+                if pending_kind == kind and pending_id == entity_id:
+                    buckets[bucket] += delta
+        return buckets
+
+    def overlay(self, kind: str, records: Iterable[_Record]) -> list[_Record]:
+        """把待写增量叠加到已加载记录的 ``hits`` 上。
+
+        以已提交值的形式设置，记录不会被标记为已修改，也就不会被会话写回。
+        """
+
+        records = list(records)
+        totals = self.pending_totals(kind)
+        if totals:
+            for record in records:
+                delta = totals.get(record.id)
+                if delta:
+                    set_committed_value(record, "hits", record.hits + delta)
+        return records
+
+    def discard(self, kind: str, entity_id: int) -> int:
+        """丢弃某条记录尚未写回的增量，返回丢弃的命中数。
+
+        删除记录时调用：先等待进行中的写回结束，避免已删除的 ID 在下一次
+        写回时留下孤立的分钟桶，被复用该 ID 的新记录继承。
+        """
+
+        with self._flush_lock, self._lock:
+            keys = [key for key in self._pending if key[0] == kind and key[1] == entity_id]
+            return sum(self._pending.pop(key) for key in keys)
+
+    def flush(self) -> int:
+        """把累积的增量写回数据库，返回写入的命中总数。"""
+
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, Counter()
+            if not pending:
+                return 0
+
+            totals: Counter[tuple[str, int]] = Counter()
+            buckets: list[dict[str, int | str]] = []
+            for (kind, entity_id, bucket), delta in pending.items():
+                totals[(kind, entity_id)] += delta
+                buckets.append(
+                    {"kind": kind, "entity_id": entity_id, "bucket_start": bucket, "hits": delta}
+                )
+            grouped: dict[str, list[dict[str, int]]] = {}
+            for (kind, entity_id), delta in totals.items():
+                grouped.setdefault(kind, []).append({"b_id": entity_id, "b_delta": delta})
+
+            try:
+                with SessionLocal.begin() as session:
+                    for kind, params in grouped.items():
+                        table = _TABLES[kind]
+                        statement = (
+                            update(table)
+                            .where(table.c.id == bindparam("b_id"))
+                            .values(hits_int=table.c.hits_int + bindparam("b_delta"))
+                        )
+                        session.connection().execute(statement, params)
+                    add_minute_buckets(session.connection(), buckets)
+            except SQLAlchemyError:
+                # 写入失败时把增量放回，等待下一次刷新重试。
+                with self._lock:
+                    self._pending.update(pending)
+                self.failed_flushes += 1
+                logger.exception("failed to flush %d pending hit counters", len(pending))
+                return 0
+
+            total = sum(pending.values())
+            self.flushes += 1
+            self.flushed_hits += total
+            return total
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            self.flush()
+
+    def start(self) -> None:
+        """启动后台刷新线程。"""
+
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="yetla-hit-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程并执行最后一次刷新。"""
+
+        thread = self._thread
+        self._thread = None
+        if thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            thread.join(timeout=max(self._interval, 1.0) * 2)
+        self.flush()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "flushes": self.flushes,
+            "flushed_hits": self.flushed_hits,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+hit_counter = HitCounter(HIT_FLUSH_INTERVAL, HIT_FLUSH_THRESHOLD)
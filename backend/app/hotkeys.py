@@ -0,0 +1,144 @@
+"""实时热点短链 code 与子域 Host 的 top-K 统计。
+
+每个时间窗口各维护一份容量固定的 Space-Saving 摘要，计数采用前向衰减：
+命中时累加 ``exp((t - landmark) / τ)``，读取时统一乘以 ``exp(-(now - landmark) / τ)``，
+得到的分数约等于最近 ``τ`` 秒内的命中数，旧的命中按指数平滑淡出，
+不需要定时遍历计数器。内存只与容量和窗口数相关；已跟踪的键每次命中
+只做一次字典更新，新键替换最小计数器时通过惰性最小堆摊还为 ``O(log k)``。
+统计在每个 worker 进程内独立进行。
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import os
+import threading
+import time
+from typing import Any
+
+HOT_KEYS_CAPACITY = int(os.getenv("HOT_KEYS_CAPACITY", "200"))
+
+WINDOWS: dict[str, float] = {"1m": 60.0, "5m": 300.0, "1h": 3600.0}
+KINDS = ("code", "host")
+MIN_SCORE = 0.5
+
+# 衰减指数超过该值时把计数器整体换算到新的基准时间，避免浮点溢出。
+_RESCALE_EXPONENT = 30.0
+
+
+class DecayingSpaceSaving:
+    """带前向指数衰减的 Space-Saving top-K 摘要（调用方负责加锁）。
+
+    每个键的计数器保存 ``[count, error]``，``error`` 为接管计数器时被淘汰键
+    的计数，真实分数落在 ``[count - error, count]`` 之间。
+    """
+
+    def __init__(self, capacity: int, tau: float, now: float) -> None:
+        self._capacity = max(capacity, 1)
+        self._tau = tau
+        self._landmark = now
+        self._counters: dict[str, list[float]] = {}
+        # 每个键恰有一个堆条目；命中后条目偏小，淘汰时再校正。
+        self._heap: list[tuple[float, str]] = []
+
+    def _rescale(self, now: float) -> None:
+        factor = math.exp(-(now - self._landmark) / self._tau)
+        for counter in self._counters.values():
+            counter[0] *= factor
+            counter[1] *= factor
+        self._heap = [(counter[0], key) for key, counter in self._counters.items()]
+        heapq.heapify(self._heap)
+        self._landmark = now
+
+    def _evict_minimum(self) -> float:
+        while True:
+            count, key = self._heap[0]
+            current = self._counters[key][0]
+            if current == count:
+                heapq.heappop(self._heap)
+                del self._counters[key]
+                return count
+            heapq.heapreplace(self._heap, (current, key))
+
+    def add(self, key: str, now: float) -> None:
+        exponent = (now - self._landmark) / self._tau
+        if exponent > _RESCALE_EXPONENT:
+            self._rescale(now)
+            exponent = 0.0
+        weight = math.exp(exponent)
+        counter = self._counters.get(key)
+        if counter is not None:
+            counter[0] += weight
+            return
+        floor = 0.0
+        if len(self._counters) >= self._capacity:
+            floor = self._evict_minimum()
+        self._counters[key] = [floor + weight, floor]
+        heapq.heappush(self._heap, (floor + weight, key))
+
+    def top(self, limit: int, now: float) -> list[dict[str, Any]]:
+        scale = math.exp(-(now - self._landmark) / self._tau)
+        ranked = sorted(self._counters.items(), key=lambda item: item[1][0], reverse=True)
+        entries = []
+        for key, (count, error) in ranked[:limit]:
+            score = count * scale
+            if score < MIN_SCORE:
+                break
+            entries.append({"key": key, "score": round(score, 1), "error": round(error * scale, 1)})
+        return entries
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+
+class HotKeys:
+    """按窗口与类型（短链 code、子域 Host）维护的 top-K 统计。"""
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self._reset(time.monotonic())
+
+    def _reset(self, now: float) -> None:
+        self._summaries = {
+            (kind, window): DecayingSpaceSaving(self._capacity, tau, now)
+            for kind in KINDS
+            for window, tau in WINDOWS.items()
+        }
+
+    def record(self, kind: str, key: str, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.recorded += 1
+            for window in WINDOWS:
+                self._summaries[(kind, window)].add(key, now)
+
+    def record_code(self, code: str) -> None:
+        self.record("code", code)
+
+    def record_host(self, host: str) -> None:
+        self.record("host", host)
+
+    def snapshot(self, limit: int, now: float | None = None) -> dict[str, dict[str, list[dict[str, Any]]]]:
+        """返回每个窗口内分数最高的 ``limit`` 个 code 与 Host。"""
+
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return {
+                window: {kind: self._summaries[(kind, window)].top(limit, now) for kind in KINDS}
+                for window in WINDOWS
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self.recorded = 0
+            self._reset(time.monotonic())
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            tracked = sum(len(summary) for summary in self._summaries.values())
+        return {"capacity": self._capacity, "tracked": tracked, "recorded": self.recorded}
+
+
+hot_keys = HotKeys(HOT_KEYS_CAPACITY)
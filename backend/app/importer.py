@@ -0,0 +1,366 @@
+"""短链与子域规则的批量导入。
+
+请求体按 CSV（首行为表头）或 NDJSON 增量解析，每 ``IMPORT_BATCH_SIZE``
+行为一批：沿用 ``ShortLinkCreate`` / ``SubdomainRedirectCreate`` 校验，
+用 ``IN`` 查询一次性检查编码或 Host 冲突，再以单条 ``executemany`` 写入并
+提交。失败的行只记入报告，不影响其他行。
+
+命令行用法::
+
+    python -m app.importer links links.csv --owner admin
+    python -m app.importer subdomains rules.ndjson --owner admin --format ndjson
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, BinaryIO, Callable, Iterable, Sequence
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .allocator import CodeAllocationError, code_allocator
+from .cache import short_codes, short_link_cache, subdomain_routes
+from .models import SessionLocal, ShortLink, SubdomainRedirect, User
+from .nginx_map import nginx_maps
+from .schemas import ShortLinkCreate, SubdomainRedirectCreate
+from .sync import ENTITY_SHORT_LINK, ENTITY_SUBDOMAIN, record_change
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+FORMATS = (FORMAT_CSV, FORMAT_NDJSON)
+
+logger = logging.getLogger(__name__)
+
+ParsedRow = tuple[int, "dict[str, Any] | None", "str | None"]
+
+
+def detect_format(content_type: str) -> str:
+    """根据 Content-Type 推断格式，无法识别时按 NDJSON 处理。"""
+
+    return FORMAT_CSV if "csv" in content_type.lower() else FORMAT_NDJSON
+
+
+class RecordReader:
+    """按块接收字节并逐行解析，返回 ``(行号, 记录, 错误)``。
+
+    CSV 记录不支持跨行的引号字段；跳转规则中的地址本就不应包含换行。
+    """
+
+    def __init__(self, fmt: str) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"unsupported import format: {fmt}")
+        self._fmt = fmt
+        self._buffer = b""
+        self._line_no = 0
+        self._header: list[str] | None = None
+
+    def feed(self, chunk: bytes) -> list[ParsedRow]:
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split(b"\n")
+        return [row for row in map(self._parse_line, lines) if row is not None]
+
+    def close(self) -> list[ParsedRow]:
+        rest, self._buffer = self._buffer, b""
+        row = self._parse_line(rest)
+        return [row] if row is not None else []
+
+    def _parse_line(self, raw: bytes) -> ParsedRow | None:
+        self._line_no += 1
+        try:
+            line = raw.decode("utf-8-sig" if self._line_no == 1 else "utf-8").strip()
+        except UnicodeDecodeError:
+            return self._line_no, None, "不是有效的 UTF-8 文本"
+        if not line:
+            return None
+
+        if self._fmt == FORMAT_NDJSON:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                return self._line_no, None, "不是有效的 JSON"
+            if not isinstance(record, dict):
+                return self._line_no, None, "每行必须是 JSON 对象"
+            return self._line_no, record, None
+
+        values = next(csv.reader([line]))
+        if self._header is None:
+            self._header = [name.strip() for name in values]
+            return None
+        if len(values) > len(self._header):
+            return self._line_no, None, "列数多于表头"
+        return self._line_no, {
+            name: value for name, value in zip(self._header, values) if value != ""
+        }, None
+
+
+@dataclass
+class ImportReport:
+    total: int = 0
+    created: int = 0
+    failed: int = 0
+    errors: list[dict[str, Any]] = field(default_factory=list)
+    errors_truncated: bool = False
+
+    def fail(self, line: int, message: str, key: str | None = None) -> None:
+        self.failed += 1
+        if len(self.errors) >= IMPORT_MAX_ERRORS:
+            self.errors_truncated = True
+            return
+        self.errors.append({"line": line, "key": key, "error": message})
+
+    def finish(self) -> "ImportReport":
+        self.errors.sort(key=lambda error: error["line"])
+        return self
+
+
+def _validation_message(exc: ValidationError) -> str:
+    parts = []
+    for error in exc.errors(include_context=False):
+        location = ".".join(str(item) for item in error.get("loc", ()))
+        parts.append(f"{location}: {error['msg']}" if location else error["msg"])
+    return "; ".join(parts)
+
+
+def _validate(
+    rows: Sequence[ParsedRow], schema: type[BaseModel], report: ImportReport
+) -> list[tuple[int, Any]]:
+    valid = []
+    for line, record, error in rows:
+        report.total += 1
+        if error is not None:
+            report.fail(line, error)
+            continue
+        try:
+            valid.append((line, schema.model_validate(record)))
+        except ValidationError as exc:
+            report.fail(line, _validation_message(exc))
+    return valid
+
+
+def _existing_keys(db: Session, column: Any, keys: Iterable[str]) -> set[str]:
+    keys = list(keys)
+    found: set[str] = set()
+    # 每次 IN 查询的参数数量保持在 SQLite 变量上限以内
+    for start in range(0, len(keys), IMPORT_BATCH_SIZE):
+        chunk = keys[start : start + IMPORT_BATCH_SIZE]
+        found.update(db.scalars(select(column).where(column.in_(chunk))))
+    return found
+
+
+def _write_batch(
+    db: Session,
+    model: Any,
+    entity: str,
+    rows: list[tuple[int, str, dict[str, Any]]],
+    report: ImportReport,
+) -> list[str]:
+    if not rows:
+        return []
+    keys = [key for _, key, _ in rows]
+    try:
+        db.execute(insert(model), [values for _, _, values in rows])
+        record_change(db, entity, *keys)
+        db.commit()
+    except IntegrityError:
+        # 与并发写入撞上唯一约束：整批回滚，逐行报告，可重新导入这些行
+        db.rollback()
+        for line, key, _ in rows:
+            report.fail(line, "写入时发生唯一约束冲突，请重试", key)
+        return []
+    except SQLAlchemyError:
+        db.rollback()
+        logger.exception("failed to import %d rows", len(rows))
+        for line, key, _ in rows:
+            report.fail(line, "数据库写入失败", key)
+        return []
+    report.created += len(rows)
+    return keys
+
+
+def import_short_link_batch(
+    db: Session, rows: Sequence[ParsedRow], owner_id: int | None, report: ImportReport
+) -> None:
+    valid = _validate(rows, ShortLinkCreate, report)
+    seen: set[str] = set()
+    explicit: list[tuple[int, ShortLinkCreate]] = []
+    generated: list[tuple[int, ShortLinkCreate]] = []
+    for line, payload in valid:
+        if payload.code is None:
+            generated.append((line, payload))
+        elif payload.code in seen:
+            report.fail(line, "短链接编码在导入数据中重复", payload.code)
+        else:
+            seen.add(payload.code)
+            explicit.append((line, payload))
+
+    taken = _existing_keys(db, ShortLink.code, seen)
+    pending: list[tuple[int, str, dict[str, Any]]] = []
+    for line, payload in explicit:
+        if payload.code in taken:
+            report.fail(line, "短链接编码已存在", payload.code)
+        else:
+            pending.append((line, payload.code, payload))
+
+    try:
+        codes = code_allocator.allocate_many(db, len(generated))
+    except CodeAllocationError:
+        codes = []
+    for (line, payload), code in zip(generated, codes):
+        pending.append((line, code, payload))
+    for line, _ in generated[len(codes) :]:
+        report.fail(line, "无法生成唯一的短链接编码")
+
+    created = _write_batch(
+        db,
+        ShortLink,
+        ENTITY_SHORT_LINK,
+        [
+            (
+                line,
+                code,
+                {
+                    "code": code,
+                    "target_url": payload.target_url,
+                    "cache_max_age": payload.cache_max_age,
+                    "user_id": owner_id,
+                },
+            )
+            for line, code, payload in pending
+        ],
+        report,
+    )
+    if created:
+        short_link_cache.invalidate(*created)
+        for code in created:
+            short_codes.add(code)
+
+
+def import_subdomain_batch(
+    db: Session, rows: Sequence[ParsedRow], owner_id: int | None, report: ImportReport
+) -> None:
+    valid = _validate(rows, SubdomainRedirectCreate, report)
+    seen: set[str] = set()
+    unique: list[tuple[int, SubdomainRedirectCreate]] = []
+    for line, payload in valid:
+        if payload.host in seen:
+            report.fail(line, "子域在导入数据中重复", payload.host)
+        else:
+            seen.add(payload.host)
+            unique.append((line, payload))
+
+    taken = _existing_keys(db, SubdomainRedirect.host, seen)
+    pending = []
+    for line, payload in unique:
+        if payload.host in taken:
+            report.fail(line, "子域跳转已存在", payload.host)
+            continue
+        values = {
+            "host": payload.host,
+            "target_url": payload.target_url,
+            "code": payload.code,
+            "cache_max_age": payload.cache_max_age,
+            "cache_immutable": payload.cache_immutable,
+            "user_id": owner_id,
+        }
+        pending.append((line, payload.host, values))
+
+    if _write_batch(db, SubdomainRedirect, ENTITY_SUBDOMAIN, pending, report):
+        subdomain_routes.invalidate()
+        nginx_maps.schedule()
+
+
+BatchImporter = Callable[[Session, Sequence[ParsedRow], "int | None", ImportReport], None]
+
+IMPORTERS: dict[str, BatchImporter] = {
+    "links": import_short_link_batch,
+    "subdomains": import_subdomain_batch,
+}
+
+
+def run_batch(
+    importer: BatchImporter, rows: Sequence[ParsedRow], owner_id: int | None, report: ImportReport
+) -> None:
+    """在独立会话中导入一批记录，每批单独提交。"""
+
+    with SessionLocal() as session:
+        importer(session, rows, owner_id, report)
+
+
+async def import_stream(
+    chunks: AsyncIterable[bytes],
+    fmt: str,
+    importer: BatchImporter,
+    owner_id: int | None,
+    run: Callable[..., Any],
+) -> ImportReport:
+    """从异步字节流导入，``run`` 负责把同步的批处理放到线程池执行。"""
+
+    reader = RecordReader(fmt)
+    report = ImportReport()
+    pending: list[ParsedRow] = []
+    async for chunk in chunks:
+        pending.extend(reader.feed(chunk))
+        while len(pending) >= IMPORT_BATCH_SIZE:
+            batch, pending = pending[:IMPORT_BATCH_SIZE], pending[IMPORT_BATCH_SIZE:]
+            await run(run_batch, importer, batch, owner_id, report)
+    pending.extend(reader.close())
+    if pending:
+        await run(run_batch, importer, pending, owner_id, report)
+    return report.finish()
+
+
+def import_file(
+    stream: BinaryIO, fmt: str, importer: BatchImporter, owner_id: int | None
+) -> ImportReport:
+    reader = RecordReader(fmt)
+    report = ImportReport()
+    pending: list[ParsedRow] = []
+    for chunk in iter(lambda: stream.read(64 * 1024), b""):
+        pending.extend(reader.feed(chunk))
+        while len(pending) >= IMPORT_BATCH_SIZE:
+            batch, pending = pending[:IMPORT_BATCH_SIZE], pending[IMPORT_BATCH_SIZE:]
+            run_batch(importer, batch, owner_id, report)
+    pending.extend(reader.close())
+    if pending:
+        run_batch(importer, pending, owner_id, report)
+    return report.finish()
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.importer", description=__doc__.splitlines()[0])
+    parser.add_argument("kind", choices=sorted(IMPORTERS))
+    parser.add_argument("path", help="导入文件，- 表示标准输入")
+    parser.add_argument("--owner", required=True, help="导入记录归属的用户名")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="默认按扩展名判断")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or (FORMAT_CSV if args.path.lower().endswith(".csv") else FORMAT_NDJSON)
+    with SessionLocal() as session:
+        owner_id = session.scalar(select(User.id).where(User.username == args.owner.strip().lower()))
+    if owner_id is None:
+        parser.error(f"用户不存在: {args.owner}")
+
+    if args.path == "-":
+        report = import_file(sys.stdin.buffer, fmt, IMPORTERS[args.kind], owner_id)
+    else:
+        with open(args.path, "rb") as stream:
+            report = import_file(stream, fmt, IMPORTERS[args.kind], owner_id)
+    for error in report.errors:
+        print(f"line {error['line']}: {error['error']}", file=sys.stderr)
+    print(f"total {report.total}, created {report.created}, failed {report.failed}")
+    return 0 if report.failed == 0 else 1
+
+
+if __name__ == "__main__":  # pragma: no cover - 命令行入口
+    raise SystemExit(main())
@@ -2,37 +2,85 @@
 from __future__ import annotations
 
 import os
-import secrets
-import string
+from datetime import datetime, timedelta, timezone
 
 from pathlib import Path
 from typing import Any
 from urllib.parse import parse_qsl
 
-from fastapi import Depends, FastAPI, HTTPException, Request, Response, status
-from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import (
+    HTMLResponse,
+    JSONResponse,
+    PlainTextResponse,
+    RedirectResponse,
+    StreamingResponse,
+)
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy import select, func
+from sqlalchemy import Row, Select, select, func
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, selectinload
 
+from .allocator import CodeAllocationError, code_allocator
+from .cache import (
+    ShortLinkTarget,
+    cache_control_header,
+    short_codes,
+    short_link_cache,
+    subdomain_routes,
+    user_cache,
+)
+from .fastpath import RedirectFastPath, compose_redirect_target, fast_path_counters
+from .clicks import (
+    CLICK_SERIES_MAX_POINTS,
+    DEFAULT_WINDOWS,
+    RESOLUTIONS as CLICK_RESOLUTIONS,
+    click_compactor,
+    delete_click_buckets,
+    series as click_series,
+)
+from .hits import hit_counter
+from .hotkeys import WINDOWS as HOT_KEY_WINDOWS, hot_keys
+from .exporter import MEDIA_TYPES, SHORT_LINK_EXPORT, SUBDOMAIN_EXPORT, ExportSpec, iter_export
+from .importer import FORMATS, IMPORTERS, detect_format, import_stream
+from .nginx_map import nginx_log_ingester, nginx_maps
+from .pagination import NEXT_CURSOR_HEADER, PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, InvalidCursor, keyset_page
+from .search import SHORT_LINK_SEARCH, SUBDOMAIN_SEARCH, ensure_search_index, search
+from .stats import summary_cache, summary_for
+from .sync import ENTITY_SHORT_LINK, ENTITY_SUBDOMAIN, ENTITY_USER, data_sync, record_change
 from .deps import (
     establish_session,
+    get_async_db,
     get_db,
+    legacy_session_deadline,
     require_admin_user,
     require_authenticated_user,
     validate_credentials,
 )
+from .session import SessionRefreshMiddleware, get_session
 from .models import (
+    ApiToken,
     Base,
+    SessionLocal,
     ShortLink,
     SubdomainRedirect,
     User,
+    async_engine,
+    ensure_cache_policy_columns,
+    ensure_pagination_indexes,
     ensure_subdomain_hits_column,
     ensure_user_association_columns,
+    ensure_user_session_version_column,
     engine,
 )
 from .schemas import (
+    ApiToken as ApiTokenSchema,
+    ApiTokenCreate,
+    ApiTokenCreated,
+    ClickSeries,
+    ImportResult,
     ShortLink as ShortLinkSchema,
     ShortLinkCreate,
     ShortLinkUpdate,
@@ -43,14 +91,28 @@ from .schemas import (
     UserCreate,
     UserUpdate,
     PasswordChange,
+    VisitorStats,
 )
 from pydantic import ValidationError
 
 from .user_service import ensure_default_admin
-from .security import hash_password, verify_password
+from .security import (
+    PASSWORD_HASH_RETRY_AFTER,
+    PasswordPoolBusy,
+    credential_cache,
+    hash_password,
+    password_pool,
+    verify_password,
+)
+from .throttle import AuthThrottled, auth_throttle, client_ip
+from .tokens import generate_token, hash_token, token_usage
+from .visitors import (
+    VISITOR_DAY_RETENTION_DAYS,
+    delete_sketches,
+    summarize as summarize_visitors,
+    visitor_sketches,
+)
 
-SHORT_CODE_LEN = int(os.getenv("SHORT_CODE_LEN", "6"))
-MAX_CODE_ATTEMPTS = 10
 BASE_DOMAIN = os.getenv("BASE_DOMAIN", "").strip().lower()
 
 app = FastAPI(
@@ -86,9 +148,47 @@ def ensure_tables() -> None:
         Base.metadata.create_all(bind=engine)
         ensure_subdomain_hits_column()
         ensure_user_association_columns()
+        ensure_cache_policy_columns()
+        ensure_user_session_version_column()
+        ensure_pagination_indexes()
+        ensure_search_index()
         ensure_default_admin()
+        legacy_session_deadline()
+        data_sync.prune()
+        visitor_sketches.prune()
+        data_sync.prime()
+        subdomain_routes.load()
+        short_codes.load()
     except SQLAlchemyError as exc:  # pragma: no cover - 依赖数据库环境
         raise RuntimeError("failed to initialize database schema") from exc
+    hit_counter.start()
+    visitor_sketches.start()
+    token_usage.start()
+    data_sync.start()
+    click_compactor.start()
+    nginx_maps.schedule()
+    nginx_log_ingester.start()
+
+
+@app.on_event("shutdown")
+def flush_pending_hits() -> None:
+    """应用关闭前写回内存中尚未落盘的命中计数。"""
+
+    data_sync.stop()
+    click_compactor.stop()
+    nginx_log_ingester.stop()
+    hit_counter.stop()
+    visitor_sketches.stop()
+    token_usage.stop()
+    password_pool.shutdown()
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine() -> None:
+    """关闭异步引擎持有的连接池。"""
+
+    if async_engine is not None:
+        await async_engine.dispose()
 
 
 @app.exception_handler(HTTPException)
@@ -132,29 +232,45 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
     return JSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=headers)
 
 
-def _generate_unique_code(db: Session, length: int) -> str:
-    """生成唯一的短链接 code。"""
+@app.exception_handler(PasswordPoolBusy)
+async def password_pool_busy_handler(request: Request, exc: PasswordPoolBusy) -> Response:
+    """密码哈希线程池已满时返回 503，提示调用方稍后重试。"""
+
+    return await http_exception_handler(
+        request,
+        HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="服务繁忙，请稍后重试",
+            headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+        ),
+    )
+
+
+@app.exception_handler(AuthThrottled)
+async def auth_throttled_handler(request: Request, exc: AuthThrottled) -> Response:
+    """认证失败次数超限时返回 429，并提示需要等待的秒数。"""
+
+    return await http_exception_handler(
+        request,
+        HTTPException(
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="认证失败次数过多，请稍后再试",
+            headers={"Retry-After": str(exc.retry_after)},
+        ),
+    )
 
-    alphabet = string.ascii_letters + string.digits
-    for _ in range(MAX_CODE_ATTEMPTS):
-        candidate = "".join(secrets.choice(alphabet) for _ in range(length))
-        exists = db.scalar(select(ShortLink).where(ShortLink.code == candidate))
-        if not exists:
-            return candidate
-    raise HTTPException(status.HTTP_409_CONFLICT, detail="无法生成唯一的短链接编码")
 
+async def _allocate_code(db: Session) -> str:
+    """分配唯一的短链接 code。
 
-def _compose_redirect_target(base_url: str, path: str, query: str) -> str:
-    """组合目标 URL，将当前请求的 path/query 透传给上游。"""
+    冷启动时可能加载 Bloom 过滤器（全表扫描）或预留序列块（写事务），
+    放到线程池执行，避免阻塞事件循环。
+    """
 
-    destination = base_url.rstrip("/")
-    normalized_path = path.lstrip("/")
-    if normalized_path:
-        destination = f"{destination}/{normalized_path}"
-    if query:
-        separator = "&" if "?" in destination else "?"
-        destination = f"{destination}{separator}{query}"
-    return destination
+    try:
+        return await run_in_threadpool(code_allocator.allocate, db)
+    except CodeAllocationError as exc:
+        raise HTTPException(status.HTTP_409_CONFLICT, detail="无法生成唯一的短链接编码") from exc
 
 
 def _decode_urlencoded_form(body: bytes, charset: str = "utf-8") -> dict[str, Any]:
@@ -214,7 +330,7 @@ async def _parse_short_link_payload(request: Request) -> ShortLinkCreate:
     try:
         return ShortLinkCreate.model_validate(data)
     except ValidationError as exc:  # pragma: no cover - FastAPI 将统一处理
-        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=exc.errors()) from exc
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=exc.errors(include_context=False)) from exc
 
 
 async def _parse_short_link_update_payload(request: Request) -> ShortLinkUpdate:
@@ -230,7 +346,7 @@ async def _parse_short_link_update_payload(request: Request) -> ShortLinkUpdate:
     try:
         return ShortLinkUpdate.model_validate(data)
     except ValidationError as exc:  # pragma: no cover - FastAPI 将统一处理
-        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=exc.errors()) from exc
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=exc.errors(include_context=False)) from exc
 
 
 async def _parse_subdomain_payload(request: Request) -> SubdomainRedirectCreate:
@@ -246,7 +362,7 @@ async def _parse_subdomain_payload(request: Request) -> SubdomainRedirectCreate:
     try:
         return SubdomainRedirectCreate.model_validate(data)
     except ValidationError as exc:  # pragma: no cover - FastAPI 将统一处理
-        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=exc.errors()) from exc
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=exc.errors(include_context=False)) from exc
 
 
 async def _parse_subdomain_update_payload(
@@ -264,7 +380,23 @@ async def _parse_subdomain_update_payload(
     try:
         return SubdomainRedirectUpdate.model_validate(data)
     except ValidationError as exc:  # pragma: no cover - FastAPI 将统一处理
-        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=exc.errors()) from exc
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=exc.errors(include_context=False)) from exc
+
+
+async def _parse_api_token_payload(request: Request) -> ApiTokenCreate:
+    """解析 API 令牌创建请求，支持 JSON 与表单提交。"""
+
+    content_type = request.headers.get("content-type", "").lower()
+    data: dict[str, Any]
+    if content_type.startswith("application/json"):
+        data = await request.json()
+    else:
+        data = await _read_form_data(request, content_type)
+
+    try:
+        return ApiTokenCreate.model_validate(data)
+    except ValidationError as exc:  # pragma: no cover - FastAPI 将统一处理
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=exc.errors(include_context=False)) from exc
 
 
 def _parse_boolean(value: str | None) -> bool:
@@ -294,7 +426,7 @@ async def _parse_user_create_payload(request: Request) -> UserCreate:
     try:
         return UserCreate.model_validate(data)
     except ValidationError as exc:
-        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=exc.errors()) from exc
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=exc.errors(include_context=False)) from exc
 
 
 async def _parse_user_update_payload(request: Request) -> UserUpdate:
@@ -320,7 +452,7 @@ async def _parse_user_update_payload(request: Request) -> UserUpdate:
     try:
         return UserUpdate.model_validate(data)
     except ValidationError as exc:
-        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=exc.errors()) from exc
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=exc.errors(include_context=False)) from exc
 
 
 async def _parse_password_change_payload(request: Request) -> PasswordChange:
@@ -334,7 +466,7 @@ async def _parse_password_change_payload(request: Request) -> PasswordChange:
     try:
         return PasswordChange.model_validate(data)
     except ValidationError as exc:
-        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=exc.errors()) from exc
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, detail=exc.errors(include_context=False)) from exc
 
 
 def _format_validation_errors(detail: Any) -> str:
@@ -378,6 +510,167 @@ def _commit_session(db: Session, conflict_detail: str | None = None) -> None:
         ) from exc
 
 
+def _list_page(
+    db: Session,
+    query: Select,
+    model: Any,
+    response: Response,
+    limit: int | None,
+    cursor: str | None,
+) -> list[Any]:
+    """未指定分页参数时返回全部结果，否则返回一页并在响应头中给出下一页游标。"""
+
+    if limit is None and cursor is None:
+        return list(db.scalars(query.order_by(model.created_at.desc(), model.id.desc())).all())
+    try:
+        items, next_cursor = keyset_page(db, query, model, limit or PAGE_SIZE_DEFAULT, cursor)
+    except InvalidCursor as exc:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="分页游标无效") from exc
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
+
+
+async def _import_records(request: Request, fmt: str | None, kind: str, owner: User) -> Any:
+    """流式读取请求体并分批导入，返回逐行报告。"""
+
+    if fmt is not None and fmt not in FORMATS:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="仅支持 csv 或 ndjson 格式")
+    return await import_stream(
+        request.stream(),
+        fmt or detect_format(request.headers.get("content-type", "")),
+        IMPORTERS[kind],
+        owner.id,
+        run_in_threadpool,
+    )
+
+
+def _export_response(
+    request: Request,
+    spec: ExportSpec,
+    fmt: str,
+    since: datetime | None,
+    owner: str | None,
+    current_user: User,
+    db: Session,
+) -> StreamingResponse:
+    """按归属与创建时间筛选后流式导出，客户端接受 gzip 时边压缩边发送。"""
+
+    owner_id: int | None = None if current_user.is_admin else current_user.id
+    if owner:
+        owner_record = db.scalar(select(User).where(User.username == owner.strip().lower()))
+        if owner_record is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, detail="用户不存在")
+        if not current_user.is_admin and owner_record.id != current_user.id:
+            raise HTTPException(status.HTTP_403_FORBIDDEN, detail="无权导出其他用户的数据")
+        owner_id = owner_record.id
+
+    compress = "gzip" in request.headers.get("accept-encoding", "").lower()
+    headers = {
+        "Content-Disposition": f'attachment; filename="{spec.name}.{fmt}"',
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        iter_export(spec, fmt, owner_id, since, compress),
+        media_type=MEDIA_TYPES[fmt],
+        headers=headers,
+    )
+
+
+def _utc_timestamp(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def _click_series_response(
+    db: Session,
+    kind: str,
+    entity_id: int,
+    resolution: str,
+    start: datetime | None,
+    end: datetime | None,
+) -> dict[str, Any]:
+    """读取分桶点击时间序列；未指定区间时取该粒度的默认窗口并包含当前桶。"""
+
+    step = CLICK_RESOLUTIONS[resolution]
+    if end is None:
+        end_ts = int(datetime.now(timezone.utc).timestamp()) // step * step + step
+    else:
+        end_ts = _utc_timestamp(end)
+    start_ts = end_ts - DEFAULT_WINDOWS[resolution] if start is None else _utc_timestamp(start)
+    if start_ts >= end_ts:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="开始时间必须早于结束时间")
+    if (end_ts - start_ts) // step > CLICK_SERIES_MAX_POINTS:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="查询区间包含的时间桶过多")
+
+    points = click_series(
+        db, kind, entity_id, resolution, start_ts, end_ts, hit_counter.pending_buckets(kind, entity_id)
+    )
+    return {
+        "resolution": resolution,
+        "start": datetime.fromtimestamp(points[0][0] if points else start_ts, timezone.utc),
+        "end": datetime.fromtimestamp(end_ts, timezone.utc),
+        "total": sum(hits for _, hits in points),
+        "points": [
+            {"start": datetime.fromtimestamp(bucket, timezone.utc), "hits": hits}
+            for bucket, hits in points
+        ],
+    }
+
+
+def _short_link_target_query(code: str) -> Select:
+    return select(ShortLink.id, ShortLink.target_url, ShortLink.cache_max_age).where(
+        ShortLink.code == code
+    )
+
+
+def _short_link_target_from_row(row: Row | None) -> ShortLinkTarget | None:
+    if row is None:
+        return None
+    return ShortLinkTarget(
+        id=row.id,
+        target_url=row.target_url,
+        cache_control=cache_control_header(row.cache_max_age),
+    )
+
+
+def _fetch_short_link_target(code: str) -> ShortLinkTarget | None:
+    """同步读取短链目标，供未安装异步驱动时在线程池中调用。"""
+
+    with SessionLocal() as db:
+        row = db.execute(_short_link_target_query(code)).first()
+    return _short_link_target_from_row(row)
+
+
+async def _resolve_short_link(code: str, db: AsyncSession | None) -> ShortLinkTarget | None:
+    """按 code 解析短链，优先读取缓存，未命中时在事件循环上异步查询。"""
+
+    target = short_link_cache.get(code)
+    if target is not None:
+        return target
+
+    if not short_codes.loaded:
+        await run_in_threadpool(short_codes.load)
+    if not short_codes.might_exist(code):
+        return None
+
+    generation = short_link_cache.generation
+    membership_generation = short_codes.generation
+    if db is None:
+        target = await run_in_threadpool(_fetch_short_link_target, code)
+    else:
+        row = (await db.execute(_short_link_target_query(code))).first()
+        target = _short_link_target_from_row(row)
+    if target is None:
+        short_codes.remember_missing(code, membership_generation)
+    else:
+        short_link_cache.put(code, target, generation)
+    return target
+
+
 @app.get("/healthz")
 def healthz() -> dict[str, bool]:
     """健康检查端点。"""
@@ -385,28 +678,88 @@ def healthz() -> dict[str, bool]:
     return {"ok": True}
 
 
+@app.get("/api/metrics")
+def runtime_metrics(_admin: User = Depends(require_admin_user)) -> dict[str, Any]:
+    """返回进程内缓存等运行时计数（管理员限定）。"""
+
+    return {
+        "subdomain_routes": {"size": len(subdomain_routes)},
+        "short_link_cache": short_link_cache.stats(),
+        "short_codes": short_codes.stats(),
+        "hit_counter": hit_counter.stats(),
+        "fast_path": dict(fast_path_counters),
+        "data_sync": data_sync.stats(),
+        "credential_cache": credential_cache.stats(),
+        "token_usage": token_usage.stats(),
+        "password_pool": password_pool.stats(),
+        "auth_throttle": auth_throttle.stats(),
+        "summary_cache": summary_cache.stats(),
+        "code_allocator": code_allocator.stats(),
+        "click_compactor": click_compactor.stats(),
+        "nginx_log_ingester": nginx_log_ingester.stats(),
+        "visitor_sketches": visitor_sketches.stats(),
+        "hot_keys": hot_keys.stats(),
+    }
+
+
+@app.get("/api/hot")
+def hot_entries(
+    limit: int = Query(default=20, ge=1, le=100),
+    _admin: User = Depends(require_admin_user),
+) -> dict[str, Any]:
+    """返回本 worker 在 1m/5m/1h 衰减窗口内最热的短链 code 与子域 Host（管理员限定）。"""
+
+    return {
+        "windows": {window: int(tau) for window, tau in HOT_KEY_WINDOWS.items()},
+        "top": hot_keys.snapshot(limit),
+    }
+
+
+@app.get("/api/stats")
+def entity_stats(
+    current_user: User = Depends(require_authenticated_user),
+    db: Session = Depends(get_db),
+) -> dict[str, dict[str, int]]:
+    """返回各类数据的总数与累计访问次数；普通用户仅统计自己名下的数据。"""
+
+    return summary_for(db, current_user)
+
+
 @app.get("/routes", response_model=list[SubdomainRedirectSchema])
 def list_routes(db: Session = Depends(get_db)) -> list[SubdomainRedirect]:
     """公共接口：返回全部子域跳转规则。"""
 
     redirects = db.scalars(select(SubdomainRedirect).order_by(SubdomainRedirect.host)).all()
-    return list(redirects)
+    return hit_counter.overlay("subdomain", redirects)
 
 
 @app.get("/api/links", response_model=list[ShortLinkSchema])
 def list_short_links(
+    response: Response,
+    limit: int | None = Query(default=None, ge=1, le=PAGE_SIZE_MAX),
+    cursor: str | None = Query(default=None),
     current_user: User = Depends(require_authenticated_user),
     db: Session = Depends(get_db),
 ) -> list[ShortLink]:
-    """列出所有短链接。"""
+    """列出短链接，传入 ``limit``/``cursor`` 时按页返回。"""
 
-    query = select(ShortLink).options(selectinload(ShortLink.owner)).order_by(
-        ShortLink.created_at.desc()
-    )
+    query = select(ShortLink).options(selectinload(ShortLink.owner))
     if not current_user.is_admin:
         query = query.where(ShortLink.user_id == current_user.id)
-    links = db.scalars(query).all()
-    return list(links)
+    return hit_counter.overlay("short_link", _list_page(db, query, ShortLink, response, limit, cursor))
+
+
+@app.get("/api/links/search", response_model=list[ShortLinkSchema])
+def search_short_links(
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(default=20, ge=1, le=PAGE_SIZE_MAX),
+    current_user: User = Depends(require_authenticated_user),
+    db: Session = Depends(get_db),
+) -> list[ShortLink]:
+    """按短链编码与目标地址检索，按词前缀匹配。"""
+
+    owner_id = None if current_user.is_admin else current_user.id
+    return hit_counter.overlay("short_link", search(db, SHORT_LINK_SEARCH, q, limit, owner_id))
 
 
 @app.post(
@@ -429,13 +782,19 @@ async def create_short_link(
         if exists:
             raise HTTPException(status.HTTP_409_CONFLICT, detail="短链接编码已存在")
     else:
-        code = _generate_unique_code(db, SHORT_CODE_LEN)
+        code = await _allocate_code(db)
 
     short_link = ShortLink(
-        code=code, target_url=payload.target_url, user_id=current_user.id
+        code=code,
+        target_url=payload.target_url,
+        cache_max_age=payload.cache_max_age,
+        user_id=current_user.id,
     )
     db.add(short_link)
+    record_change(db, ENTITY_SHORT_LINK, code)
     _commit_session(db, conflict_detail="短链接编码已存在")
+    short_link_cache.invalidate(code)
+    short_codes.add(code)
     db.refresh(short_link)
     hx_request = request.headers.get("hx-request") == "true"
     if hx_request:
@@ -454,6 +813,65 @@ async def create_short_link(
     return short_link
 
 
+@app.get("/api/links/export")
+def export_short_links(
+    request: Request,
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$"),
+    since: datetime | None = Query(default=None),
+    owner: str | None = Query(default=None),
+    current_user: User = Depends(require_authenticated_user),
+    db: Session = Depends(get_db),
+) -> StreamingResponse:
+    """流式导出短链及访问次数（NDJSON 或 CSV）。"""
+
+    return _export_response(request, SHORT_LINK_EXPORT, format, since, owner, current_user, db)
+
+
+@app.post("/api/links/import", response_model=ImportResult)
+async def import_short_links(
+    request: Request,
+    format: str | None = Query(default=None),
+    current_user: User = Depends(require_authenticated_user),
+) -> Any:
+    """批量导入短链（CSV 或 NDJSON），code 为空时自动生成。"""
+
+    return await _import_records(request, format, "links", current_user)
+
+
+@app.get("/api/links/{link_id}/clicks", response_model=ClickSeries)
+def short_link_clicks(
+    link_id: int,
+    resolution: str = Query(default="day", pattern="^(minute|hour|day)$"),
+    start: datetime | None = Query(default=None),
+    end: datetime | None = Query(default=None),
+    current_user: User = Depends(require_authenticated_user),
+    db: Session = Depends(get_db),
+) -> dict[str, Any]:
+    """按分钟、小时或天返回短链的点击时间序列。"""
+
+    short_link = db.get(ShortLink, link_id)
+    if short_link is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="短链接不存在")
+    _ensure_short_link_permission(short_link, current_user)
+    return _click_series_response(db, "short_link", link_id, resolution, start, end)
+
+
+@app.get("/api/links/{link_id}/visitors", response_model=VisitorStats)
+def short_link_visitors(
+    link_id: int,
+    days: int = Query(default=30, ge=1, le=VISITOR_DAY_RETENTION_DAYS),
+    current_user: User = Depends(require_authenticated_user),
+    db: Session = Depends(get_db),
+) -> dict[str, Any]:
+    """返回短链独立访客的 HyperLogLog 估计：累计、最近 ``days`` 天合并与逐日值。"""
+
+    short_link = db.get(ShortLink, link_id)
+    if short_link is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="短链接不存在")
+    _ensure_short_link_permission(short_link, current_user)
+    return summarize_visitors(db, link_id, days, pending=visitor_sketches.pending_for(link_id))
+
+
 @app.delete("/api/links/{link_id}")
 def delete_short_link(
     link_id: int,
@@ -468,8 +886,20 @@ def delete_short_link(
     if short_link is None:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="短链接不存在")
     _ensure_short_link_permission(short_link, current_user)
+    code = short_link.code
+    # 删除前后各丢弃一次待写增量与访客草图：前一次等待进行中的写回落库后再随记录删除，
+    # 后一次清掉删除提交前仍在命中的跳转。
+    hit_counter.discard("short_link", link_id)
+    visitor_sketches.discard(link_id)
+    delete_click_buckets(db, "short_link", short_link.id)
+    delete_sketches(db, short_link.id)
     db.delete(short_link)
+    record_change(db, ENTITY_SHORT_LINK, code)
     _commit_session(db)
+    hit_counter.discard("short_link", link_id)
+    visitor_sketches.discard(link_id)
+    short_link_cache.invalidate(code)
+    short_codes.remove(code)
     hx_request = request.headers.get("hx-request") == "true"
     if hx_request:
         message = (
@@ -507,12 +937,19 @@ async def update_short_link(
         if exists:
             raise HTTPException(status.HTTP_409_CONFLICT, detail="短链接编码已存在")
 
+    previous_code = short_link.code
     short_link.code = payload.code
     short_link.target_url = payload.target_url
+    short_link.cache_max_age = payload.cache_max_age
     if short_link.user_id is None:
         short_link.user_id = current_user.id
     db.add(short_link)
+    record_change(db, ENTITY_SHORT_LINK, previous_code, payload.code)
     _commit_session(db, conflict_detail="短链接编码已存在")
+    short_link_cache.invalidate(previous_code, payload.code)
+    if previous_code != payload.code:
+        short_codes.remove(previous_code)
+        short_codes.add(payload.code)
     db.refresh(short_link)
 
     hx_request = request.headers.get("hx-request") == "true"
@@ -536,20 +973,35 @@ async def update_short_link(
     return short_link
 
 
+@app.get("/api/subdomains/search", response_model=list[SubdomainRedirectSchema])
+def search_subdomains(
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(default=20, ge=1, le=PAGE_SIZE_MAX),
+    current_user: User = Depends(require_authenticated_user),
+    db: Session = Depends(get_db),
+) -> list[SubdomainRedirect]:
+    """按 Host 与目标地址检索子域跳转规则。"""
+
+    owner_id = None if current_user.is_admin else current_user.id
+    return hit_counter.overlay("subdomain", search(db, SUBDOMAIN_SEARCH, q, limit, owner_id))
+
+
 @app.get("/api/subdomains", response_model=list[SubdomainRedirectSchema])
 def list_subdomains(
+    response: Response,
+    limit: int | None = Query(default=None, ge=1, le=PAGE_SIZE_MAX),
+    cursor: str | None = Query(default=None),
     current_user: User = Depends(require_authenticated_user),
     db: Session = Depends(get_db),
 ) -> list[SubdomainRedirect]:
-    """列出所有子域跳转规则。"""
+    """列出子域跳转规则，传入 ``limit``/``cursor`` 时按页返回。"""
 
-    query = select(SubdomainRedirect).options(selectinload(SubdomainRedirect.owner)).order_by(
-        SubdomainRedirect.created_at.desc()
-    )
+    query = select(SubdomainRedirect).options(selectinload(SubdomainRedirect.owner))
     if not current_user.is_admin:
         query = query.where(SubdomainRedirect.user_id == current_user.id)
-    redirects = db.scalars(query).all()
-    return list(redirects)
+    return hit_counter.overlay(
+        "subdomain", _list_page(db, query, SubdomainRedirect, response, limit, cursor)
+    )
 
 
 @app.post(
@@ -575,10 +1027,15 @@ async def create_subdomain(
         host=host,
         target_url=payload.target_url,
         code=payload.code,
+        cache_max_age=payload.cache_max_age,
+        cache_immutable=payload.cache_immutable,
         user_id=current_user.id,
     )
     db.add(redirect)
+    record_change(db, ENTITY_SUBDOMAIN, host)
     _commit_session(db, conflict_detail="子域跳转已存在")
+    subdomain_routes.invalidate()
+    nginx_maps.schedule()
     db.refresh(redirect)
 
     hx_request = request.headers.get("hx-request") == "true"
@@ -598,18 +1055,63 @@ async def create_subdomain(
     return redirect
 
 
+@app.get("/api/subdomains/export")
+def export_subdomains(
+    request: Request,
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$"),
+    since: datetime | None = Query(default=None),
+    owner: str | None = Query(default=None),
+    current_user: User = Depends(require_authenticated_user),
+    db: Session = Depends(get_db),
+) -> StreamingResponse:
+    """流式导出子域跳转规则及访问次数（NDJSON 或 CSV）。"""
+
+    return _export_response(request, SUBDOMAIN_EXPORT, format, since, owner, current_user, db)
+
+
+@app.post("/api/subdomains/import", response_model=ImportResult)
+async def import_subdomains(
+    request: Request,
+    format: str | None = Query(default=None),
+    current_user: User = Depends(require_authenticated_user),
+) -> Any:
+    """批量导入子域跳转规则（CSV 或 NDJSON）。"""
+
+    return await _import_records(request, format, "subdomains", current_user)
+
+
+@app.get("/api/subdomains/{redirect_id}/clicks", response_model=ClickSeries)
+def subdomain_clicks(
+    redirect_id: int,
+    resolution: str = Query(default="day", pattern="^(minute|hour|day)$"),
+    start: datetime | None = Query(default=None),
+    end: datetime | None = Query(default=None),
+    current_user: User = Depends(require_authenticated_user),
+    db: Session = Depends(get_db),
+) -> dict[str, Any]:
+    """按分钟、小时或天返回子域跳转的点击时间序列。"""
+
+    redirect = db.get(SubdomainRedirect, redirect_id)
+    if redirect is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="子域跳转不存在")
+    _ensure_subdomain_permission(redirect, current_user)
+    return _click_series_response(db, "subdomain", redirect_id, resolution, start, end)
+
+
 @app.get(
     "/api/users",
     response_model=list[UserSchema],
 )
 def list_users(
+    response: Response,
+    limit: int | None = Query(default=None, ge=1, le=PAGE_SIZE_MAX),
+    cursor: str | None = Query(default=None),
     _admin: User = Depends(require_admin_user),
     db: Session = Depends(get_db),
 ) -> list[User]:
-    """列出全部用户（管理员限定）。"""
+    """列出用户（管理员限定），传入 ``limit``/``cursor`` 时按页返回。"""
 
-    users = db.scalars(select(User).order_by(User.created_at.desc())).all()
-    return list(users)
+    return _list_page(db, select(User), User, response, limit, cursor)
 
 
 @app.post(
@@ -633,10 +1135,16 @@ async def create_user(
     user = User(
         username=payload.username,
         email=payload.email,
-        password_hash=hash_password(payload.password),
+        password_hash=await password_pool.run(hash_password, payload.password),
         is_admin=payload.is_admin,
     )
     db.add(user)
+    try:
+        db.flush()
+    except IntegrityError as exc:
+        db.rollback()
+        raise HTTPException(status.HTTP_409_CONFLICT, detail="用户名已存在") from exc
+    record_change(db, ENTITY_USER, str(user.id))
     _commit_session(db, conflict_detail="用户名已存在")
     db.refresh(user)
 
@@ -687,9 +1195,13 @@ async def update_user(
     user.email = payload.email
     user.is_admin = payload.is_admin
     if payload.password:
-        user.password_hash = hash_password(payload.password)
+        user.password_hash = await password_pool.run(hash_password, payload.password)
+        user.session_version += 1
     db.add(user)
+    record_change(db, ENTITY_USER, str(user.id))
     _commit_session(db, conflict_detail="用户名已存在")
+    credential_cache.invalidate_user(user.id)
+    user_cache.invalidate(user.id)
     db.refresh(user)
 
     hx_request = request.headers.get("hx-request") == "true"
@@ -737,8 +1249,12 @@ def delete_user(
         if not remaining_admins:
             raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="至少保留一位管理员")
 
+    deleted_id = user.id
     db.delete(user)
+    record_change(db, ENTITY_USER, str(deleted_id))
     _commit_session(db)
+    credential_cache.invalidate_user(deleted_id)
+    user_cache.invalidate(deleted_id)
 
     hx_request = request.headers.get("hx-request") == "true"
     if hx_request:
@@ -771,12 +1287,17 @@ async def change_own_password(
     if user is None:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="用户不存在")
 
-    if not verify_password(payload.current_password, user.password_hash):
+    if not await password_pool.run(verify_password, payload.current_password, user.password_hash):
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="原密码不正确")
 
-    user.password_hash = hash_password(payload.new_password)
+    user.password_hash = await password_pool.run(hash_password, payload.new_password)
+    user.session_version += 1
     db.add(user)
+    record_change(db, ENTITY_USER, str(user.id))
     _commit_session(db)
+    credential_cache.invalidate_user(user.id)
+    user_cache.invalidate(user.id)
+    db.refresh(user)
 
     hx_request = request.headers.get("hx-request") == "true"
     if hx_request:
@@ -785,13 +1306,92 @@ async def change_own_password(
             "密码修改成功"
             "</div>"
         )
-        return HTMLResponse(
+        result: Response = HTMLResponse(
             message,
             status_code=status.HTTP_200_OK,
             headers={"HX-Trigger": "password-updated"},
         )
+    else:
+        response.headers["HX-Trigger"] = "password-updated"
+        result = Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    # 改密会使该用户的其他会话失效，为当前浏览器会话签发新版本。
+    if get_session(request).get("user_id") == user.id:
+        establish_session(result, request, user)
+    return result
+
+
+def _ensure_not_token_request(request: Request) -> None:
+    """令牌管理只允许会话或 Basic Auth，避免令牌自行签发新令牌。"""
+
+    if getattr(request.state, "api_token_id", None) is not None:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="请使用账号密码管理 API 令牌")
+
 
-    response.headers["HX-Trigger"] = "password-updated"
+@app.get("/api/tokens", response_model=list[ApiTokenSchema])
+def list_api_tokens(
+    request: Request,
+    current_user: User = Depends(require_authenticated_user),
+    db: Session = Depends(get_db),
+) -> list[ApiToken]:
+    """列出当前用户的 API 令牌，不含令牌明文。"""
+
+    _ensure_not_token_request(request)
+    tokens = db.scalars(
+        select(ApiToken)
+        .where(ApiToken.user_id == current_user.id)
+        .order_by(ApiToken.created_at.desc(), ApiToken.id.desc())
+    ).all()
+    return token_usage.overlay(list(tokens))
+
+
+@app.post(
+    "/api/tokens",
+    response_model=ApiTokenCreated,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_api_token(
+    request: Request,
+    payload: ApiTokenCreate = Depends(_parse_api_token_payload),
+    current_user: User = Depends(require_authenticated_user),
+    db: Session = Depends(get_db),
+) -> dict[str, Any]:
+    """为当前用户签发 API 令牌，明文只在本次响应中返回。"""
+
+    _ensure_not_token_request(request)
+    token = generate_token()
+    expires_at = None
+    if payload.expires_in_days is not None:
+        expires_at = datetime.now(timezone.utc) + timedelta(days=payload.expires_in_days)
+    record = ApiToken(
+        user_id=current_user.id,
+        name=payload.name,
+        token_hash=hash_token(token),
+        scopes=" ".join(payload.scopes),
+        expires_at=expires_at,
+    )
+    db.add(record)
+    _commit_session(db)
+    db.refresh(record)
+    created = ApiTokenSchema.model_validate(record).model_dump()
+    return {**created, "token": token}
+
+
+@app.delete("/api/tokens/{token_id}")
+def delete_api_token(
+    token_id: int,
+    request: Request,
+    current_user: User = Depends(require_authenticated_user),
+    db: Session = Depends(get_db),
+) -> Response:
+    """吊销指定 API 令牌，管理员可吊销任意用户的令牌。"""
+
+    _ensure_not_token_request(request)
+    record = db.get(ApiToken, token_id)
+    if record is None or (record.user_id != current_user.id and not current_user.is_admin):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="令牌不存在")
+    db.delete(record)
+    _commit_session(db)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -809,8 +1409,14 @@ def delete_subdomain(
     if redirect is None:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="子域跳转不存在")
     _ensure_subdomain_permission(redirect, current_user)
+    hit_counter.discard("subdomain", redirect_id)
+    delete_click_buckets(db, "subdomain", redirect.id)
     db.delete(redirect)
+    record_change(db, ENTITY_SUBDOMAIN, redirect.host)
     _commit_session(db)
+    hit_counter.discard("subdomain", redirect_id)
+    subdomain_routes.invalidate()
+    nginx_maps.schedule()
     hx_request = request.headers.get("hx-request") == "true"
     if hx_request:
         message = (
@@ -855,13 +1461,19 @@ async def update_subdomain(
         if exists:
             raise HTTPException(status.HTTP_409_CONFLICT, detail="子域跳转已存在")
 
+    previous_host = redirect.host
     redirect.host = normalized_host
     redirect.target_url = payload.target_url
     redirect.code = payload.code
+    redirect.cache_max_age = payload.cache_max_age
+    redirect.cache_immutable = payload.cache_immutable
     if redirect.user_id is None:
         redirect.user_id = current_user.id
     db.add(redirect)
+    record_change(db, ENTITY_SUBDOMAIN, previous_host, normalized_host)
     _commit_session(db, conflict_detail="子域跳转已存在")
+    subdomain_routes.invalidate()
+    nginx_maps.schedule()
     db.refresh(redirect)
 
     hx_request = request.headers.get("hx-request") == "true"
@@ -885,9 +1497,19 @@ async def update_subdomain(
     return redirect
 
 
-@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "HEAD"])
-def catch_all(
-    request: Request, path: str, db: Session = Depends(get_db)
+_CATCH_ALL_PATH = "/{path:path}"
+
+
+def _redirect_response(url: str, status_code: int, cache_control: str | None) -> RedirectResponse:
+    """生成跳转响应，并按规则附加 ``Cache-Control``。"""
+
+    headers = {"Cache-Control": cache_control} if cache_control else None
+    return RedirectResponse(url, status_code=status_code, headers=headers)
+
+
+@app.api_route(_CATCH_ALL_PATH, methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "HEAD"])
+async def catch_all(
+    request: Request, path: str, db: AsyncSession | None = Depends(get_async_db)
 ) -> Response:
     """根据 Host 匹配子域跳转规则，否则返回 404 文本。"""
 
@@ -896,32 +1518,54 @@ def catch_all(
         return PlainTextResponse("Not Found", status_code=status.HTTP_404_NOT_FOUND)
     host = raw_host.split(":", 1)[0]
 
-    redirect = db.scalar(select(SubdomainRedirect).where(SubdomainRedirect.host == host))
-    if redirect is not None:
-        redirect.hits += 1
-        db.add(redirect)
-        _commit_session(db)
+    if not subdomain_routes.loaded:
+        await run_in_threadpool(subdomain_routes.load)
+    route = subdomain_routes.lookup(host)
+    if route is not None:
+        hit_counter.record_subdomain(route.id)
+        hot_keys.record_host(host)
 
-        destination = _compose_redirect_target(
-            redirect.target_url, path=path, query=request.url.query or ""
+        destination = compose_redirect_target(
+            route.target_url, path=path, query=request.url.query or ""
         )
-        return RedirectResponse(destination, status_code=redirect.code)
+        return _redirect_response(destination, route.code, route.cache_control)
 
     allow_short_link = not BASE_DOMAIN or host == BASE_DOMAIN
 
     if allow_short_link and request.method in {"GET", "HEAD"}:
         code = path.strip("/")
         if code and "/" not in code:
-            short_link = db.scalar(select(ShortLink).where(ShortLink.code == code))
-            if short_link is None:
+            target = await _resolve_short_link(code, db)
+            if target is None:
                 raise HTTPException(status.HTTP_404_NOT_FOUND, detail="短链接不存在")
 
-            short_link.hits += 1
-            db.add(short_link)
-            _commit_session(db)
-
-            return RedirectResponse(
-                short_link.target_url, status_code=status.HTTP_302_FOUND
+            hit_counter.record_short_link(target.id)
+            hot_keys.record_code(code)
+            visitor_sketches.record(target.id, client_ip(request), request.headers.get("user-agent"))
+            return _redirect_response(
+                target.target_url, status.HTTP_302_FOUND, target.cache_control
             )
 
     return PlainTextResponse("Not Found", status_code=status.HTTP_404_NOT_FOUND)
+
+
+def _reserved_path_segments(routes: list[Any]) -> set[str]:
+    """收集已注册路由的首段路径，快速通道不得拦截这些请求。"""
+
+    segments: set[str] = set()
+    for route in routes:
+        route_path = getattr(route, "path", "")
+        if not route_path or route_path == _CATCH_ALL_PATH:
+            continue
+        first = route_path.lstrip("/").split("/", 1)[0]
+        if first and "{" not in first:
+            segments.add(first)
+    return segments
+
+
+app.add_middleware(SessionRefreshMiddleware)
+app.add_middleware(
+    RedirectFastPath,
+    reserved_segments=_reserved_path_segments(app.routes),
+    base_domain=BASE_DOMAIN,
+)
@@ -9,7 +9,9 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     String,
     create_engine,
     func,
@@ -17,6 +19,7 @@ from sqlalchemy import (
     text,
 )
 from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, sessionmaker
 
 
@@ -64,16 +67,52 @@ engine = create_engine(
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
 
+def _derive_async_database_url(database_url: str) -> str | None:
+    """Map the synchronous database URL to its asyncio driver when one is known."""
+
+    url = make_url(database_url)
+    if url.drivername in {"sqlite", "sqlite+pysqlite"}:
+        return url.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    return None
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", "").strip() or _derive_async_database_url(
+    DATABASE_URL
+)
+
+
+def _create_async_engine(database_url: str | None) -> AsyncEngine | None:
+    """Create the asyncio engine, or return ``None`` when the driver is unavailable."""
+
+    if not database_url:
+        return None
+    try:
+        return create_async_engine(database_url, echo=False)
+    except ImportError:  # pragma: no cover - 未安装 aiosqlite 等异步驱动
+        return None
+
+
+async_engine = _create_async_engine(ASYNC_DATABASE_URL)
+
+AsyncSessionLocal: async_sessionmaker[AsyncSession] | None = (
+    async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    if async_engine is not None
+    else None
+)
+
+
 class User(Base):
     """系统用户表，支持管理员与普通用户。"""
 
     __tablename__ = "users"
+    __table_args__ = (Index("ix_users_created_at_id", "created_at", "id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     username: Mapped[str] = mapped_column(String(255), unique=True, nullable=False, index=True)
     email: Mapped[str] = mapped_column(String(255), nullable=False)
     password_hash: Mapped[str] = mapped_column(String(512), nullable=False)
     is_admin: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    session_version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -82,12 +121,19 @@ class User(Base):
     subdomain_redirects: Mapped[list["SubdomainRedirect"]] = relationship(
         back_populates="owner"
     )
+    api_tokens: Mapped[list["ApiToken"]] = relationship(
+        back_populates="owner", cascade="all, delete-orphan"
+    )
 
 
 class SubdomainRedirect(Base):
     """子域名重定向规则。"""
 
     __tablename__ = "subdomain_redirects"
+    __table_args__ = (
+        Index("ix_subdomain_redirects_created_at_id", "created_at", "id"),
+        Index("ix_subdomain_redirects_user_created_at_id", "user_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     host: Mapped[str] = mapped_column(String(255), unique=True, index=True)
@@ -97,6 +143,8 @@ class SubdomainRedirect(Base):
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
     hits: Mapped[int] = mapped_column("hits_int", Integer, default=0, nullable=False)
+    cache_max_age: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    cache_immutable: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     user_id: Mapped[int | None] = mapped_column(
         Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True
     )
@@ -112,6 +160,10 @@ class ShortLink(Base):
     """短链接记录表。"""
 
     __tablename__ = "short_links"
+    __table_args__ = (
+        Index("ix_short_links_created_at_id", "created_at", "id"),
+        Index("ix_short_links_user_created_at_id", "user_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     code: Mapped[str] = mapped_column(String(64), unique=True, index=True)
@@ -120,6 +172,7 @@ class ShortLink(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
+    cache_max_age: Mapped[int | None] = mapped_column(Integer, nullable=True)
     user_id: Mapped[int | None] = mapped_column(
         Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True
     )
@@ -131,6 +184,102 @@ class ShortLink(Base):
         return self.owner.username if self.owner else None
 
 
+class ApiToken(Base):
+    """用户 API 令牌，只保存令牌的 SHA-256 摘要。"""
+
+    __tablename__ = "api_tokens"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    token_hash: Mapped[str] = mapped_column(String(64), unique=True, nullable=False, index=True)
+    scopes: Mapped[str] = mapped_column(String(64), nullable=False, default="read write")
+    expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_used_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    owner: Mapped[User] = relationship(back_populates="api_tokens")
+
+
+class DataChange(Base):
+    """数据变更日志，自增主键即全局数据版本号。
+
+    每次短链、子域或用户写入都在同一事务中追加一行，多个 worker 通过轮询
+    最大 ID 发现其他进程的写入，并只失效受影响的缓存键。
+    """
+
+    __tablename__ = "data_changes"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    entity: Mapped[str] = mapped_column(String(32), nullable=False)
+    key: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
+class CodeSequence(Base):
+    """短链编码分配器使用的序列，各 worker 按块预留取值区间。"""
+
+    __tablename__ = "code_sequences"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    next_value: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class ClickBucketColumns:
+    """点击分桶表的公共列：按 ``(kind, entity_id, bucket_start)`` 聚集存储。
+
+    ``kind`` 为 ``short_link`` 或 ``subdomain``，``bucket_start`` 为桶起点的
+    UTC Unix 秒。表使用 ``WITHOUT ROWID``，主键即数据本身，按实体与时间范围
+    的查询只需一次主键范围扫描。
+    """
+
+    kind: Mapped[str] = mapped_column(String(16), primary_key=True)
+    entity_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    bucket_start: Mapped[int] = mapped_column(Integer, primary_key=True)
+    hits: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class ClickMinute(ClickBucketColumns, Base):
+    """按分钟聚合的点击数，超过保留期后汇总到小时表。"""
+
+    __tablename__ = "click_minutes"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class ClickHour(ClickBucketColumns, Base):
+    """按小时聚合的点击数，超过保留期后汇总到天表。"""
+
+    __tablename__ = "click_hours"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class ClickDay(ClickBucketColumns, Base):
+    """按天（UTC）聚合的点击数，长期保留。"""
+
+    __tablename__ = "click_days"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class VisitorSketch(Base):
+    """短链独立访客的 HyperLogLog 寄存器，按天保存，``day = 0`` 为累计值。
+
+    ``registers`` 为 zlib 压缩后的寄存器数组，访客较少时大部分寄存器为零，
+    压缩后只有几十到几百字节。
+    """
+
+    __tablename__ = "visitor_sketches"
+
+    link_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    day: Mapped[int] = mapped_column(Integer, primary_key=True)
+    registers: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+
 def ensure_subdomain_hits_column() -> None:
     """Ensure the legacy databases have the hits column for subdomain redirects."""
 
@@ -170,3 +319,55 @@ def ensure_user_association_columns() -> None:
                 )
             )
 
+
+
+def ensure_user_session_version_column() -> None:
+    """Ensure legacy user tables have the session_version column."""
+
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("users")}
+    if "session_version" in columns:
+        return
+
+    with engine.begin() as connection:
+        connection.execute(
+            text("ALTER TABLE users ADD COLUMN session_version INTEGER NOT NULL DEFAULT 0")
+        )
+
+
+def ensure_cache_policy_columns() -> None:
+    """Ensure legacy tables have the per-rule Cache-Control columns."""
+
+    inspector = inspect(engine)
+    statements: list[str] = []
+
+    short_link_columns = {
+        column["name"] for column in inspector.get_columns("short_links")
+    }
+    if "cache_max_age" not in short_link_columns:
+        statements.append("ALTER TABLE short_links ADD COLUMN cache_max_age INTEGER")
+
+    subdomain_columns = {
+        column["name"] for column in inspector.get_columns("subdomain_redirects")
+    }
+    if "cache_max_age" not in subdomain_columns:
+        statements.append("ALTER TABLE subdomain_redirects ADD COLUMN cache_max_age INTEGER")
+    if "cache_immutable" not in subdomain_columns:
+        statements.append(
+            "ALTER TABLE subdomain_redirects ADD COLUMN cache_immutable BOOLEAN NOT NULL DEFAULT 0"
+        )
+
+    if not statements:
+        return
+    with engine.begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement))
+
+
+def ensure_pagination_indexes() -> None:
+    """Ensure legacy tables have the composite indexes used by keyset pagination."""
+
+    for table in (User.__table__, SubdomainRedirect.__table__, ShortLink.__table__):
+        for index in table.indexes:
+            if len(index.columns) > 1:
+                index.create(bind=engine, checkfirst=True)
@@ -0,0 +1,320 @@
+"""把子域跳转规则导出为 Nginx ``map`` 片段，使 Nginx 直接返回 30x。
+
+生成四个片段文件，由 ``infra/nginx/conf.d/yetla.upstream.conf`` 中的
+``map`` 块 ``include``：
+
+- ``redirects-301.map`` / ``redirects-302.map``：Host → 目标地址；
+- ``redirect-ids.map``：Host → 规则 ID，配合 ``yetla_redirects`` 日志格式
+  记录命中，再由 :class:`LogIngester` 按 ``NGINX_ACCESS_LOG`` 定期（或
+  ``ingest-log`` 子命令）批量回写 ``hits_int`` 与点击分桶；
+- ``redirect-cache-control.map``：Host → 规则配置的 ``Cache-Control`` 值。
+
+目标地址含查询串或 Nginx 特殊字符的规则不会导出，仍由后端处理。
+
+命令行用法::
+
+    python -m app.nginx_map export [--output-dir DIR] [--reload]
+    python -m app.nginx_map ingest-log /data/nginx/logs/redirects.log
+"""
+from __future__ import annotations
+
+import argparse
+import fcntl
+import logging
+import os
+import re
+import shlex
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Sequence
+
+from .cache import SubdomainRoute, route_from_row, select_routes
+from .hits import HitCounter
+from .models import SessionLocal
+
+NGINX_MAP_DIR = os.getenv("NGINX_MAP_DIR", "").strip()
+NGINX_RELOAD_COMMAND = os.getenv("NGINX_RELOAD_COMMAND", "").strip()
+NGINX_MAP_DEBOUNCE = float(os.getenv("NGINX_MAP_DEBOUNCE", "1"))
+NGINX_ACCESS_LOG = os.getenv("NGINX_ACCESS_LOG", "").strip()
+NGINX_LOG_INGEST_INTERVAL = float(os.getenv("NGINX_LOG_INGEST_INTERVAL", "30"))
+
+MAP_FILES = {
+    301: "redirects-301.map",
+    302: "redirects-302.map",
+}
+ID_MAP_FILE = "redirect-ids.map"
+CACHE_CONTROL_MAP_FILE = "redirect-cache-control.map"
+
+_HOST_PATTERN = re.compile(r"^(\*\.)?[a-z0-9-]+(\.[a-z0-9-]+)*$")
+_UNSAFE_TARGET = re.compile(r"[\s\"'\\;${}?#]")
+
+logger = logging.getLogger(__name__)
+
+
+def exportable(route: SubdomainRoute) -> bool:
+    """判断规则能否交给 Nginx 处理，且跳转结果与后端一致。"""
+
+    return (
+        route.code in MAP_FILES
+        and bool(_HOST_PATTERN.match(route.host))
+        and route.target_url.startswith(("http://", "https://"))
+        and not _UNSAFE_TARGET.search(route.target_url)
+    )
+
+
+def render_maps(routes: Iterable[SubdomainRoute]) -> dict[str, str]:
+    """渲染各 map 片段的文本内容，返回文件名 → 内容。"""
+
+    lines: dict[str, list[str]] = {
+        name: [] for name in (*MAP_FILES.values(), ID_MAP_FILE, CACHE_CONTROL_MAP_FILE)
+    }
+    for route in sorted(routes, key=lambda item: item.host):
+        if not exportable(route):
+            continue
+        # 与 compose_redirect_target 一致：目标地址去掉尾部斜杠后拼接请求路径。
+        target = route.target_url.rstrip("/")
+        lines[MAP_FILES[route.code]].append(f'{route.host} "{target}";')
+        lines[ID_MAP_FILE].append(f"{route.host} {route.id};")
+        if route.cache_control:
+            lines[CACHE_CONTROL_MAP_FILE].append(f'{route.host} "{route.cache_control}";')
+
+    header = "# 由 app.nginx_map 自动生成，请勿手工修改。\n"
+    return {name: header + "".join(f"{line}\n" for line in entries) for name, entries in lines.items()}
+
+
+def load_routes() -> list[SubdomainRoute]:
+    with SessionLocal() as session:
+        rows = session.execute(select_routes()).all()
+    return [route_from_row(row) for row in rows]
+
+
+def _write_atomic(path: Path, content: str) -> bool:
+    """原子替换文件内容，内容未变化时不写入，返回是否发生写入。"""
+
+    try:
+        if path.read_text(encoding="utf-8") == content:
+            return False
+    except FileNotFoundError:
+        pass
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(content)
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return True
+
+
+def write_maps(output_dir: str | Path, routes: Iterable[SubdomainRoute] | None = None) -> bool:
+    """把规则写入 ``output_dir``，返回是否有文件发生变化。"""
+
+    directory = Path(output_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    rendered = render_maps(load_routes() if routes is None else routes)
+    changed = False
+    for name, content in rendered.items():
+        changed |= _write_atomic(directory / name, content)
+    return changed
+
+
+def reload_nginx(command: str = NGINX_RELOAD_COMMAND) -> bool:
+    """执行配置的重载命令，失败只记录日志，不影响已生效的旧配置。"""
+
+    if not command:
+        return False
+    try:
+        subprocess.run(shlex.split(command), check=True, timeout=30, capture_output=True)
+    except (OSError, subprocess.SubprocessError):
+        logger.exception("nginx reload command failed: %s", command)
+        return False
+    return True
+
+
+class MapExporter:
+    """子域写入后在后台线程中防抖地重新生成 map 并触发重载。"""
+
+    def __init__(self, output_dir: str, reload_command: str, debounce: float) -> None:
+        self._output_dir = output_dir
+        self._reload_command = reload_command
+        self._debounce = debounce
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._output_dir)
+
+    def schedule(self) -> None:
+        """请求一次导出；短时间内的多次写入合并为一次。"""
+
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="yetla-nginx-map", daemon=True
+                )
+                self._thread.start()
+        self._wake.set()
+
+    def export(self) -> None:
+        try:
+            if write_maps(self._output_dir):
+                reload_nginx(self._reload_command)
+        except Exception:  # pragma: no cover - 依赖文件系统与数据库环境
+            logger.exception("failed to export nginx redirect maps")
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._debounce > 0:
+                time.sleep(self._debounce)
+                self._wake.clear()
+            self.export()
+
+
+nginx_maps = MapExporter(NGINX_MAP_DIR, NGINX_RELOAD_COMMAND, NGINX_MAP_DEBOUNCE)
+
+
+def ingest_access_log(log_path: str | Path, state_path: str | Path | None = None) -> int:
+    """读取 ``yetla_redirects`` 格式的访问日志增量并回写命中数。
+
+    日志每行为规则 ID 与可选的 ``$msec`` 请求时间（缺省时按读取时间分桶）；
+    已读取的偏移量保存在 ``state_path``（默认 ``<log>.offset``），日志被轮转
+    （文件变小）后从头读取。多个 worker 或命令行同时调用时按偏移量文件
+    加锁串行执行，同一段日志只会被回写一次。
+    """
+
+    log_file = Path(log_path)
+    state_file = Path(state_path) if state_path else log_file.with_name(log_file.name + ".offset")
+    with open(state_file.with_name(state_file.name + ".lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return _ingest(log_file, state_file)
+
+
+def _ingest(log_file: Path, state_file: Path) -> int:
+    try:
+        offset = int(state_file.read_text().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        offset = 0
+    if not log_file.exists():
+        return 0
+    if log_file.stat().st_size < offset:
+        offset = 0
+
+    counter = HitCounter(interval=0, threshold=1)
+    with log_file.open("rb") as handle:
+        handle.seek(offset)
+        for raw in handle:
+            if not raw.endswith(b"\n"):
+                # 尚未写完整的最后一行留到下次读取。
+                break
+            offset += len(raw)
+            fields = raw.split()
+            if not fields or not fields[0].isdigit():
+                continue
+            try:
+                at = float(fields[1]) if len(fields) > 1 else None
+            except ValueError:
+                at = None
+            counter.record("subdomain", int(fields[0]), at=at)
+
+    total = counter.flush()
+    if counter.stats()["pending"]:
+        raise RuntimeError("写回命中数失败，偏移量未更新")
+    state_file.write_text(str(offset))
+    return total
+
+
+class LogIngester:
+    """按固定间隔在后台线程中回写 Nginx 访问日志中的命中。"""
+
+    def __init__(self, log_path: str, interval: float) -> None:
+        self._log_path = log_path
+        self._interval = interval
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.runs = 0
+        self.ingested = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._log_path) and self._interval > 0
+
+    def ingest(self) -> int:
+        try:
+            total = ingest_access_log(self._log_path)
+        except Exception:  # pragma: no cover - 依赖文件系统与数据库环境
+            self.failures += 1
+            logger.exception("failed to ingest nginx access log %s", self._log_path)
+            return 0
+        self.runs += 1
+        self.ingested += total
+        return total
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self._interval):
+            self.ingest()
+
+    def start(self) -> None:
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="yetla-nginx-log", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程并回写最后一批日志。"""
+
+        self._stopping.set()
+        thread = self._thread
+        self._thread = None
+        if thread is not None:
+            thread.join(timeout=max(self._interval, 1.0) * 2)
+            self.ingest()
+
+    def stats(self) -> dict[str, int]:
+        return {"runs": self.runs, "ingested": self.ingested, "failures": self.failures}
+
+
+nginx_log_ingester = LogIngester(NGINX_ACCESS_LOG, NGINX_LOG_INGEST_INTERVAL)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.nginx_map", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="导出子域规则为 Nginx map 片段")
+    export_parser.add_argument("--output-dir", default=NGINX_MAP_DIR or "/data/nginx")
+    export_parser.add_argument("--reload", action="store_true", help="文件变化时执行 NGINX_RELOAD_COMMAND")
+
+    ingest_parser = commands.add_parser("ingest-log", help="从 Nginx 访问日志回写命中数")
+    ingest_parser.add_argument("log_path", nargs="?", default=NGINX_ACCESS_LOG or None)
+    ingest_parser.add_argument("--state", default=None, help="偏移量文件，默认 <log>.offset")
+
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        changed = write_maps(args.output_dir)
+        print("changed" if changed else "unchanged")
+        if changed and args.reload:
+            return 0 if reload_nginx() else 1
+        return 0
+
+    if not args.log_path:
+        parser.error("log_path is required when NGINX_ACCESS_LOG is not set")
+    total = ingest_access_log(args.log_path, args.state)
+    print(f"ingested {total} hits")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover - 命令行入口
+    raise SystemExit(main())
@@ -0,0 +1,69 @@
+"""基于 ``(created_at, id)`` 的键集分页。
+
+列表按创建时间倒序返回，游标记录上一页最后一行的排序键，下一页只需在
+复合索引上做一次范围扫描，开销与翻到第几页无关。
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+import os
+from typing import Any
+
+from sqlalchemy import Select, String, tuple_, type_coerce
+from sqlalchemy.orm import Session
+
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "1000"))
+ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "50"))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    """游标无法解析。"""
+
+
+def encode_cursor(created_at: str, row_id: int) -> str:
+    raw = json.dumps([created_at, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+    if not isinstance(created_at, str) or not isinstance(row_id, int):
+        raise InvalidCursor(cursor)
+    return created_at, row_id
+
+
+def keyset_page(
+    db: Session,
+    query: Select,
+    model: Any,
+    limit: int,
+    cursor: str | None = None,
+) -> tuple[list[Any], str | None]:
+    """按 ``created_at DESC, id DESC`` 读取一页，返回结果与下一页游标。
+
+    排序键按数据库中存储的原始文本比较与编码：SQLite 的 ``CURRENT_TIMESTAMP``
+    与 Python 写入的时间精度不同，转换成 ``datetime`` 再绑定会导致同一时刻
+    的行在翻页边界上重复或遗漏。
+    """
+
+    created_at = type_coerce(model.created_at, String)
+    query = query.add_columns(created_at.label("cursor_created_at")).order_by(
+        model.created_at.desc(), model.id.desc()
+    )
+    if cursor:
+        after_created_at, after_id = decode_cursor(cursor)
+        query = query.where(tuple_(created_at, model.id) < tuple_(after_created_at, after_id))
+    rows = db.execute(query.limit(limit + 1)).all()
+    items = [row[0] for row in rows[:limit]]
+    if len(rows) <= limit:
+        return items, None
+    last_item, last_created_at = rows[limit - 1]
+    return items, encode_cursor(last_created_at, last_item.id)
@@ -1,20 +1,42 @@
 """Pydantic schema 定义。"""
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 
-from pydantic import BaseModel, Field, ValidationInfo, field_validator
+from pydantic import BaseModel, Field, ValidationInfo, field_validator, model_validator
+
+
+def _blank_to_none(value: object) -> object:
+    """表单中留空的可选数字字段按未设置处理。"""
+
+    if isinstance(value, str) and not value.strip():
+        return None
+    return value
 
 
 class SubdomainRedirectBase(BaseModel):
-    host: str = Field(..., description="例如 api.yet.la")
+    host: str = Field(..., description="例如 api.yet.la，或通配规则 *.docs.yet.la")
     target_url: str = Field(..., description="完整跳转地址")
     code: int = Field(default=302, description="HTTP 状态码")
+    cache_max_age: int | None = Field(
+        default=None, ge=0, description="Cache-Control max-age 秒数，0 表示 no-store，空为不缓存声明"
+    )
+    cache_immutable: bool = Field(default=False, description="附加 immutable，仅限 301")
+
+    @field_validator("cache_max_age", mode="before")
+    @classmethod
+    def _normalize_cache_max_age(cls, value: object) -> object:
+        return _blank_to_none(value)
 
     @field_validator("host")
     @classmethod
     def _normalize_host(cls, value: str) -> str:
-        return value.strip().lower()
+        normalized = value.strip().lower()
+        if "*" in normalized:
+            suffix = normalized[2:]
+            if not normalized.startswith("*.") or not suffix or "*" in suffix:
+                raise ValueError("通配符仅支持以 *. 开头，例如 *.docs.yet.la")
+        return normalized
 
     @field_validator("code")
     @classmethod
@@ -23,6 +45,12 @@ class SubdomainRedirectBase(BaseModel):
             raise ValueError("仅支持 301 或 302 重定向")
         return value
 
+    @model_validator(mode="after")
+    def _validate_cache_policy(self) -> "SubdomainRedirectBase":
+        if self.cache_immutable and (self.code != 301 or not self.cache_max_age):
+            raise ValueError("immutable 仅适用于设置了 max-age 的 301 跳转")
+        return self
+
 
 class SubdomainRedirect(SubdomainRedirectBase):
     id: int = Field(..., description="数据库主键")
@@ -44,6 +72,14 @@ class SubdomainRedirectUpdate(SubdomainRedirectBase):
 
 class ShortLinkBase(BaseModel):
     target_url: str = Field(..., description="目标地址")
+    cache_max_age: int | None = Field(
+        default=None, ge=0, description="Cache-Control max-age 秒数，0 表示 no-store，空为不缓存声明"
+    )
+
+    @field_validator("cache_max_age", mode="before")
+    @classmethod
+    def _normalize_cache_max_age(cls, value: object) -> object:
+        return _blank_to_none(value)
 
 
 class ShortLinkCreate(ShortLinkBase):
@@ -158,3 +194,98 @@ class PasswordChange(BaseModel):
             raise ValueError("两次输入的密码不一致")
         return value
 
+
+class ApiTokenCreate(BaseModel):
+    name: str = Field(..., description="令牌用途说明")
+    scopes: list[str] = Field(default_factory=lambda: ["read", "write"], description="权限范围")
+    expires_in_days: int | None = Field(default=None, ge=1, description="有效天数，空为永不过期")
+
+    @field_validator("name")
+    @classmethod
+    def _normalize_name(cls, value: str) -> str:
+        normalized = value.strip()
+        if not normalized:
+            raise ValueError("令牌名称不能为空")
+        return normalized
+
+    @field_validator("scopes", mode="before")
+    @classmethod
+    def _split_scopes(cls, value: object) -> object:
+        if isinstance(value, str):
+            return value.replace(",", " ").split()
+        return value
+
+    @field_validator("scopes")
+    @classmethod
+    def _validate_scopes(cls, value: list[str]) -> list[str]:
+        scopes = sorted({scope.strip().lower() for scope in value if scope.strip()})
+        if not scopes or any(scope not in {"read", "write"} for scope in scopes):
+            raise ValueError("权限范围仅支持 read 与 write")
+        return scopes
+
+    @field_validator("expires_in_days", mode="before")
+    @classmethod
+    def _normalize_expires(cls, value: object) -> object:
+        return _blank_to_none(value)
+
+
+class ApiToken(BaseModel):
+    id: int
+    name: str
+    scopes: list[str]
+    expires_at: datetime | None = None
+    last_used_at: datetime | None = None
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+    @field_validator("scopes", mode="before")
+    @classmethod
+    def _split_scopes(cls, value: object) -> object:
+        if isinstance(value, str):
+            return value.split()
+        return value
+
+
+class ApiTokenCreated(ApiToken):
+    token: str = Field(..., description="令牌明文，仅在创建时返回一次")
+
+
+class ImportRowError(BaseModel):
+    line: int = Field(..., description="出错的行号")
+    key: str | None = Field(default=None, description="短链编码或 Host")
+    error: str = Field(..., description="错误说明")
+
+
+class ImportResult(BaseModel):
+    total: int = Field(..., description="读取的记录数")
+    created: int = Field(..., description="成功创建的记录数")
+    failed: int = Field(..., description="失败的记录数")
+    errors: list[ImportRowError] = Field(default_factory=list, description="逐行错误报告")
+    errors_truncated: bool = Field(default=False, description="错误过多时只保留前若干条")
+
+    model_config = {"from_attributes": True}
+
+
+class ClickPoint(BaseModel):
+    start: datetime = Field(..., description="桶起点（UTC）")
+    hits: int = Field(..., description="该时间桶内的点击数")
+
+
+class ClickSeries(BaseModel):
+    resolution: str = Field(..., description="时间粒度：minute、hour 或 day")
+    start: datetime = Field(..., description="第一个桶的起点（UTC）")
+    end: datetime = Field(..., description="查询区间的结束时间（不含）")
+    total: int = Field(..., description="区间内的点击总数")
+    points: list[ClickPoint] = Field(default_factory=list, description="按时间升序的分桶点击数")
+
+
+class VisitorDay(BaseModel):
+    day: date = Field(..., description="日期（UTC）")
+    uniques: int = Field(..., description="当天独立访客估计值")
+
+
+class VisitorStats(BaseModel):
+    total: int = Field(..., description="累计独立访客估计值")
+    window_uniques: int = Field(..., description="查询窗口内合并去重后的独立访客估计值")
+    days: list[VisitorDay] = Field(default_factory=list, description="按日期升序的逐日估计值")
@@ -0,0 +1,153 @@
+"""短链与子域规则的全文检索。
+
+SQLite 支持 FTS5 时为 ``short_links`` 与 ``subdomain_redirects`` 各建一张
+外部内容虚表，由触发器在增删改时同步，查询按词前缀匹配并以 ``rank`` 排序；
+不支持 FTS5 时退回 ``LIKE`` 子串匹配。
+"""
+from __future__ import annotations
+
+import re
+import sqlite3
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import DDL, column, event, inspect, or_, select, table, text
+from sqlalchemy.orm import Session, selectinload
+
+from .models import ShortLink, SubdomainRedirect, engine
+
+SEARCH_TERM_LIMIT = 8
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def _fts5_supported() -> bool:
+    connection = sqlite3.connect(":memory:")
+    try:
+        connection.execute("CREATE VIRTUAL TABLE probe USING fts5(value)")
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        connection.close()
+    return True
+
+
+FTS5_AVAILABLE = _fts5_supported()
+
+
+@dataclass(frozen=True)
+class SearchSpec:
+    model: Any
+    fts_table: str
+    columns: tuple[str, ...]
+
+    def create_statements(self) -> list[str]:
+        source = self.model.__tablename__
+        columns = ", ".join(self.columns)
+        new_values = ", ".join(f"new.{name}" for name in self.columns)
+        old_values = ", ".join(f"old.{name}" for name in self.columns)
+        delete_old = (
+            f"INSERT INTO {self.fts_table}({self.fts_table}, rowid, {columns}) "
+            f"VALUES ('delete', old.id, {old_values});"
+        )
+        insert_new = f"INSERT INTO {self.fts_table}(rowid, {columns}) VALUES (new.id, {new_values});"
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_table} USING fts5("
+            f"{columns}, content='{source}', content_rowid='id', prefix='2 3')",
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ai AFTER INSERT ON {source} "
+            f"BEGIN {insert_new} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ad AFTER DELETE ON {source} "
+            f"BEGIN {delete_old} END",
+            # 只监听被索引的列，批量写回 hits 不会触发索引重写。
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_au AFTER UPDATE OF {columns} ON {source} "
+            f"BEGIN {delete_old} {insert_new} END",
+        ]
+
+
+SHORT_LINK_SEARCH = SearchSpec(ShortLink, "short_links_fts", ("code", "target_url"))
+SUBDOMAIN_SEARCH = SearchSpec(SubdomainRedirect, "subdomain_redirects_fts", ("host", "target_url"))
+SEARCH_SPECS = (SHORT_LINK_SEARCH, SUBDOMAIN_SEARCH)
+
+
+def _register_ddl(spec: SearchSpec) -> None:
+    source_table = spec.model.__table__
+    for statement in spec.create_statements():
+        event.listen(
+            source_table,
+            "after_create",
+            DDL(statement).execute_if(dialect="sqlite", callable_=lambda *_, **__: FTS5_AVAILABLE),
+        )
+    event.listen(
+        source_table,
+        "after_drop",
+        DDL(f"DROP TABLE IF EXISTS {spec.fts_table}").execute_if(dialect="sqlite"),
+    )
+
+
+for _spec in SEARCH_SPECS:
+    _register_ddl(_spec)
+
+
+def ensure_search_index() -> None:
+    """为旧库补建检索虚表与触发器，新建的虚表从源表整体重建一次。"""
+
+    if not FTS5_AVAILABLE or engine.dialect.name != "sqlite":
+        return
+    existing = set(inspect(engine).get_table_names())
+    with engine.begin() as connection:
+        for spec in SEARCH_SPECS:
+            for statement in spec.create_statements():
+                connection.execute(text(statement))
+            if spec.fts_table not in existing:
+                connection.execute(
+                    text(f"INSERT INTO {spec.fts_table}({spec.fts_table}) VALUES ('rebuild')")
+                )
+
+
+def match_expression(query: str) -> str | None:
+    """把用户输入转换为 FTS5 查询：每个词按前缀匹配，多个词之间为 AND。"""
+
+    terms = _TERM.findall(query)[:SEARCH_TERM_LIMIT]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search(
+    db: Session,
+    spec: SearchSpec,
+    query: str,
+    limit: int,
+    owner_id: int | None = None,
+) -> list[Any]:
+    """检索短链或子域规则，``owner_id`` 不为空时只返回该用户名下的记录。"""
+
+    model = spec.model
+    statement = select(model).options(selectinload(model.owner))
+    if owner_id is not None:
+        statement = statement.where(model.user_id == owner_id)
+
+    if FTS5_AVAILABLE:
+        expression = match_expression(query)
+        if expression is None:
+            return []
+        fts = table(spec.fts_table, column("rowid"), column("rank"))
+        statement = (
+            statement.join(fts, fts.c.rowid == model.id)
+            .where(text(f"{spec.fts_table} MATCH :expression").bindparams(expression=expression))
+            .order_by(fts.c.rank)
+        )
+    else:
+        needle = query.strip()
+        if not needle:
+            return []
+        pattern = f"%{_escape_like(needle)}%"
+        statement = statement.where(
+            or_(*(getattr(model, name).ilike(pattern, escape="\\") for name in spec.columns))
+        ).order_by(model.created_at.desc(), model.id.desc())
+
+    return list(db.scalars(statement.limit(limit)).all())
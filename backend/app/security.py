@@ -1,14 +1,28 @@
 """密码哈希与校验工具。"""
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import hmac
+import os
 import secrets
-from typing import Final
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Final, TypeVar
 
 _HASH_ALGORITHM: Final = "sha256"
 _DEFAULT_ITERATIONS: Final = 600_000
 
+CREDENTIAL_CACHE_TTL = float(os.getenv("CREDENTIAL_CACHE_TTL", "60"))
+CREDENTIAL_CACHE_SIZE = int(os.getenv("CREDENTIAL_CACHE_SIZE", "1024"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "16"))
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))
+
+_T = TypeVar("_T")
+
 
 class PasswordFormatError(ValueError):
     """Raised when a stored password hash cannot be parsed."""
@@ -72,3 +86,156 @@ def rehash_password(password: str, stored_hash: str) -> str:
     if not needs_rehash(stored_hash):
         return stored_hash
     return hash_password(password)
+
+
+class PasswordPoolBusy(RuntimeError):
+    """Raised when the password hashing pool has no free slot or queue space."""
+
+
+class PasswordWorkPool:
+    """Bounded thread pool that runs every PBKDF2 computation.
+
+    ``hashlib.pbkdf2_hmac`` releases the GIL, so a small thread pool gives
+    real parallelism while keeping key derivation off the event loop. At
+    most ``max_workers + max_queue`` jobs may be admitted; further work is
+    rejected immediately with :class:`PasswordPoolBusy` so a login storm
+    degrades only password-bound requests.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int) -> None:
+        self._max_workers = max(max_workers, 1)
+        self._limit = self._max_workers + max(max_queue, 0)
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.peak = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _submit(self, func: Callable[..., _T], *args: Any) -> Future[_T]:
+        with self._lock:
+            if self._in_flight >= self._limit:
+                self.rejected += 1
+                raise PasswordPoolBusy("password hashing pool is saturated")
+            self._in_flight += 1
+            self.peak = max(self.peak, self._in_flight)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix="yetla-password"
+                )
+            executor = self._executor
+        try:
+            future = executor.submit(func, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self.completed += 1
+
+    def call(self, func: Callable[..., _T], *args: Any) -> _T:
+        """Run ``func`` in the pool and block the calling worker thread."""
+
+        return self._submit(func, *args).result()
+
+    async def run(self, func: Callable[..., _T], *args: Any) -> _T:
+        """Run ``func`` in the pool without blocking the event loop."""
+
+        return await asyncio.wrap_future(self._submit(func, *args))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self._max_workers,
+                "limit": self._limit,
+                "in_flight": self._in_flight,
+                "peak": self.peak,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+password_pool = PasswordWorkPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE)
+
+
+class VerifiedCredentialCache:
+    """Short-lived cache of successful password verifications.
+
+    Entries are keyed by an HMAC of username, password and the stored hash
+    under a per-process random key, so plaintext passwords are never kept
+    and any password change (in this or another worker) misses the cache
+    by construction. Only successful checks are cached; failures always pay
+    the full PBKDF2 cost.
+    """
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self._ttl = ttl
+        self._max_entries = max(max_entries, 0)
+        self._key = secrets.token_bytes(32)
+        self._entries: OrderedDict[bytes, tuple[float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl > 0 and self._max_entries > 0
+
+    def _digest(self, username: str, password: str, stored_hash: str) -> bytes:
+        message = "\0".join((username, password, stored_hash)).encode("utf-8")
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def verify(self, user_id: int, username: str, password: str, stored_hash: str) -> bool:
+        """Verify a password, consulting the cache before running PBKDF2."""
+
+        if not self.enabled:
+            return password_pool.call(verify_password, password, stored_hash)
+
+        digest = self._digest(username, password, stored_hash)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return True
+            self.misses += 1
+
+        if not password_pool.call(verify_password, password, stored_hash):
+            return False
+
+        with self._lock:
+            self._entries[digest] = (now + self._ttl, user_id)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop every cached verification belonging to ``user_id``."""
+
+        with self._lock:
+            stale = [digest for digest, (_, owner) in self._entries.items() if owner == user_id]
+            for digest in stale:
+                del self._entries[digest]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+credential_cache = VerifiedCredentialCache(CREDENTIAL_CACHE_TTL, CREDENTIAL_CACHE_SIZE)
@@ -10,6 +10,8 @@ import os
 from typing import Any
 
 from fastapi import Request, Response
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 SESSION_COOKIE_NAME = "yetla_session"
 _SESSION_SECRET = os.getenv("SESSION_SECRET", os.getenv("ADMIN_PASS", "yetla-session")).encode("utf-8")
@@ -61,8 +63,7 @@ def get_session(request: Request) -> dict[str, Any]:
     return session
 
 
-def set_session(response: Response, request: Request, data: dict[str, Any]) -> None:
-    request.state._yetla_session = data
+def _set_session_cookie(response: Response, data: dict[str, Any]) -> None:
     response.set_cookie(
         SESSION_COOKIE_NAME,
         serialize_session(data),
@@ -72,6 +73,48 @@ def set_session(response: Response, request: Request, data: dict[str, Any]) -> N
     )
 
 
+def set_session(response: Response, request: Request, data: dict[str, Any]) -> None:
+    request.state._yetla_session = data
+    _set_session_cookie(response, data)
+
+
+def refresh_session(request: Request, data: dict[str, Any]) -> None:
+    """Re-issue the session cookie from code that has no response object.
+
+    :class:`SessionRefreshMiddleware` attaches the cookie to whatever
+    response the request ends up producing.
+    """
+
+    request.state._yetla_session = data
+    request.state._yetla_session_refresh = True
+
+
+class SessionRefreshMiddleware:
+    """Append the cookie queued by :func:`refresh_session` to the response."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            state = scope.get("state") or {}
+            if message["type"] == "http.response.start" and state.get("_yetla_session_refresh"):
+                headers = MutableHeaders(scope=message)
+                prefix = f"{SESSION_COOKIE_NAME}="
+                # Login and logout responses already set the cookie themselves.
+                if not any(value.startswith(prefix) for value in headers.getlist("set-cookie")):
+                    cookie = Response()
+                    _set_session_cookie(cookie, state["_yetla_session"])
+                    headers.append("set-cookie", cookie.headers["set-cookie"])
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
 def clear_session(response: Response, request: Request) -> None:
     request.state._yetla_session = {}
     response.delete_cookie(
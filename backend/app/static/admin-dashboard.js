@@ -2,8 +2,8 @@
   const THEME_STORAGE_KEY = "yetla-admin-theme";
   const AVAILABLE_THEMES = ["aurora", "nebula"];
   const DEFAULT_THEME = "aurora";
-  const RANDOM_CODE_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789";
   const COPY_FEEDBACK_TIMEOUT = 2000;
+  const SEARCH_DEBOUNCE_MS = 300;
   const ROW_RESTORE_CONFIG = [
     {
       prefix: "short-link-row-",
@@ -46,10 +46,11 @@
         return;
       }
       const fragment = createFragment(html);
-      const firstElement = fragment.firstElementChild;
-      if (firstElement) {
-        target.replaceWith(firstElement);
-        enhanceDynamicUI(firstElement);
+      const elements = Array.from(fragment.children);
+      if (elements.length) {
+        // 分页加载时一个片段包含多行，整体替换「加载更多」行
+        target.replaceWith(...elements);
+        elements.forEach((element) => enhanceDynamicUI(element));
       } else {
         target.outerHTML = html;
         enhanceDynamicUI();
@@ -705,17 +706,6 @@
     });
   }
 
-  function generateRandomCode(length) {
-    const parsed = Number.parseInt(length, 10);
-    const effectiveLength = Number.isFinite(parsed) && parsed > 0 ? parsed : 6;
-    let result = "";
-    for (let index = 0; index < effectiveLength; index += 1) {
-      const randomIndex = Math.floor(Math.random() * RANDOM_CODE_ALPHABET.length);
-      result += RANDOM_CODE_ALPHABET.charAt(randomIndex);
-    }
-    return result;
-  }
-
   function bindCopyButtons(root = document) {
     const scope = root instanceof Element ? root : document;
     const buttons = scope.querySelectorAll("[data-copy-value]");
@@ -789,16 +779,37 @@
         group.__updateDomainValue();
       }
     });
+  }
 
-    const randomInputs = formLike.querySelectorAll("[data-random-code='true']");
-    randomInputs.forEach((input) => {
-      if (!(input instanceof HTMLInputElement)) {
+  function bindSearchInputs(root = document) {
+    const inputs = root.querySelectorAll("input[data-search-url]");
+    inputs.forEach((input) => {
+      if (input.dataset.searchBound === "true") {
         return;
       }
-      const length = input.getAttribute("data-random-code-length") || "6";
-      const nextValue = generateRandomCode(length);
-      input.value = nextValue;
-      input.defaultValue = nextValue;
+      input.dataset.searchBound = "true";
+      let timer = null;
+      let sequence = 0;
+      input.addEventListener("input", () => {
+        window.clearTimeout(timer);
+        timer = window.setTimeout(async () => {
+          const current = ++sequence;
+          const target = document.querySelector(input.getAttribute("data-search-target"));
+          const url = `${input.getAttribute("data-search-url")}?q=${encodeURIComponent(input.value)}`;
+          try {
+            const { response, text } = await fetchFragment(url, {
+              method: "GET",
+              headers: buildHeaders(),
+            });
+            // 只应用最后一次输入的结果，忽略先发后至的旧响应
+            if (current === sequence && response.ok) {
+              swapContent(target, text, "innerHTML");
+            }
+          } catch (error) {
+            console.error("Failed to search", error);
+          }
+        }, SEARCH_DEBOUNCE_MS);
+      });
     });
   }
 
@@ -889,6 +900,7 @@
     refreshUsersHandler();
     refreshLinksHandler();
     refreshSubdomainsHandler();
+    bindSearchInputs();
 
     document.body.addEventListener("submit", async (event) => {
       const form =
@@ -937,7 +949,7 @@
       }
 
       const trigger = event.target.closest("[hx-get], [hx-delete]");
-      if (!trigger) {
+      if (!trigger || trigger.matches("input, select, textarea")) {
         return;
       }
 
@@ -0,0 +1,123 @@
+"""后台计数与统计：聚合查询结果按数据版本缓存。"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .hits import hit_counter
+from .models import DataChange, ShortLink, SubdomainRedirect, User
+
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "30"))
+
+
+def current_data_version(db: Session) -> int:
+    """读取全局数据版本，即 ``data_changes`` 的最大 ID（主键查找，O(1)）。"""
+
+    return db.scalar(select(func.max(DataChange.id))) or 0
+
+
+def _count(db: Session, model: type[ShortLink] | type[SubdomainRedirect], owner_id: int | None, include_hits: bool) -> dict[str, int]:
+    columns = [func.count()]
+    if include_hits:
+        columns.append(func.coalesce(func.sum(model.hits), 0))
+    query = select(*columns).select_from(model)
+    if owner_id is not None:
+        query = query.where(model.user_id == owner_id)
+    row = db.execute(query).one()
+    result = {"count": int(row[0])}
+    if include_hits:
+        result["hits"] = int(row[1])
+    return result
+
+
+def compute_summary(db: Session, owner_id: int | None, include_hits: bool = False) -> dict[str, dict[str, int]]:
+    """执行聚合查询；``owner_id`` 为 ``None`` 时统计全部数据并包含用户数。
+
+    后台计数徽章只需要 ``COUNT``，``include_hits`` 为真时才额外汇总访问次数。
+    """
+
+    summary = {
+        "short_links": _count(db, ShortLink, owner_id, include_hits),
+        "subdomains": _count(db, SubdomainRedirect, owner_id, include_hits),
+    }
+    if owner_id is None:
+        summary["users"] = {"count": int(db.scalar(select(func.count()).select_from(User)) or 0)}
+    return summary
+
+
+class SummaryCache:
+    """按 (数据版本, 归属用户, 是否含访问次数) 缓存统计结果。
+
+    写入接口都会在同一事务中追加 ``data_changes``，版本号变化即说明计数
+    可能改变；命中数由后台批量写回且不推进版本，因此另设 TTL 作为上限。
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self._ttl = ttl
+        self._entries: dict[tuple[int | None, bool], tuple[int, float, dict[str, dict[str, int]]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def summary(self, db: Session, owner_id: int | None, include_hits: bool = False) -> dict[str, dict[str, int]]:
+        key = (owner_id, include_hits)
+        version = current_data_version(db)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version and entry[1] > now:
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        result = compute_summary(db, owner_id, include_hits)
+        with self._lock:
+            self._entries[key] = (version, now + self._ttl, result)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+summary_cache = SummaryCache(STATS_CACHE_TTL)
+
+
+def _pending_hits(db: Session, model: type[ShortLink] | type[SubdomainRedirect], kind: str, owner_id: int | None) -> int:
+    """统计本 worker 尚未写回、且仍存在于（归属用户的）记录上的命中增量。"""
+
+    pending = hit_counter.pending_totals(kind)
+    if not pending:
+        return 0
+    query = select(model.id).where(model.id.in_(list(pending)))
+    if owner_id is not None:
+        query = query.where(model.user_id == owner_id)
+    return sum(pending[entity_id] for entity_id in db.scalars(query))
+
+
+def counts_for(db: Session, user: Any) -> dict[str, dict[str, int]]:
+    """后台计数徽章使用的记录数，只执行 ``COUNT``。"""
+
+    return summary_cache.summary(db, None if user.is_admin else user.id)
+
+
+def summary_for(db: Session, user: Any) -> dict[str, dict[str, int]]:
+    """管理员看到全站统计，普通用户只统计自己名下的数据。
+
+    缓存的是已写回数据库的计数，返回前叠加尚未写回的命中增量。
+    """
+
+    owner_id = None if user.is_admin else user.id
+    cached = summary_cache.summary(db, owner_id, include_hits=True)
+    summary = {key: dict(value) for key, value in cached.items()}
+    summary["short_links"]["hits"] += _pending_hits(db, ShortLink, "short_link", owner_id)
+    summary["subdomains"]["hits"] += _pending_hits(db, SubdomainRedirect, "subdomain", owner_id)
+    return summary
@@ -0,0 +1,167 @@
+"""多 worker 之间的缓存一致性：基于 ``data_changes`` 变更日志的版本轮询。"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .cache import short_codes, short_link_cache, subdomain_routes, user_cache
+from .models import DataChange, SessionLocal
+
+DATA_VERSION_POLL_INTERVAL = float(os.getenv("DATA_VERSION_POLL_INTERVAL", "1"))
+DATA_CHANGE_RETENTION = int(os.getenv("DATA_CHANGE_RETENTION", "10000"))
+
+ENTITY_SHORT_LINK = "short_link"
+ENTITY_SUBDOMAIN = "subdomain"
+ENTITY_USER = "user"
+
+logger = logging.getLogger(__name__)
+
+
+def record_change(db: Session, entity: str, *keys: str | None) -> None:
+    """在当前事务中追加变更记录，随业务写入一起提交。
+
+    ``key`` 为 ``None`` 表示该实体的批量变更，其他 worker 会整体重载。
+    """
+
+    for key in dict.fromkeys(keys or (None,)):
+        db.add(DataChange(entity=entity, key=key))
+
+
+class DataVersionWatcher:
+    """轮询全局数据版本，把其他 worker 的写入应用到本进程缓存。
+
+    版本号即 ``data_changes`` 的最大 ID；发现新版本后只读取增量变更，
+    按实体与键失效对应缓存。本地版本落后于日志保留范围时整体重载。
+    """
+
+    def __init__(self, interval: float) -> None:
+        self._interval = interval
+        self._version: int | None = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.polls = 0
+        self.applied = 0
+        self.full_reloads = 0
+
+    @property
+    def version(self) -> int | None:
+        return self._version
+
+    def prime(self) -> None:
+        """记录当前版本作为基线，应在加载缓存之前调用。"""
+
+        with SessionLocal() as session:
+            self._version = session.scalar(select(func.max(DataChange.id))) or 0
+
+    def _reload_all(self) -> None:
+        subdomain_routes.invalidate()
+        short_link_cache.clear()
+        short_codes.invalidate()
+        user_cache.clear()
+        self.full_reloads += 1
+
+    def _apply(self, changes: list[tuple[str, str | None]]) -> None:
+        grouped: dict[str, set[str]] = {}
+        bulk: set[str] = set()
+        for entity, key in changes:
+            if key is None:
+                bulk.add(entity)
+            else:
+                grouped.setdefault(entity, set()).add(key)
+
+        if ENTITY_SUBDOMAIN in bulk:
+            subdomain_routes.invalidate()
+        else:
+            subdomain_routes.refresh(grouped.get(ENTITY_SUBDOMAIN, set()))
+
+        if ENTITY_SHORT_LINK in bulk:
+            short_link_cache.clear()
+            short_codes.invalidate()
+        else:
+            codes = grouped.get(ENTITY_SHORT_LINK, set())
+            if codes:
+                short_link_cache.invalidate(*codes)
+                for code in codes:
+                    # Bloom 只能追加；已删除的 code 只会成为假阳性。
+                    short_codes.add(code)
+
+        if ENTITY_USER in bulk:
+            user_cache.clear()
+        else:
+            user_ids = grouped.get(ENTITY_USER, set())
+            if user_ids:
+                user_cache.invalidate(*(int(user_id) for user_id in user_ids))
+        self.applied += len(changes)
+
+    def poll(self) -> bool:
+        """检查一次数据版本，返回是否应用了新的变更。"""
+
+        with self._lock:
+            self.polls += 1
+            with SessionLocal() as session:
+                latest = session.scalar(select(func.max(DataChange.id))) or 0
+                if self._version is None:
+                    self._version = latest
+                    self._reload_all()
+                    return True
+                if latest <= self._version:
+                    return False
+                oldest = session.scalar(select(func.min(DataChange.id))) or 0
+                if oldest > self._version + 1:
+                    self._version = latest
+                    self._reload_all()
+                    return True
+                changes = session.execute(
+                    select(DataChange.entity, DataChange.key)
+                    .where(DataChange.id > self._version, DataChange.id <= latest)
+                    .order_by(DataChange.id)
+                ).all()
+            self._apply([(row.entity, row.key) for row in changes])
+            self._version = latest
+            return True
+
+    def prune(self, keep: int = DATA_CHANGE_RETENTION) -> None:
+        """只保留最近 ``keep`` 条变更记录。"""
+
+        with SessionLocal.begin() as session:
+            latest = session.scalar(select(func.max(DataChange.id))) or 0
+            if latest > keep:
+                session.execute(delete(DataChange).where(DataChange.id <= latest - keep))
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self._interval):
+            try:
+                self.poll()
+            except SQLAlchemyError:
+                logger.exception("failed to poll data version")
+
+    def start(self) -> None:
+        if self._interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="yetla-data-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        thread = self._thread
+        self._thread = None
+        if thread is not None:
+            thread.join(timeout=max(self._interval, 1.0) * 2)
+
+    def stats(self) -> dict[str, int | None]:
+        return {
+            "version": self._version,
+            "polls": self.polls,
+            "applied": self.applied,
+            "full_reloads": self.full_reloads,
+        }
+
+
+data_sync = DataVersionWatcher(DATA_VERSION_POLL_INTERVAL)
@@ -0,0 +1,208 @@
+"""登录与 Basic Auth 失败次数的进程内滑动窗口限流。"""
+from __future__ import annotations
+
+import ipaddress
+import math
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from functools import lru_cache
+
+from starlette.requests import Request
+
+AUTH_THROTTLE_WINDOW = float(os.getenv("AUTH_THROTTLE_WINDOW", "300"))
+AUTH_THROTTLE_IP_LIMIT = int(os.getenv("AUTH_THROTTLE_IP_LIMIT", "20"))
+AUTH_THROTTLE_USER_LIMIT = int(os.getenv("AUTH_THROTTLE_USER_LIMIT", "10"))
+AUTH_THROTTLE_MAX_KEYS = int(os.getenv("AUTH_THROTTLE_MAX_KEYS", "10000"))
+AUTH_THROTTLE_SHARDS = 16
+TRUSTED_PROXIES = os.getenv("TRUSTED_PROXIES", "127.0.0.1,::1")
+
+_TRUSTED_NETWORKS = tuple(
+    ipaddress.ip_network(entry.strip(), strict=False)
+    for entry in TRUSTED_PROXIES.split(",")
+    if entry.strip()
+)
+
+
+class AuthThrottled(Exception):
+    """认证失败次数超限，需等待 ``retry_after`` 秒后再试。"""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"too many failed attempts, retry after {retry_after:.0f}s")
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class _Shard:
+    __slots__ = ("lock", "entries")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[str, deque[float]] = OrderedDict()
+
+
+class SlidingWindowLimiter:
+    """按键记录最近 ``limit`` 次失败时间的滑动窗口计数器。
+
+    键按哈希分布到多个分片，各自持锁以减少争用；每个键最多保存 ``limit``
+    个时间戳，每个分片最多 ``max_keys / shards`` 个键，超出时淘汰最久未
+    更新的键，因此随机伪造的 IP 或用户名无法无限占用内存。
+    """
+
+    def __init__(self, limit: int, window: float, max_keys: int, shards: int = AUTH_THROTTLE_SHARDS) -> None:
+        self.limit = limit
+        self.window = window
+        self._shards = [_Shard() for _ in range(max(shards, 1))]
+        self._keys_per_shard = max(max_keys // len(self._shards), 1)
+        self.blocked = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0 and self.window > 0
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[zlib.crc32(key.encode("utf-8")) % len(self._shards)]
+
+    def retry_after(self, key: str, now: float | None = None) -> float:
+        """返回需要等待的秒数，``0`` 表示允许继续尝试。"""
+
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        shard = self._shard(key)
+        with shard.lock:
+            stamps = shard.entries.get(key)
+            if stamps is None:
+                return 0.0
+            while stamps and stamps[0] <= now - self.window:
+                stamps.popleft()
+            if not stamps:
+                del shard.entries[key]
+                return 0.0
+            if len(stamps) < self.limit:
+                return 0.0
+            self.blocked += 1
+            return stamps[0] + self.window - now
+
+    def hit(self, key: str, now: float | None = None) -> None:
+        """记录一次失败。"""
+
+        if not self.enabled:
+            return
+        now = time.monotonic() if now is None else now
+        shard = self._shard(key)
+        with shard.lock:
+            stamps = shard.entries.get(key)
+            if stamps is None:
+                stamps = shard.entries[key] = deque(maxlen=self.limit)
+            stamps.append(now)
+            shard.entries.move_to_end(key)
+            while len(shard.entries) > self._keys_per_shard:
+                shard.entries.popitem(last=False)
+                self.evictions += 1
+
+    def reset(self, key: str) -> None:
+        shard = self._shard(key)
+        with shard.lock:
+            shard.entries.pop(key, None)
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        keys = 0
+        for shard in self._shards:
+            with shard.lock:
+                keys += len(shard.entries)
+        return {"keys": keys, "blocked": self.blocked, "evictions": self.evictions}
+
+
+class AuthThrottle:
+    """按客户端 IP 以及（IP, 用户名）组合限制认证失败次数。
+
+    用户名计数与来源 IP 绑定：其他地址对同一用户名的失败不会锁住正在使用
+    正确密码的客户端，跨 IP 的撞库由 IP 维度的计数限制。
+    """
+
+    def __init__(self, window: float, ip_limit: int, user_limit: int, max_keys: int) -> None:
+        self.by_ip = SlidingWindowLimiter(ip_limit, window, max_keys)
+        self.by_username = SlidingWindowLimiter(user_limit, window, max_keys)
+
+    @staticmethod
+    def _account_key(client_ip: str | None, username: str) -> str:
+        return f"{client_ip or ''}\0{username}"
+
+    def check(self, client_ip: str | None, username: str) -> None:
+        """在执行任何密钥派生之前检查，超限时抛出 :class:`AuthThrottled`。"""
+
+        wait = 0.0
+        if client_ip:
+            wait = self.by_ip.retry_after(client_ip)
+        if username:
+            wait = max(wait, self.by_username.retry_after(self._account_key(client_ip, username)))
+        if wait > 0:
+            raise AuthThrottled(wait)
+
+    def record_failure(self, client_ip: str | None, username: str) -> None:
+        if client_ip:
+            self.by_ip.hit(client_ip)
+        if username:
+            self.by_username.hit(self._account_key(client_ip, username))
+
+    def record_success(self, client_ip: str | None, username: str) -> None:
+        self.by_username.reset(self._account_key(client_ip, username))
+
+    def clear(self) -> None:
+        self.by_ip.clear()
+        self.by_username.clear()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {"ip": self.by_ip.stats(), "username": self.by_username.stats()}
+
+
+auth_throttle = AuthThrottle(
+    AUTH_THROTTLE_WINDOW, AUTH_THROTTLE_IP_LIMIT, AUTH_THROTTLE_USER_LIMIT, AUTH_THROTTLE_MAX_KEYS
+)
+
+
+@lru_cache(maxsize=1024)
+def is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in _TRUSTED_NETWORKS)
+
+
+def resolve_client_ip(peer: str | None, real_ip: str | None, forwarded: str | None) -> str | None:
+    """按连接对端决定是否采信转发头。
+
+    只有对端位于 ``TRUSTED_PROXIES`` 中时才读取 Nginx 设置的 ``X-Real-IP``，
+    其次取 ``X-Forwarded-For`` 中从右往左第一个不受信任的地址；直接连接的
+    客户端伪造这些头不会改变识别结果。
+    """
+
+    if not peer or not is_trusted_proxy(peer):
+        return peer
+    real_ip = (real_ip or "").strip()
+    if real_ip:
+        return real_ip
+    hops = [hop.strip() for hop in (forwarded or "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+def client_ip(request: Request) -> str | None:
+    """读取客户端 IP，仅在请求来自受信任代理时使用转发头。"""
+
+    return resolve_client_ip(
+        request.client.host if request.client else None,
+        request.headers.get("x-real-ip"),
+        request.headers.get("x-forwarded-for"),
+    )
@@ -0,0 +1,161 @@
+"""API 令牌：生成、校验与批量回写最近使用时间。
+
+令牌明文只在创建时返回一次，数据库中保存其 SHA-256 摘要。校验时按摘要
+做一次索引查询，再以常量时间比较摘要，避免对每个请求执行 PBKDF2。
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .models import ApiToken, SessionLocal
+
+TOKEN_PREFIX = "ytl_"
+SCOPE_READ = "read"
+SCOPE_WRITE = "write"
+SCOPES = (SCOPE_READ, SCOPE_WRITE)
+READ_ONLY_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+TOKEN_USAGE_FLUSH_INTERVAL = float(os.getenv("TOKEN_USAGE_FLUSH_INTERVAL", "30"))
+
+logger = logging.getLogger(__name__)
+
+
+def generate_token() -> str:
+    """生成新的令牌明文。"""
+
+    return TOKEN_PREFIX + secrets.token_urlsafe(32)
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def as_utc(value: datetime | None) -> datetime | None:
+    """SQLite 读出的时间不带时区，按写入时的 UTC 解释。"""
+
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+def token_allows(token: ApiToken, method: str) -> bool:
+    """判断令牌的权限范围是否允许该 HTTP 方法。"""
+
+    scopes = set(token.scopes.split())
+    if method.upper() in READ_ONLY_METHODS:
+        return bool(scopes & set(SCOPES))
+    return SCOPE_WRITE in scopes
+
+
+def find_token(db: Session, token: str) -> ApiToken | None:
+    """按摘要查找未过期的令牌，找不到或已过期时返回 ``None``。
+
+    令牌所属用户在同一条查询中联表加载，认证只需一次数据库往返。
+    """
+
+    if not token.startswith(TOKEN_PREFIX):
+        return None
+    digest = hash_token(token)
+    record = db.scalar(
+        select(ApiToken).options(joinedload(ApiToken.owner)).where(ApiToken.token_hash == digest)
+    )
+    if record is None or not hmac.compare_digest(record.token_hash, digest):
+        return None
+    expires_at = as_utc(record.expires_at)
+    if expires_at is not None and expires_at <= datetime.now(timezone.utc):
+        return None
+    return record
+
+
+class TokenUsageRecorder:
+    """在内存中记录令牌最近使用时间，定期单事务批量写回。"""
+
+    def __init__(self, interval: float) -> None:
+        self._interval = interval
+        self._pending: dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.flushes = 0
+
+    def record(self, token_id: int) -> None:
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            self._pending[token_id] = now
+
+    def overlay(self, records: list[ApiToken]) -> list[ApiToken]:
+        """把尚未写回的使用时间以已提交值的形式叠加到记录上，不会被会话写回。"""
+
+        with self._lock:
+            pending = dict(self._pending)
+        for record in records:
+            used = pending.get(record.id)
+            if used is not None:
+                set_committed_value(record, "last_used_at", used)
+        return records
+
+    def flush(self) -> int:
+        """写回累积的使用时间，返回更新的令牌数。"""
+
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            table = ApiToken.__table__
+            statement = (
+                update(table)
+                .where(table.c.id == bindparam("b_id"))
+                .values(last_used_at=bindparam("b_used"))
+            )
+            params = [{"b_id": token_id, "b_used": used} for token_id, used in pending.items()]
+            try:
+                with SessionLocal.begin() as session:
+                    session.connection().execute(statement, params)
+            except SQLAlchemyError:
+                with self._lock:
+                    for token_id, used in pending.items():
+                        self._pending.setdefault(token_id, used)
+                logger.exception("failed to flush %d token usage timestamps", len(pending))
+                return 0
+            self.flushes += 1
+            return len(pending)
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self._interval):
+            self.flush()
+
+    def start(self) -> None:
+        if self._interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="yetla-token-usage", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        thread = self._thread
+        self._thread = None
+        if thread is not None:
+            thread.join(timeout=max(self._interval, 1.0) * 2)
+        self.flush()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending": pending, "flushes": self.flushes}
+
+
+token_usage = TokenUsageRecorder(TOKEN_USAGE_FLUSH_INTERVAL)
@@ -2,12 +2,11 @@
 from __future__ import annotations
 
 import os
-import secrets
-import string
 from pathlib import Path
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy import select
@@ -20,16 +19,23 @@ from .deps import (
     require_authenticated_user,
     validate_credentials,
 )
+from .hits import hit_counter
+from .hotkeys import hot_keys
+from .security import PASSWORD_HASH_RETRY_AFTER, PasswordPoolBusy
+from .throttle import AuthThrottled, client_ip
 from .session import clear_session, get_session
 from .models import ShortLink, SubdomainRedirect, User
+from .pagination import ADMIN_PAGE_SIZE, InvalidCursor, keyset_page
+from .search import SHORT_LINK_SEARCH, SUBDOMAIN_SEARCH, search
+from .stats import counts_for, summary_cache
 
 DEFAULT_BASE_DOMAIN = "yet.la"
-SHORT_CODE_LENGTH = int(os.getenv("SHORT_CODE_LEN", "6"))
 ENV_BASE_DOMAIN = os.getenv("BASE_DOMAIN", "").strip().lower()
 EFFECTIVE_BASE_DOMAIN = ENV_BASE_DOMAIN or DEFAULT_BASE_DOMAIN
 BASE_URL = f"https://{EFFECTIVE_BASE_DOMAIN}".rstrip("/")
 SHORT_LINK_PREFIX = f"{BASE_URL}/"
 SUBDOMAIN_CODE_OPTIONS = [302, 301]
+HOT_PANEL_LIMIT = 10
 
 TEMPLATE_DIR = Path(__file__).resolve().parent / "templates"
 
@@ -48,22 +54,31 @@ def _safe_redirect_target(target: str | None) -> str:
     return target
 
 
-def _load_short_links(db: Session, user: User) -> list[ShortLink]:
-    query = select(ShortLink).options(selectinload(ShortLink.owner)).order_by(
-        ShortLink.created_at.desc()
-    )
+def _load_short_links(
+    db: Session, user: User, cursor: str | None = None
+) -> tuple[list[ShortLink], str | None]:
+    query = select(ShortLink).options(selectinload(ShortLink.owner))
     if not user.is_admin:
         query = query.where(ShortLink.user_id == user.id)
-    return list(db.scalars(query).all())
+    short_links, next_cursor = _load_page(db, query, ShortLink, cursor)
+    return hit_counter.overlay("short_link", short_links), next_cursor
 
 
-def _load_subdomains(db: Session, user: User) -> list[SubdomainRedirect]:
-    query = select(SubdomainRedirect).options(selectinload(SubdomainRedirect.owner)).order_by(
-        SubdomainRedirect.created_at.desc()
-    )
+def _load_subdomains(
+    db: Session, user: User, cursor: str | None = None
+) -> tuple[list[SubdomainRedirect], str | None]:
+    query = select(SubdomainRedirect).options(selectinload(SubdomainRedirect.owner))
     if not user.is_admin:
         query = query.where(SubdomainRedirect.user_id == user.id)
-    return list(db.scalars(query).all())
+    subdomains, next_cursor = _load_page(db, query, SubdomainRedirect, cursor)
+    return hit_counter.overlay("subdomain", subdomains), next_cursor
+
+
+def _load_page(db: Session, query: Any, model: Any, cursor: str | None) -> tuple[list[Any], str | None]:
+    try:
+        return keyset_page(db, query, model, ADMIN_PAGE_SIZE, cursor)
+    except InvalidCursor as exc:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="分页游标无效") from exc
 
 
 def _load_users(db: Session) -> list[User]:
@@ -72,26 +87,12 @@ def _load_users(db: Session) -> list[User]:
     )
 
 
-def _generate_short_link_suggestion(db: Session, length: int = SHORT_CODE_LENGTH) -> str:
-    """Generate a random short link code suggestion that does not clash with existing ones."""
-
-    alphabet = string.ascii_letters + string.digits
-    attempts = max(length * 2, 10)
-    for _ in range(attempts):
-        candidate = "".join(secrets.choice(alphabet) for _ in range(length))
-        exists = db.scalar(select(ShortLink.id).where(ShortLink.code == candidate))
-        if not exists:
-            return candidate
-    return "".join(secrets.choice(alphabet) for _ in range(length))
-
-
 def _base_context(request: Request, user: User | None = None) -> dict[str, Any]:
     return {
         "request": request,
         "base_domain": EFFECTIVE_BASE_DOMAIN,
         "base_url": BASE_URL,
         "short_link_prefix": SHORT_LINK_PREFIX,
-        "short_code_length": SHORT_CODE_LENGTH,
         "show_logout_button": True,
         "current_user": user,
     }
@@ -122,23 +123,26 @@ def admin_dashboard(
 
     available_tabs = {"links", "subdomains"}
     if current_user.is_admin:
-        available_tabs.add("users")
+        available_tabs.update({"users", "hot"})
     active_tab = tab if tab in available_tabs else "links"
 
-    short_links = _load_short_links(db, current_user)
-    subdomains = _load_subdomains(db, current_user)
+    short_links, short_links_cursor = _load_short_links(db, current_user)
+    subdomains, subdomains_cursor = _load_subdomains(db, current_user)
     users: list[User] = _load_users(db) if current_user.is_admin else []
 
     context = _base_context(request, current_user)
     context.update(
         {
             "active_tab": active_tab,
+            "summary": counts_for(db, current_user),
             "short_links": short_links,
+            "short_links_cursor": short_links_cursor,
             "subdomains": subdomains,
+            "subdomains_cursor": subdomains_cursor,
             "users": users,
-            "short_code_suggestion": _generate_short_link_suggestion(db),
             "subdomain_code_options": SUBDOMAIN_CODE_OPTIONS,
             "show_user_column": current_user.is_admin,
+            "hot": hot_keys.snapshot(HOT_PANEL_LIMIT) if active_tab == "hot" else {},
         }
     )
     return templates.TemplateResponse("admin/index.html", context)
@@ -192,10 +196,21 @@ async def admin_login_submit(
     password = form.get("password") or ""
 
     error: str | None = None
+    status_code = status.HTTP_400_BAD_REQUEST
+    headers: dict[str, str] | None = None
     if not username or not password:
         error = "账号或密码不能为空"
     else:
-        ok, reason, user = validate_credentials(username, password, db)
+        retry_after = PASSWORD_HASH_RETRY_AFTER
+        try:
+            ok, reason, user = await run_in_threadpool(
+                validate_credentials, username, password, db, client_ip(request)
+            )
+        except PasswordPoolBusy:
+            ok, reason, user = False, "busy", None
+        except AuthThrottled as exc:
+            ok, reason, user = False, "throttled", None
+            retry_after = exc.retry_after
         if ok and user is not None:
             target = _safe_redirect_target(redirect_to)
             response = RedirectResponse(target, status_code=status.HTTP_303_SEE_OTHER)
@@ -205,6 +220,14 @@ async def admin_login_submit(
             error = "账号错误"
         elif reason == "password":
             error = "密码错误"
+        elif reason == "busy":
+            error = "登录请求过多，请稍后重试"
+            status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+            headers = {"Retry-After": str(retry_after)}
+        elif reason == "throttled":
+            error = f"登录失败次数过多，请 {retry_after} 秒后重试"
+            status_code = status.HTTP_429_TOO_MANY_REQUESTS
+            headers = {"Retry-After": str(retry_after)}
         else:
             error = "登录失败"
 
@@ -217,11 +240,11 @@ async def admin_login_submit(
             "username_value": username,
         }
     )
-    status_code = status.HTTP_400_BAD_REQUEST if error else status.HTTP_200_OK
     return templates.TemplateResponse(
         "admin/login.html",
         context,
         status_code=status_code,
+        headers=headers,
     )
 
 
@@ -236,9 +259,9 @@ def short_link_count(
 ) -> HTMLResponse:
     """Return a small fragment containing the current short link count."""
 
-    short_links = _load_short_links(db, current_user)
+    summary = counts_for(db, current_user)
     context = _base_context(request, current_user)
-    context.update({"count": len(short_links)})
+    context.update({"count": summary["short_links"]["count"]})
     return templates.TemplateResponse("admin/partials/link_count.html", context)
 
 
@@ -248,14 +271,61 @@ def short_link_count(
 )
 def short_link_table(
     request: Request,
+    cursor: str | None = Query(None),
+    current_user: User = Depends(require_authenticated_user),
+    db: Session = Depends(get_db),
+) -> HTMLResponse:
+    """Return the short link table fragment for HTMX swaps.
+
+    With a ``cursor`` only the next page of rows is returned, ending with a
+    "load more" row that replaces itself with the page after that.
+    """
+
+    short_links, next_cursor = _load_short_links(db, current_user, cursor)
+    context = _base_context(request, current_user)
+    context.update(
+        {
+            "short_links": short_links,
+            "short_links_cursor": next_cursor,
+            "show_user_column": current_user.is_admin,
+        }
+    )
+    template = "link_rows.html" if cursor else "link_table.html"
+    return templates.TemplateResponse(f"admin/partials/{template}", context)
+
+
+@router.get(
+    "/admin/links/search",
+    response_class=HTMLResponse,
+)
+def short_link_search(
+    request: Request,
+    q: str = Query("", max_length=256),
     current_user: User = Depends(require_authenticated_user),
     db: Session = Depends(get_db),
 ) -> HTMLResponse:
-    """Return the short link table fragment for HTMX swaps."""
+    """Return the short link table filtered by a search query.
+
+    An empty query falls back to the first page of the regular table.
+    """
 
-    short_links = _load_short_links(db, current_user)
+    if q.strip():
+        owner_id = None if current_user.is_admin else current_user.id
+        short_links = hit_counter.overlay(
+            "short_link", search(db, SHORT_LINK_SEARCH, q, ADMIN_PAGE_SIZE, owner_id)
+        )
+        next_cursor = None
+    else:
+        short_links, next_cursor = _load_short_links(db, current_user)
     context = _base_context(request, current_user)
-    context.update({"short_links": short_links, "show_user_column": current_user.is_admin})
+    context.update(
+        {
+            "short_links": short_links,
+            "short_links_cursor": next_cursor,
+            "show_user_column": current_user.is_admin,
+            "search_query": q.strip(),
+        }
+    )
     return templates.TemplateResponse("admin/partials/link_table.html", context)
 
 
@@ -314,9 +384,9 @@ def subdomain_count(
 ) -> HTMLResponse:
     """Return the current subdomain redirect count fragment."""
 
-    subdomains = _load_subdomains(db, current_user)
+    summary = counts_for(db, current_user)
     context = _base_context(request, current_user)
-    context.update({"count": len(subdomains)})
+    context.update({"count": summary["subdomains"]["count"]})
     return templates.TemplateResponse("admin/partials/subdomain_count.html", context)
 
 
@@ -326,14 +396,54 @@ def subdomain_count(
 )
 def subdomain_table(
     request: Request,
+    cursor: str | None = Query(None),
     current_user: User = Depends(require_authenticated_user),
     db: Session = Depends(get_db),
 ) -> HTMLResponse:
-    """Return the subdomain table fragment for HTMX swaps."""
+    """Return the subdomain table fragment, or the next page of rows for a ``cursor``."""
 
-    subdomains = _load_subdomains(db, current_user)
+    subdomains, next_cursor = _load_subdomains(db, current_user, cursor)
     context = _base_context(request, current_user)
-    context.update({"subdomains": subdomains, "show_user_column": current_user.is_admin})
+    context.update(
+        {
+            "subdomains": subdomains,
+            "subdomains_cursor": next_cursor,
+            "show_user_column": current_user.is_admin,
+        }
+    )
+    template = "subdomain_rows.html" if cursor else "subdomain_table.html"
+    return templates.TemplateResponse(f"admin/partials/{template}", context)
+
+
+@router.get(
+    "/admin/subdomains/search",
+    response_class=HTMLResponse,
+)
+def subdomain_search(
+    request: Request,
+    q: str = Query("", max_length=256),
+    current_user: User = Depends(require_authenticated_user),
+    db: Session = Depends(get_db),
+) -> HTMLResponse:
+    """Return the subdomain table filtered by a search query."""
+
+    if q.strip():
+        owner_id = None if current_user.is_admin else current_user.id
+        subdomains = hit_counter.overlay(
+            "subdomain", search(db, SUBDOMAIN_SEARCH, q, ADMIN_PAGE_SIZE, owner_id)
+        )
+        next_cursor = None
+    else:
+        subdomains, next_cursor = _load_subdomains(db, current_user)
+    context = _base_context(request, current_user)
+    context.update(
+        {
+            "subdomains": subdomains,
+            "subdomains_cursor": next_cursor,
+            "show_user_column": current_user.is_admin,
+            "search_query": q.strip(),
+        }
+    )
     return templates.TemplateResponse("admin/partials/subdomain_table.html", context)
 
 
@@ -387,6 +497,21 @@ def subdomain_edit_row(
     return templates.TemplateResponse("admin/partials/subdomain_edit_row.html", context)
 
 
+@router.get(
+    "/admin/hot/table",
+    response_class=HTMLResponse,
+)
+def hot_table(
+    request: Request,
+    admin: User = Depends(require_admin_user),
+) -> HTMLResponse:
+    """Render the heavy-hitter panel for the current worker."""
+
+    context = _base_context(request, admin)
+    context.update({"hot": hot_keys.snapshot(HOT_PANEL_LIMIT)})
+    return templates.TemplateResponse("admin/partials/hot_table.html", context)
+
+
 @router.get(
     "/admin/users/count",
     response_class=HTMLResponse,
@@ -398,9 +523,9 @@ def user_count(
 ) -> HTMLResponse:
     """Return the current user count fragment."""
 
-    users = _load_users(db)
+    summary = summary_cache.summary(db, None)
     context = _base_context(request, admin)
-    context.update({"count": len(users)})
+    context.update({"count": summary["users"]["count"]})
     return templates.TemplateResponse("admin/partials/user_count.html", context)
 
 
@@ -0,0 +1,336 @@
+"""基于 HyperLogLog 的短链独立访客估算。
+
+访客以客户端 IP 与 User-Agent 的哈希标识，跳转时只更新内存中当天草图的
+一个寄存器；后台线程定期把草图与数据库中的寄存器逐位取最大值后写回，
+同时并入累计草图。取最大值满足交换律与幂等，多个 worker 各自写回、
+写回失败后重试都不会重复计数。精度 ``p = 12`` 时每个草图 4096 个寄存器，
+标准误差约 1.6%。
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Iterable
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .models import SessionLocal, VisitorSketch
+
+VISITOR_FLUSH_INTERVAL = float(os.getenv("VISITOR_FLUSH_INTERVAL", "30"))
+VISITOR_FLUSH_THRESHOLD = int(os.getenv("VISITOR_FLUSH_THRESHOLD", "1000"))
+VISITOR_DAY_RETENTION_DAYS = int(os.getenv("VISITOR_DAY_RETENTION_DAYS", "90"))
+
+PRECISION = 12
+REGISTER_COUNT = 1 << PRECISION
+ALL_TIME = 0
+DAY = 86400
+
+_HASH_BITS = 64
+_REST_BITS = _HASH_BITS - PRECISION
+_REST_MASK = (1 << _REST_BITS) - 1
+
+logger = logging.getLogger(__name__)
+
+
+def visitor_hash(client_ip: str | None, user_agent: str | None) -> int:
+    digest = hashlib.blake2b(
+        f"{client_ip or ''}\0{user_agent or ''}".encode("utf-8", "replace"), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, "big")
+
+
+def add_hash(registers: bytearray, value: int) -> None:
+    index = value >> _REST_BITS
+    rank = _REST_BITS - (value & _REST_MASK).bit_length() + 1
+    if rank > registers[index]:
+        registers[index] = rank
+
+
+def merge(target: bytearray, other: bytes) -> None:
+    """按寄存器取最大值，把 ``other`` 并入 ``target``。"""
+
+    for index, rank in enumerate(other):
+        if rank > target[index]:
+            target[index] = rank
+
+
+def _sigma(x: float) -> float:
+    if x == 1.0:
+        return math.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous = z
+        z += x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def _tau(x: float) -> float:
+    if x in (0.0, 1.0):
+        return 0.0
+    y, z = 1.0, 1.0 - x
+    while True:
+        x = math.sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1.0 - x) ** 2 * y
+        if z == previous:
+            return z / 3.0
+
+
+def estimate(registers: bytes) -> int:
+    """按 Ertl 改进的估计量计算基数，无需经验偏差表，小基数时同样准确。"""
+
+    histogram = [0] * (_REST_BITS + 2)
+    for rank in registers:
+        histogram[rank] += 1
+    m = REGISTER_COUNT
+    z = m * _tau(1.0 - histogram[_REST_BITS + 1] / m)
+    for rank in range(_REST_BITS, 0, -1):
+        z = 0.5 * (z + histogram[rank])
+    z += m * _sigma(histogram[0] / m)
+    return round(m * m / (2 * math.log(2) * z))
+
+
+def encode_registers(registers: bytes) -> bytes:
+    return zlib.compress(bytes(registers), 9)
+
+
+def decode_registers(blob: bytes) -> bytearray:
+    registers = bytearray(zlib.decompress(blob))
+    if len(registers) != REGISTER_COUNT:
+        raise ValueError("unexpected HyperLogLog register count")
+    return registers
+
+
+def day_start(timestamp: float) -> int:
+    return int(timestamp) // DAY * DAY
+
+
+def load_sketches(db: Session, link_id: int, days: Iterable[int]) -> dict[int, bytearray]:
+    rows = db.execute(
+        select(VisitorSketch.day, VisitorSketch.registers).where(
+            VisitorSketch.link_id == link_id, VisitorSketch.day.in_(list(days))
+        )
+    )
+    return {day: decode_registers(blob) for day, blob in rows}
+
+
+def summarize(
+    db: Session,
+    link_id: int,
+    days: int,
+    now: float | None = None,
+    pending: dict[int, bytearray] | None = None,
+) -> dict[str, Any]:
+    """返回累计、最近 ``days`` 天合并以及逐日的独立访客估计。
+
+    ``pending`` 为尚未写回的按天草图，合并进对应日期与累计草图后再估计。
+    """
+
+    today = day_start(time.time() if now is None else now)
+    window = [today - offset * DAY for offset in range(days - 1, -1, -1)]
+    sketches = load_sketches(db, link_id, [ALL_TIME, *window])
+    for day, registers in (pending or {}).items():
+        for key in (day, ALL_TIME):
+            if key in sketches:
+                merge(sketches[key], registers)
+            else:
+                sketches[key] = bytearray(registers)
+    union = bytearray(REGISTER_COUNT)
+    for day in window:
+        if day in sketches:
+            merge(union, sketches[day])
+    total = sketches.get(ALL_TIME)
+    return {
+        "total": estimate(total) if total is not None else 0,
+        "window_uniques": estimate(union),
+        "days": [
+            {
+                "day": datetime.fromtimestamp(day, timezone.utc).date(),
+                "uniques": estimate(sketches[day]) if day in sketches else 0,
+            }
+            for day in window
+        ],
+    }
+
+
+def delete_sketches(db: Session, link_id: int) -> None:
+    db.execute(delete(VisitorSketch).where(VisitorSketch.link_id == link_id))
+
+
+class VisitorSketches:
+    """在内存中维护各短链当天的 HyperLogLog 草图，定期合并写回数据库。"""
+
+    def __init__(self, interval: float, threshold: int) -> None:
+        self._interval = interval
+        self._threshold = max(threshold, 1)
+        self._pending: dict[tuple[int, int], bytearray] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.recorded = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    def record(
+        self,
+        link_id: int,
+        client_ip: str | None,
+        user_agent: str | None,
+        at: float | None = None,
+    ) -> None:
+        """记录一次访问，只更新内存中的一个寄存器。"""
+
+        value = visitor_hash(client_ip, user_agent)
+        key = (link_id, day_start(time.time() if at is None else at))
+        with self._lock:
+            registers = self._pending.get(key)
+            if registers is None:
+                registers = self._pending[key] = bytearray(REGISTER_COUNT)
+            add_hash(registers, value)
+            self.recorded += 1
+            pending = len(self._pending)
+        if pending >= self._threshold:
+            self._wake.set()
+
+    def discard(self, link_id: int) -> None:
+        """丢弃某条短链尚未写回的草图。
+
+        删除短链时调用：先等待进行中的写回结束，避免下一次写回留下孤立的
+        草图，被复用该 ID 的新短链继承访客数。
+        """
+
+        with self._flush_lock, self._lock:
+            for key in [key for key in self._pending if key[0] == link_id]:
+                del self._pending[key]
+
+    def pending_for(self, link_id: int) -> dict[int, bytearray]:
+        """返回某条短链尚未写回的按天草图副本。"""
+
+        with self._lock:
+            return {
+                day: bytearray(registers)
+                for (pending_id, day), registers in self._pending.items()
+                if pending_id == link_id
+            }
+
+    def flush(self) -> int:
+        """把内存草图并入数据库中的当日与累计草图，返回写回的草图数。"""
+
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            updates: dict[tuple[int, int], bytearray] = {}
+            for (link_id, day), registers in pending.items():
+                for key in ((link_id, day), (link_id, ALL_TIME)):
+                    merged = updates.get(key)
+                    if merged is None:
+                        updates[key] = bytearray(registers)
+                    else:
+                        merge(merged, registers)
+
+            try:
+                with SessionLocal.begin() as session:
+                    # pysqlite 只在第一条写语句前隐式 BEGIN，读取旧草图时尚未持有写锁，
+                    # 其他 worker 可能在读与写之间写回，导致其寄存器被覆盖丢失。
+                    # 先取得写锁再读取，多个 worker 的读-合并-写回因此串行执行。
+                    session.execute(text("BEGIN IMMEDIATE"))
+                    link_ids = {link_id for link_id, _ in updates}
+                    days = {day for _, day in updates}
+                    existing = session.execute(
+                        select(VisitorSketch.link_id, VisitorSketch.day, VisitorSketch.registers).where(
+                            VisitorSketch.link_id.in_(link_ids), VisitorSketch.day.in_(days)
+                        )
+                    )
+                    for link_id, day, blob in existing:
+                        registers = updates.get((link_id, day))
+                        if registers is not None:
+                            merge(registers, decode_registers(blob))
+                    statement = sqlite_insert(VisitorSketch)
+                    statement = statement.on_conflict_do_update(
+                        index_elements=[VisitorSketch.link_id, VisitorSketch.day],
+                        set_={"registers": statement.excluded.registers},
+                    )
+                    session.execute(
+                        statement,
+                        [
+                            {"link_id": link_id, "day": day, "registers": encode_registers(registers)}
+                            for (link_id, day), registers in updates.items()
+                        ],
+                    )
+            except SQLAlchemyError:
+                # 合并是幂等的，把草图放回等待下一次重试即可。
+                with self._lock:
+                    for key, registers in pending.items():
+                        current = self._pending.get(key)
+                        if current is None:
+                            self._pending[key] = registers
+                        else:
+                            merge(current, registers)
+                self.failed_flushes += 1
+                logger.exception("failed to flush %d visitor sketches", len(pending))
+                return 0
+
+            self.flushes += 1
+            return len(updates)
+
+    def prune(self, keep_days: int = VISITOR_DAY_RETENTION_DAYS, now: float | None = None) -> None:
+        """删除超过保留期的按天草图，累计草图保留。"""
+
+        cutoff = day_start(time.time() if now is None else now) - keep_days * DAY
+        with SessionLocal.begin() as session:
+            session.execute(
+                delete(VisitorSketch).where(VisitorSketch.day != ALL_TIME, VisitorSketch.day < cutoff)
+            )
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            self.flush()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="yetla-visitor-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread = self._thread
+        self._thread = None
+        if thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            thread.join(timeout=max(self._interval, 1.0) * 2)
+        self.flush()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "recorded": self.recorded,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+visitor_sketches = VisitorSketches(VISITOR_FLUSH_INTERVAL, VISITOR_FLUSH_THRESHOLD)
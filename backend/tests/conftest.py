@@ -17,16 +17,28 @@ if TEST_DB_PATH.exists():
     TEST_DB_PATH.unlink()
 os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB_PATH}"
 
+from backend.app.cache import short_codes, short_link_cache, subdomain_routes, user_cache  # noqa: E402  pylint: disable=wrong-import-position
+from backend.app.hits import hit_counter  # noqa: E402  pylint: disable=wrong-import-position
+from backend.app.hotkeys import hot_keys  # noqa: E402  pylint: disable=wrong-import-position
 from backend.app.main import app  # noqa: E402  pylint: disable=wrong-import-position
 from backend.app.models import (  # noqa: E402  pylint: disable=wrong-import-position
+    ApiToken,
     Base,
+    ClickDay,
+    ClickHour,
+    ClickMinute,
     SessionLocal,
     ShortLink,
     SubdomainRedirect,
     User,
+    VisitorSketch,
     engine,
 )
-from backend.app.security import hash_password  # noqa: E402  pylint: disable=wrong-import-position
+from backend.app.security import credential_cache, hash_password  # noqa: E402  pylint: disable=wrong-import-position
+from backend.app.stats import summary_cache  # noqa: E402  pylint: disable=wrong-import-position
+from backend.app.throttle import auth_throttle  # noqa: E402  pylint: disable=wrong-import-position
+from backend.app.tokens import token_usage  # noqa: E402  pylint: disable=wrong-import-position
+from backend.app.visitors import visitor_sketches  # noqa: E402  pylint: disable=wrong-import-position
 
 REDIRECT_STATUSES = {301, 302, 303, 307, 308}
 
@@ -63,14 +75,19 @@ class SimpleResponse:
             return None
         return json.loads(self._body.decode("utf-8"))
 
+    @property
+    def content(self) -> bytes:
+        return self._body
+
     @property
     def text(self) -> str:
         return self._body.decode("utf-8")
 
 
 class SimpleClient:
-    def __init__(self) -> None:
+    def __init__(self, client: tuple[str, int] = ("127.0.0.1", 1234)) -> None:
         self._app = app
+        self._client = client
         self._cookies: dict[str, str] = {}
 
     def _run_request(
@@ -98,7 +115,7 @@ class SimpleClient:
             "scheme": "http",
             "query_string": query.encode("latin-1"),
             "headers": header_items,
-            "client": ("testclient", 1234),
+            "client": self._client,
             "server": (headers.get("host", "testserver"), 80),
         }
 
@@ -108,7 +125,8 @@ class SimpleClient:
         async def receive() -> dict[str, Any]:
             nonlocal body_sent
             if body_sent:
-                return {"type": "http.disconnect"}
+                # 与真实服务器一致：客户端保持连接直到响应发送完毕，流式响应不会被提前取消
+                await asyncio.Event().wait()
             body_sent = True
             return {"type": "http.request", "body": body, "more_body": False}
 
@@ -140,6 +158,7 @@ class SimpleClient:
         headers: dict[str, str] | None = None,
         json_body: Any | None = None,
         data: dict[str, str] | None = None,
+        content: bytes | None = None,
         auth: tuple[str, str] | None = None,
         follow_redirects: bool = True,
     ) -> SimpleResponse:
@@ -160,6 +179,8 @@ class SimpleClient:
             prepared_headers.setdefault(
                 "content-type", "application/x-www-form-urlencoded"
             )
+        elif content is not None:
+            body = content
 
         if auth is not None:
             token = base64.b64encode(f"{auth[0]}:{auth[1]}".encode("utf-8")).decode("ascii")
@@ -230,6 +251,7 @@ class SimpleClient:
         *,
         json: Any | None = None,
         data: dict[str, str] | None = None,
+        content: bytes | None = None,
         headers: dict[str, str] | None = None,
         auth: tuple[str, str] | None = None,
         follow_redirects: bool = True,
@@ -240,6 +262,7 @@ class SimpleClient:
             headers=headers,
             json_body=json,
             data=data,
+            content=content,
             auth=auth,
             follow_redirects=follow_redirects,
         )
@@ -296,16 +319,36 @@ def _prepare_database() -> None:
         )
         session.commit()
     yield
+    _reset_caches()
     Base.metadata.drop_all(bind=engine)
     if TEST_DB_PATH.exists():
         TEST_DB_PATH.unlink()
 
 
+def _reset_caches() -> None:
+    hit_counter.flush()
+    visitor_sketches.flush()
+    token_usage.flush()
+    subdomain_routes.invalidate()
+    short_link_cache.clear()
+    short_codes.invalidate()
+    user_cache.clear()
+    credential_cache.clear()
+    auth_throttle.clear()
+    summary_cache.clear()
+    hot_keys.clear()
+
+
 @pytest.fixture(autouse=True)
 def _clean_database() -> None:
+    _reset_caches()
     with SessionLocal() as session:
         session.execute(delete(ShortLink))
         session.execute(delete(SubdomainRedirect))
+        session.execute(delete(ApiToken))
+        for bucket_model in (ClickMinute, ClickHour, ClickDay):
+            session.execute(delete(bucket_model))
+        session.execute(delete(VisitorSketch))
         session.execute(delete(User).where(User.username != ADMIN_USERNAME))
         admin = session.scalar(select(User).where(User.username == ADMIN_USERNAME))
         if admin is not None:
@@ -324,9 +367,14 @@ def _clean_database() -> None:
             )
         session.commit()
     yield
+    _reset_caches()
     with SessionLocal() as session:
         session.execute(delete(ShortLink))
         session.execute(delete(SubdomainRedirect))
+        session.execute(delete(ApiToken))
+        for bucket_model in (ClickMinute, ClickHour, ClickDay):
+            session.execute(delete(bucket_model))
+        session.execute(delete(VisitorSketch))
         session.execute(delete(User).where(User.username != ADMIN_USERNAME))
         admin = session.scalar(select(User).where(User.username == ADMIN_USERNAME))
         if admin is not None:
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from sqlalchemy import select
+
+from backend.app.allocator import (
+    CODE_ALPHABET,
+    FeistelPermutation,
+    RandomCodeAllocator,
+    SequenceCodeAllocator,
+    encode_base62,
+)
+from backend.app.models import CodeSequence, SessionLocal, ShortLink
+
+ADMIN_AUTH = ("admin", "admin")
+
+
+def test_feistel_permutation_is_a_bijection() -> None:
+    permutation = FeistelPermutation(1000, b"test-key")
+    values = [permutation.permute(value) for value in range(1000)]
+    assert sorted(values) == list(range(1000))
+    assert values != list(range(1000))
+
+    other = FeistelPermutation(1000, b"other-key")
+    assert [other.permute(value) for value in range(1000)] != values
+
+
+def test_sequence_allocator_skips_taken_codes() -> None:
+    allocator = SequenceCodeAllocator(6, b"test-key", block_size=4)
+    with SessionLocal() as session:
+        sequence = session.get(CodeSequence, "short_code:6")
+        start = sequence.next_value if sequence is not None else 0
+        first = encode_base62(allocator._permutation.permute(start), 6)
+        session.add(ShortLink(code=first, target_url="https://example.com/custom"))
+        session.commit()
+
+        codes = allocator.allocate_many(session, 6)
+
+    assert len(set(codes)) == 6
+    assert first not in codes
+    assert all(len(code) == 6 and set(code) <= set(CODE_ALPHABET) for code in codes)
+    assert allocator.stats()["skipped"] == 1
+    assert allocator.stats()["blocks"] == 2
+
+
+def test_random_allocator_still_available() -> None:
+    allocator = RandomCodeAllocator(6)
+    with SessionLocal() as session:
+        codes = allocator.allocate_many(session, 20)
+    assert len(set(codes)) == 20
+
+
+def test_generated_codes_are_unique(client: "SimpleClient") -> None:
+    codes = set()
+    for index in range(5):
+        response = client.post(
+            "/api/links", json={"target_url": f"https://example.com/{index}"}, auth=ADMIN_AUTH
+        )
+        assert response.status_code == 201
+        codes.add(response.json()["code"])
+    assert len(codes) == 5
+    assert "code_allocator" in client.get("/api/metrics", auth=ADMIN_AUTH).json()
+
+
+def test_admin_dashboard_does_not_consume_codes(client: "SimpleClient") -> None:
+    from backend.app.allocator import code_allocator
+
+    assert client.post("/admin/login", data={"username": "admin", "password": "admin"}).status_code == 200
+    before = code_allocator.stats()
+    with SessionLocal() as session:
+        sequences = dict(session.execute(select(CodeSequence.name, CodeSequence.next_value)).all())
+
+    for _ in range(3):
+        page = client.get("/admin")
+        assert page.status_code == 200
+        assert 'placeholder="留空自动生成"' in page.text
+
+    assert code_allocator.stats() == before
+    with SessionLocal() as session:
+        assert dict(session.execute(select(CodeSequence.name, CodeSequence.next_value)).all()) == sequences
+
+    # 表单留空提交时由分配器生成编码。
+    created = client.post(
+        "/api/links",
+        data={"target_url": "https://example.com/form", "code": ""},
+        headers={"hx-request": "true"},
+    )
+    assert created.status_code == 201
+    assert code_allocator.stats()["allocated"] == before["allocated"] + 1
+
+
+def test_code_allocation_runs_off_the_event_loop(client: "SimpleClient", monkeypatch) -> None:
+    import threading
+
+    from backend.app.allocator import code_allocator
+
+    threads: list[int] = []
+    original = code_allocator.allocate
+
+    def recording_allocate(db):
+        threads.append(threading.get_ident())
+        return original(db)
+
+    monkeypatch.setattr(code_allocator, "allocate", recording_allocate)
+    created = client.post("/api/links", json={"target_url": "https://example.com/pool"}, auth=ADMIN_AUTH)
+    assert created.status_code == 201
+    # 测试客户端在当前线程运行事件循环，分配应交给线程池。
+    assert threads and threads[0] != threading.get_ident()
@@ -110,3 +110,135 @@ def test_change_password_flow(client: "SimpleClient") -> None:
         data={"username": "admin", "password": "changed123"},
     )
     assert good_login.status_code == 200
+
+
+def test_basic_auth_reuses_verified_credentials(client: "SimpleClient", monkeypatch) -> None:
+    from backend.app import security
+
+    calls: list[str] = []
+    original = security.verify_password
+
+    def counting_verify(password: str, stored_hash: str) -> bool:
+        calls.append(password)
+        return original(password, stored_hash)
+
+    monkeypatch.setattr(security, "verify_password", counting_verify)
+
+    for _ in range(3):
+        assert client.get("/api/links", auth=("admin", "admin")).status_code == 200
+    assert len(calls) == 1
+
+    assert client.get("/api/links", auth=("admin", "wrong")).status_code == 401
+    assert client.get("/api/links", auth=("admin", "wrong")).status_code == 401
+    assert len(calls) == 3
+
+    changed = client.post(
+        "/api/users/me/password",
+        json={
+            "current_password": "admin",
+            "new_password": "changed123",
+            "confirm_password": "changed123",
+        },
+        auth=("admin", "admin"),
+    )
+    assert changed.status_code == 204
+    assert security.credential_cache.stats()["size"] == 0
+    assert client.get("/api/links", auth=("admin", "admin")).status_code == 401
+    assert client.get("/api/links", auth=("admin", "changed123")).status_code == 200
+
+
+def test_saturated_password_pool_degrades_only_password_requests(
+    client: "SimpleClient", monkeypatch
+) -> None:
+    from backend.app.security import credential_cache, password_pool
+
+    client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/p", "code": "pool"},
+        auth=("admin", "admin"),
+    )
+    credential_cache.clear()
+    monkeypatch.setattr(password_pool, "_limit", 0)
+    rejected_before = password_pool.stats()["rejected"]
+
+    busy = client.get("/api/links", auth=("admin", "admin"))
+    assert busy.status_code == 503
+    assert busy.headers["retry-after"] == "1"
+
+    login = client.post(
+        "/admin/login",
+        data={"username": "admin", "password": "admin"},
+        follow_redirects=False,
+    )
+    assert login.status_code == 503
+    assert "登录请求过多" in login.text
+    assert password_pool.stats()["rejected"] == rejected_before + 2
+
+    assert client.get("/pool", follow_redirects=False).status_code == 302
+
+
+def test_session_requests_use_cached_user_and_honour_revocation(client: "SimpleClient") -> None:
+    from backend.app.cache import user_cache
+
+    other = type(client)()
+    for session_client in (client, other):
+        session_client.post("/admin/login", data={"username": "admin", "password": "admin"})
+
+    hits_before = user_cache.stats()["hits"]
+    for _ in range(3):
+        assert client.get("/admin/links/count").status_code == 200
+    assert user_cache.stats()["hits"] >= hits_before + 3
+
+    changed = client.post(
+        "/api/users/me/password",
+        data={
+            "current_password": "admin",
+            "new_password": "changed123",
+            "confirm_password": "changed123",
+        },
+        headers={"hx-request": "true"},
+    )
+    assert changed.status_code == 200
+
+    assert client.get("/admin", follow_redirects=False).status_code == 200
+    revoked = other.get("/admin", follow_redirects=False)
+    assert revoked.status_code == 303
+    assert revoked.headers["location"].startswith("/admin/login")
+
+
+def test_legacy_session_cookie_is_restamped(client: "SimpleClient") -> None:
+    from backend.app.session import SESSION_COOKIE_NAME, deserialize_session, serialize_session
+
+    client.post("/admin/login", data={"username": "admin", "password": "admin"})
+    legacy = deserialize_session(client._cookies[SESSION_COOKIE_NAME])
+    legacy.pop("issued_at")
+    client._cookies[SESSION_COOKIE_NAME] = serialize_session(legacy)
+
+    response = client.get("/admin", follow_redirects=False)
+    assert response.status_code == 200
+    restamped = deserialize_session(client._cookies[SESSION_COOKIE_NAME])
+    assert isinstance(restamped["issued_at"], int)
+    assert restamped["user_id"] == legacy["user_id"]
+
+    assert client.get("/admin/links/count").status_code == 200
+
+
+def test_legacy_session_deadline_survives_restart(client: "SimpleClient", monkeypatch) -> None:
+    import time
+
+    from backend.app import deps
+    from backend.app.session import SESSION_COOKIE_NAME, deserialize_session, serialize_session
+
+    deadline = deps.legacy_session_deadline()
+    monkeypatch.setattr(deps, "_legacy_deadline", None)
+    assert deps.legacy_session_deadline() == deadline
+
+    monkeypatch.setattr(deps, "_legacy_deadline", int(time.time()) - 1)
+    client.post("/admin/login", data={"username": "admin", "password": "admin"})
+    legacy = deserialize_session(client._cookies[SESSION_COOKIE_NAME])
+    legacy.pop("issued_at")
+    client._cookies[SESSION_COOKIE_NAME] = serialize_session(legacy)
+
+    response = client.get("/admin", follow_redirects=False)
+    assert response.status_code == 303
+    assert response.headers["location"].startswith("/admin/login")
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from backend.app.cache import BloomFilter, short_codes
+
+ADMIN_AUTH = ("admin", "admin")
+
+
+def test_bloom_filter_has_no_false_negatives() -> None:
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    codes = [f"code{i}" for i in range(1000)]
+    for code in codes:
+        bloom.add(code)
+
+    assert all(code in bloom for code in codes)
+    false_positives = sum(f"other{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_unknown_codes_are_answered_without_database(client: "SimpleClient") -> None:
+    client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/known", "code": "known"},
+        auth=ADMIN_AUTH,
+    )
+    assert client.get("/known", follow_redirects=False).status_code == 302
+    assert short_codes.loaded
+
+    filtered_before = short_codes.stats()["filtered"]
+    for _ in range(3):
+        missing = client.get("/wp-login.php", follow_redirects=False)
+        assert missing.status_code == 404
+        assert missing.json() == {"error": "短链接不存在"}
+    assert short_codes.stats()["filtered"] == filtered_before + 3
+
+
+def test_created_codes_are_visible_after_a_miss(client: "SimpleClient") -> None:
+    client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/seed", "code": "seed"},
+        auth=ADMIN_AUTH,
+    )
+    assert client.get("/later", follow_redirects=False).status_code == 404
+
+    created = client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/later", "code": "later"},
+        auth=ADMIN_AUTH,
+    ).json()
+    response = client.get("/later", follow_redirects=False)
+    assert response.status_code == 302
+
+    client.put(
+        f"/api/links/{created['id']}",
+        json={"code": "renamed", "target_url": "https://example.com/later"},
+        auth=ADMIN_AUTH,
+    )
+    assert client.get("/renamed", follow_redirects=False).status_code == 302
+    assert client.get("/later", follow_redirects=False).status_code == 404
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import time
+import urllib.parse
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+
+from backend.app.clicks import DAY, HOUR, ClickCompactor
+from backend.app.hits import hit_counter
+from backend.app.models import ClickDay, ClickHour, ClickMinute, SessionLocal
+
+ADMIN_AUTH = ("admin", "admin")
+
+
+def _iso(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def _query(url: str, **params: str) -> str:
+    return f"{url}?{urllib.parse.urlencode(params)}"
+
+
+def test_redirects_fill_minute_buckets(client: "SimpleClient") -> None:
+    created = client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/series", "code": "series"},
+        auth=ADMIN_AUTH,
+    ).json()
+    for _ in range(3):
+        client.get("/series", follow_redirects=False)
+
+    minutes = client.get(
+        _query(f"/api/links/{created['id']}/clicks", resolution="minute"), auth=ADMIN_AUTH
+    ).json()
+    assert minutes["resolution"] == "minute"
+    assert minutes["total"] == 3
+    assert len(minutes["points"]) == 60
+    assert sum(point["hits"] for point in minutes["points"]) == 3
+
+    days = client.get(f"/api/links/{created['id']}/clicks", auth=ADMIN_AUTH).json()
+    assert len(days["points"]) == 30
+    assert days["points"][-1]["hits"] == 3
+
+
+def test_compaction_keeps_totals_across_resolutions(client: "SimpleClient") -> None:
+    created = client.post(
+        "/api/subdomains",
+        json={"host": "rollup.example.com", "target_url": "https://example.com"},
+        auth=ADMIN_AUTH,
+    ).json()
+    day = int(time.time()) // DAY * DAY - 10 * DAY
+    for offset in (0, 61, 2 * HOUR + 5, DAY + 30):
+        hit_counter.record("subdomain", created["id"], at=day + offset)
+    hit_counter.flush()
+
+    compactor = ClickCompactor(interval=0, minute_retention=2 * DAY, hour_retention=5 * DAY)
+    assert compactor.compact() == (4, 3)
+    with SessionLocal() as session:
+        assert session.scalar(select(func.count()).select_from(ClickMinute)) == 0
+        assert session.scalar(select(func.count()).select_from(ClickHour)) == 0
+        assert session.scalar(select(func.sum(ClickDay.hits))) == 4
+
+    params = {"resolution": "day", "start": _iso(day), "end": _iso(day + 3 * DAY)}
+    days = client.get(_query(f"/api/subdomains/{created['id']}/clicks", **params), auth=ADMIN_AUTH).json()
+    assert [point["hits"] for point in days["points"]] == [3, 1, 0]
+
+    # 已汇总到天表的点击不再出现在小时粒度的查询中。
+    params = {"resolution": "hour", "start": _iso(day), "end": _iso(day + DAY)}
+    hours = client.get(_query(f"/api/subdomains/{created['id']}/clicks", **params), auth=ADMIN_AUTH).json()
+    assert hours["total"] == 0
+
+
+def test_click_series_is_scoped_and_validated(client: "SimpleClient") -> None:
+    client.post(
+        "/api/users",
+        json={"username": "viewer", "email": "viewer@example.com", "password": "viewerpass"},
+        auth=ADMIN_AUTH,
+    )
+    created = client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/private", "code": "private"},
+        auth=ADMIN_AUTH,
+    ).json()
+    url = f"/api/links/{created['id']}/clicks"
+
+    assert client.get(url, auth=("viewer", "viewerpass")).status_code == 403
+    assert client.get("/api/links/999999/clicks", auth=ADMIN_AUTH).status_code == 404
+    assert client.get(_query(url, resolution="week"), auth=ADMIN_AUTH).status_code == 422
+    backwards = {"start": "2026-01-02T00:00:00", "end": "2026-01-01T00:00:00"}
+    assert client.get(_query(url, **backwards), auth=ADMIN_AUTH).status_code == 400
+    too_long = {"resolution": "minute", "start": "2026-01-01T00:00:00", "end": "2026-02-01T00:00:00"}
+    assert client.get(_query(url, **too_long), auth=ADMIN_AUTH).status_code == 400
+
+
+def test_deleting_a_link_removes_its_buckets(client: "SimpleClient") -> None:
+    created = client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/gone", "code": "gone"},
+        auth=ADMIN_AUTH,
+    ).json()
+    client.get("/gone", follow_redirects=False)
+    hit_counter.flush()
+
+    assert client.delete(f"/api/links/{created['id']}", auth=ADMIN_AUTH).status_code == 204
+    with SessionLocal() as session:
+        assert session.scalar(select(func.count()).select_from(ClickMinute)) == 0
+
+
+def test_deleting_an_entity_drops_its_pending_hits(client: "SimpleClient") -> None:
+    link = client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/queued", "code": "queued"},
+        auth=ADMIN_AUTH,
+    ).json()
+    redirect = client.post(
+        "/api/subdomains",
+        json={"host": "queued.example.com", "target_url": "https://example.com"},
+        auth=ADMIN_AUTH,
+    ).json()
+    client.get("/queued", follow_redirects=False)
+    hit_counter.record("subdomain", redirect["id"])
+    assert hit_counter.stats()["pending"] == 2
+
+    assert client.delete(f"/api/links/{link['id']}", auth=ADMIN_AUTH).status_code == 204
+    assert client.delete(f"/api/subdomains/{redirect['id']}", auth=ADMIN_AUTH).status_code == 204
+    assert hit_counter.flush() == 0
+    with SessionLocal() as session:
+        assert session.scalar(select(func.count()).select_from(ClickMinute)) == 0
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+
+from backend.app import exporter
+
+ADMIN_AUTH = ("admin", "admin")
+
+
+def test_export_links_streams_ndjson_and_csv(client: "SimpleClient", monkeypatch) -> None:
+    monkeypatch.setattr(exporter, "EXPORT_CHUNK_ROWS", 2)
+    for index in range(5):
+        client.post(
+            "/api/links",
+            json={"target_url": f"https://example.com/{index}", "code": f"exp{index}"},
+            auth=ADMIN_AUTH,
+        )
+    client.get("/exp3", follow_redirects=False)
+
+    ndjson = client.get("/api/links/export", auth=ADMIN_AUTH)
+    assert ndjson.status_code == 200
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert [record["code"] for record in records] == [f"exp{index}" for index in range(5)]
+    assert records[3]["hits"] == 1
+    assert records[0]["owner"] == "admin"
+
+    compressed = client.get(
+        "/api/links/export?format=csv", headers={"accept-encoding": "gzip"}, auth=ADMIN_AUTH
+    )
+    assert compressed.headers["content-encoding"] == "gzip"
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(compressed.content).decode("utf-8"))))
+    assert len(rows) == 5
+    assert rows[3]["hits"] == "1"
+    assert rows[0]["cache_max_age"] == ""
+
+    future = client.get("/api/links/export?format=csv&since=2999-01-01T00:00:00", auth=ADMIN_AUTH)
+    assert future.text.splitlines() == [
+        "id,code,target_url,hits,cache_max_age,created_at,owner"
+    ]
+
+
+def test_export_is_scoped_to_owner(client: "SimpleClient") -> None:
+    client.post(
+        "/api/users",
+        json={"username": "exporter", "email": "exporter@example.com", "password": "exportpass"},
+        auth=ADMIN_AUTH,
+    )
+    user_auth = ("exporter", "exportpass")
+    client.post(
+        "/api/subdomains",
+        json={"host": "admin.example.com", "target_url": "https://example.com", "code": 302},
+        auth=ADMIN_AUTH,
+    )
+    client.post(
+        "/api/subdomains",
+        json={"host": "mine.example.com", "target_url": "https://example.com", "code": 301},
+        auth=user_auth,
+    )
+
+    own = client.get("/api/subdomains/export", auth=user_auth)
+    assert [json.loads(line)["host"] for line in own.text.splitlines()] == ["mine.example.com"]
+    assert client.get("/api/subdomains/export?owner=admin", auth=user_auth).status_code == 403
+
+    filtered = client.get("/api/subdomains/export?owner=exporter", auth=ADMIN_AUTH)
+    assert [json.loads(line)["host"] for line in filtered.text.splitlines()] == ["mine.example.com"]
+    assert len(client.get("/api/subdomains/export", auth=ADMIN_AUTH).text.splitlines()) == 2
+
+
+def test_paused_export_does_not_block_writers(client: "SimpleClient", monkeypatch) -> None:
+    from sqlalchemy import update
+
+    from backend.app.models import SessionLocal, ShortLink
+
+    monkeypatch.setattr(exporter, "EXPORT_CHUNK_ROWS", 2)
+    for index in range(5):
+        client.post(
+            "/api/links",
+            json={"target_url": f"https://example.com/{index}", "code": f"slow{index}"},
+            auth=ADMIN_AUTH,
+        )
+
+    stream = exporter.iter_export(exporter.SHORT_LINK_EXPORT, exporter.FORMAT_NDJSON)
+    first = next(stream)
+    with SessionLocal() as session:
+        session.execute(update(ShortLink).where(ShortLink.code == "slow4").values(hits=7))
+        session.commit()
+
+    records = [json.loads(line) for line in (first + b"".join(stream)).decode("utf-8").splitlines()]
+    assert [record["code"] for record in records] == [f"slow{index}" for index in range(5)]
+    assert records[4]["hits"] == 7
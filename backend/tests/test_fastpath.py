@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from backend.app.fastpath import fast_path_counters
+
+ADMIN_AUTH = ("admin", "admin")
+
+
+def test_fast_path_serves_warm_short_links(client: "SimpleClient") -> None:
+    client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/a b", "code": "warm"},
+        auth=ADMIN_AUTH,
+    )
+
+    cold = client.get("/warm", follow_redirects=False)
+    served_before = fast_path_counters["served"]
+    warm = client.get("/warm", follow_redirects=False)
+
+    assert fast_path_counters["served"] == served_before + 1
+    assert warm.status_code == cold.status_code == 302
+    assert warm.headers["location"] == cold.headers["location"] == "https://example.com/a%20b"
+    assert warm.headers["content-length"] == "0"
+
+
+def test_fast_path_serves_host_rules(client: "SimpleClient") -> None:
+    client.post(
+        "/api/subdomains",
+        json={"host": "fast.test", "target_url": "https://example.com/base", "code": 301},
+        auth=ADMIN_AUTH,
+    )
+    client.get("/", headers={"host": "fast.test"}, follow_redirects=False)
+
+    served_before = fast_path_counters["served"]
+    response = client.get(
+        "/docs/page?x=1", headers={"host": "fast.test:443"}, follow_redirects=False
+    )
+    assert fast_path_counters["served"] == served_before + 1
+    assert response.status_code == 301
+    assert response.headers["location"] == "https://example.com/base/docs/page?x=1"
+
+    listing = client.get("/api/subdomains", auth=ADMIN_AUTH).json()
+    assert listing[0]["hits"] == 2
+
+
+def test_fast_path_leaves_registered_routes_alone(client: "SimpleClient") -> None:
+    client.post(
+        "/api/subdomains",
+        json={"host": "shadow.test", "target_url": "https://example.com/shadow"},
+        auth=ADMIN_AUTH,
+    )
+    client.get("/", headers={"host": "shadow.test"}, follow_redirects=False)
+
+    health = client.get("/healthz", headers={"host": "shadow.test"}, follow_redirects=False)
+    assert health.status_code == 200
+    assert health.json() == {"ok": True}
+
+    posted = client.post("/form", headers={"host": "shadow.test"}, follow_redirects=False)
+    assert posted.status_code == 302
+    assert posted.headers["location"] == "https://example.com/shadow/form"
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from backend.app.hits import HitCounter
+from backend.app.models import SessionLocal, ShortLink
+
+ADMIN_AUTH = ("admin", "admin")
+
+
+def test_hit_counter_aggregates_deltas_per_flush(client: "SimpleClient") -> None:
+    created = client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/batched", "code": "batched"},
+        auth=ADMIN_AUTH,
+    ).json()
+
+    counter = HitCounter(interval=60, threshold=100)
+    for _ in range(5):
+        counter.record_short_link(created["id"])
+    assert counter.stats()["pending"] == 1
+
+    assert counter.flush() == 5
+    assert counter.flush() == 0
+    with SessionLocal() as session:
+        assert session.get(ShortLink, created["id"]).hits == 5
+
+
+def test_redirects_do_not_write_until_flush(client: "SimpleClient") -> None:
+    created = client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/deferred", "code": "deferred"},
+        auth=ADMIN_AUTH,
+    ).json()
+
+    for _ in range(3):
+        assert client.get("/deferred", follow_redirects=False).status_code == 302
+
+    with SessionLocal() as session:
+        assert session.get(ShortLink, created["id"]).hits == 0
+
+    listing = client.get("/api/links", auth=ADMIN_AUTH).json()
+    assert listing[0]["hits"] == 3
+
+
+def test_read_endpoints_overlay_pending_hits_without_writing(client: "SimpleClient") -> None:
+    from backend.app.hits import hit_counter
+
+    created = client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/overlay", "code": "overlay"},
+        auth=ADMIN_AUTH,
+    ).json()
+    for _ in range(2):
+        assert client.get("/overlay", follow_redirects=False).status_code == 302
+    flushes = hit_counter.stats()["flushes"]
+
+    assert client.get("/api/links", auth=ADMIN_AUTH).json()[0]["hits"] == 2
+    assert client.get("/api/links/search?q=overlay", auth=ADMIN_AUTH).json()[0]["hits"] == 2
+    assert client.get("/api/stats", auth=ADMIN_AUTH).json()["short_links"]["hits"] == 2
+    assert client.get(f"/api/links/{created['id']}/clicks", auth=ADMIN_AUTH).json()["total"] == 2
+    assert '"hits": 2' in client.get("/api/links/export", auth=ADMIN_AUTH).text
+    client.get("/routes")
+
+    assert hit_counter.stats()["flushes"] == flushes
+    with SessionLocal() as session:
+        assert session.get(ShortLink, created["id"]).hits == 0
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from backend.app.hotkeys import DecayingSpaceSaving
+
+ADMIN_AUTH = ("admin", "admin")
+
+
+def test_space_saving_keeps_heavy_hitters_in_constant_memory() -> None:
+    summary = DecayingSpaceSaving(capacity=8, tau=60, now=0)
+    for index in range(1000):
+        summary.add("hot", now=index * 0.01)
+        if index % 2 == 0:
+            summary.add("warm", now=index * 0.01)
+        summary.add(f"noise-{index}", now=index * 0.01)
+
+    assert len(summary) == 8
+    top = summary.top(2, now=10)
+    assert [entry["key"] for entry in top] == ["hot", "warm"]
+    assert 800 < top[0]["score"] <= 1000
+
+    # 十个时间常数之后旧的命中几乎完全淡出。
+    assert summary.top(2, now=10 + 600) == []
+
+
+def test_decay_rescaling_preserves_ranking() -> None:
+    summary = DecayingSpaceSaving(capacity=2, tau=1, now=0)
+    for step in range(100):
+        summary.add("a", now=step)
+        summary.add("a", now=step)
+        summary.add("b", now=step)
+    top = summary.top(2, now=99)
+    assert [entry["key"] for entry in top] == ["a", "b"]
+    assert round(top[0]["score"] / top[1]["score"]) == 2
+
+
+def test_redirects_feed_hot_endpoint_and_panel(client: "SimpleClient") -> None:
+    client.post("/api/links", json={"target_url": "https://example.com/h", "code": "hotcode"}, auth=ADMIN_AUTH)
+    client.post(
+        "/api/subdomains",
+        json={"host": "hot.example.com", "target_url": "https://example.com"},
+        auth=ADMIN_AUTH,
+    )
+    for _ in range(3):
+        client.get("/hotcode", follow_redirects=False)
+    client.get("/", headers={"Host": "hot.example.com"}, follow_redirects=False)
+
+    payload = client.get("/api/hot?limit=5", auth=ADMIN_AUTH).json()
+    assert payload["windows"] == {"1m": 60, "5m": 300, "1h": 3600}
+    assert payload["top"]["1m"]["code"][0]["key"] == "hotcode"
+    assert payload["top"]["1m"]["code"][0]["score"] >= 2.9
+    assert payload["top"]["1h"]["host"][0]["key"] == "hot.example.com"
+
+    panel = client.get("/admin/hot/table", auth=ADMIN_AUTH).text
+    assert "hotcode" in panel and "hot.example.com" in panel
+    assert "hotcode" in client.get("/admin?tab=hot", auth=ADMIN_AUTH).text
+
+    client.post(
+        "/api/users",
+        json={"username": "plain", "email": "plain@example.com", "password": "plainpass"},
+        auth=ADMIN_AUTH,
+    )
+    assert client.get("/api/hot", auth=("plain", "plainpass")).status_code == 403
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import json
+
+from backend.app import importer
+from backend.app.cache import subdomain_routes
+
+ADMIN_AUTH = ("admin", "admin")
+
+
+def test_import_short_links_from_csv_reports_rows(client: "SimpleClient", monkeypatch) -> None:
+    monkeypatch.setattr(importer, "IMPORT_BATCH_SIZE", 2)
+    client.post("/api/links", json={"target_url": "https://example.com/taken", "code": "taken"}, auth=ADMIN_AUTH)
+    body = "\n".join(
+        [
+            "code,target_url,cache_max_age",
+            "alpha,https://example.com/a,",
+            "beta,https://example.com/b,60",
+            "taken,https://example.com/c,",
+            "alpha,https://example.com/d,",
+            ",https://example.com/generated,",
+            "gamma,https://example.com/e,-5",
+        ]
+    ).encode("utf-8")
+
+    response = client.post(
+        "/api/links/import", content=body, headers={"content-type": "text/csv"}, auth=ADMIN_AUTH
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["total"], report["created"], report["failed"]) == (6, 3, 3)
+    assert {(error["line"], error["key"]) for error in report["errors"]} == {
+        (4, "taken"),
+        (5, "alpha"),
+        (7, None),
+    }
+
+    listing = {item["code"]: item for item in client.get("/api/links", auth=ADMIN_AUTH).json()}
+    assert listing["beta"]["cache_max_age"] == 60
+    assert listing["alpha"]["owner_username"] == "admin"
+    assert len(listing) == 4
+    assert client.get("/beta", follow_redirects=False).headers["location"] == "https://example.com/b"
+
+
+def test_import_subdomains_from_ndjson(client: "SimpleClient") -> None:
+    lines = [
+        json.dumps({"host": "Imported.Example.com", "target_url": "https://example.com/one", "code": 301}),
+        "not json",
+        json.dumps({"host": "imported.example.com", "target_url": "https://example.com/dup"}),
+        json.dumps({"host": "two.example.com", "target_url": "https://example.com/two", "code": 307}),
+    ]
+    response = client.post(
+        "/api/subdomains/import?format=ndjson",
+        content="\n".join(lines).encode("utf-8"),
+        auth=ADMIN_AUTH,
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["total"], report["created"], report["failed"]) == (4, 1, 3)
+    assert [error["line"] for error in report["errors"]] == [2, 3, 4]
+
+    route = subdomain_routes.lookup("imported.example.com")
+    assert route is not None and route.code == 301
+
+
+def test_import_command_line(client: "SimpleClient", tmp_path, capsys) -> None:
+    source = tmp_path / "links.ndjson"
+    source.write_text(json.dumps({"code": "cli", "target_url": "https://example.com/cli"}) + "\n")
+
+    assert importer.main(["links", str(source), "--owner", "admin"]) == 0
+    assert "created 1" in capsys.readouterr().out
+    assert client.get("/cli", follow_redirects=False).headers["location"] == "https://example.com/cli"
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from sqlalchemy import select
+
+from backend.app.cache import SubdomainRoute
+from backend.app.models import ClickMinute, SessionLocal
+from backend.app.nginx_map import LogIngester, ingest_access_log, render_maps, write_maps
+
+ADMIN_AUTH = ("admin", "admin")
+
+
+def test_render_maps_splits_by_status_and_skips_unsafe_targets() -> None:
+    rendered = render_maps(
+        [
+            SubdomainRoute(
+                id=1,
+                host="a.test",
+                target_url="https://example.com/a/",
+                code=301,
+                cache_control="public, max-age=60, immutable",
+            ),
+            SubdomainRoute(id=2, host="*.b.test", target_url="https://example.com/b", code=302),
+            SubdomainRoute(id=3, host="q.test", target_url="https://example.com/?x=1", code=302),
+        ]
+    )
+
+    assert 'a.test "https://example.com/a";' in rendered["redirects-301.map"]
+    assert '*.b.test "https://example.com/b";' in rendered["redirects-302.map"]
+    assert "q.test" not in rendered["redirects-302.map"]
+    assert rendered["redirect-ids.map"].splitlines()[1:] == ["*.b.test 2;", "a.test 1;"]
+    assert rendered["redirect-cache-control.map"].splitlines()[1:] == [
+        'a.test "public, max-age=60, immutable";'
+    ]
+
+
+def test_write_maps_is_idempotent(tmp_path: Path) -> None:
+    routes = [SubdomainRoute(id=1, host="a.test", target_url="https://example.com", code=302)]
+    assert write_maps(tmp_path, routes) is True
+    assert write_maps(tmp_path, routes) is False
+    assert (tmp_path / "redirects-302.map").read_text().endswith('a.test "https://example.com";\n')
+
+
+def test_ingest_access_log_updates_hits(client: "SimpleClient", tmp_path: Path) -> None:
+    created = client.post(
+        "/api/subdomains",
+        json={"host": "edge.test", "target_url": "https://example.com/edge"},
+        auth=ADMIN_AUTH,
+    ).json()
+
+    log_path = tmp_path / "redirects.log"
+    log_path.write_text(f"{created['id']}\n{created['id']}\n{created['id']}")
+    assert ingest_access_log(log_path) == 2
+
+    with log_path.open("a") as handle:
+        handle.write("\n")
+    assert ingest_access_log(log_path) == 1
+
+    listing = client.get("/api/subdomains", auth=ADMIN_AUTH).json()
+    assert listing[0]["hits"] == 3
+
+
+def test_ingest_access_log_buckets_by_request_time(client: "SimpleClient", tmp_path: Path) -> None:
+    created = client.post(
+        "/api/subdomains",
+        json={"host": "timed.test", "target_url": "https://example.com/timed"},
+        auth=ADMIN_AUTH,
+    ).json()
+
+    log_path = tmp_path / "redirects.log"
+    log_path.write_text(f"{created['id']} 1790000000.250\n{created['id']} 1790000059.999\n")
+    assert ingest_access_log(log_path) == 2
+
+    with SessionLocal() as session:
+        buckets = session.execute(select(ClickMinute.bucket_start, ClickMinute.hits)).all()
+    assert buckets == [(1789999980, 1), (1790000040, 1)]
+
+
+def test_log_ingester_runs_in_background(client: "SimpleClient", tmp_path: Path) -> None:
+    import time
+
+    created = client.post(
+        "/api/subdomains",
+        json={"host": "tail.test", "target_url": "https://example.com/tail"},
+        auth=ADMIN_AUTH,
+    ).json()
+    log_path = tmp_path / "redirects.log"
+    log_path.write_text(f"{created['id']}\n{created['id']}\n")
+
+    ingester = LogIngester(str(log_path), interval=0.05)
+    ingester.start()
+    try:
+        deadline = time.monotonic() + 5
+        while ingester.stats()["ingested"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        with log_path.open("a") as handle:
+            handle.write(f"{created['id']}\n")
+    finally:
+        ingester.stop()
+
+    assert ingester.stats()["ingested"] == 3
+    assert ingester.stats()["failures"] == 0
+    assert not LogIngester("", interval=30).enabled
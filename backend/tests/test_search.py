@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import pytest
+
+from backend.app import search
+
+ADMIN_AUTH = ("admin", "admin")
+
+
+def _codes(response) -> list[str]:
+    assert response.status_code == 200
+    return sorted(item["code"] for item in response.json())
+
+
+def test_search_links_by_prefix_and_keeps_index_in_sync(client: "SimpleClient") -> None:
+    created = client.post(
+        "/api/links",
+        json={"target_url": "https://docs.example.com/guide", "code": "handbook"},
+        auth=ADMIN_AUTH,
+    ).json()
+    client.post("/api/links", json={"target_url": "https://other.test/x", "code": "misc"}, auth=ADMIN_AUTH)
+    client.get("/handbook", follow_redirects=False)
+
+    assert _codes(client.get("/api/links/search?q=hand", auth=ADMIN_AUTH)) == ["handbook"]
+    assert _codes(client.get("/api/links/search?q=docs%20gui", auth=ADMIN_AUTH)) == ["handbook"]
+    assert _codes(client.get("/api/links/search?q=example", auth=ADMIN_AUTH)) == ["handbook"]
+
+    client.put(
+        f"/api/links/{created['id']}",
+        json={"code": "manual", "target_url": "https://docs.example.com/guide"},
+        auth=ADMIN_AUTH,
+    )
+    assert _codes(client.get("/api/links/search?q=hand", auth=ADMIN_AUTH)) == []
+    assert _codes(client.get("/api/links/search?q=manu", auth=ADMIN_AUTH)) == ["manual"]
+
+    client.delete(f"/api/links/{created['id']}", auth=ADMIN_AUTH)
+    assert _codes(client.get("/api/links/search?q=manu", auth=ADMIN_AUTH)) == []
+
+    fragment = client.get("/admin/links/search?q=misc", auth=ADMIN_AUTH)
+    assert fragment.status_code == 200
+    assert "short-link-row-" in fragment.text
+    assert "没有与「nothing」匹配的短链" in client.get("/admin/links/search?q=nothing", auth=ADMIN_AUTH).text
+
+
+def test_search_subdomains_is_scoped_to_owner(client: "SimpleClient") -> None:
+    client.post(
+        "/api/users",
+        json={"username": "finder", "email": "finder@example.com", "password": "finderpass"},
+        auth=ADMIN_AUTH,
+    )
+    client.post(
+        "/api/subdomains",
+        json={"host": "status.example.com", "target_url": "https://status.page", "code": 302},
+        auth=ADMIN_AUTH,
+    )
+
+    admin_hits = client.get("/api/subdomains/search?q=status", auth=ADMIN_AUTH).json()
+    assert [item["host"] for item in admin_hits] == ["status.example.com"]
+    assert client.get("/api/subdomains/search?q=status", auth=("finder", "finderpass")).json() == []
+
+
+@pytest.mark.parametrize("query", ["ample.com/gu", "HANDBOOK"])
+def test_search_falls_back_to_like_without_fts5(
+    client: "SimpleClient", monkeypatch: pytest.MonkeyPatch, query: str
+) -> None:
+    monkeypatch.setattr(search, "FTS5_AVAILABLE", False)
+    client.post(
+        "/api/links",
+        json={"target_url": "https://docs.example.com/guide", "code": "handbook"},
+        auth=ADMIN_AUTH,
+    )
+
+    response = client.get(f"/api/links/search?q={query}", auth=ADMIN_AUTH)
+    assert _codes(response) == ["handbook"]
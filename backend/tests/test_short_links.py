@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import re
+
 ADMIN_AUTH = ("admin", "admin")
 
 
@@ -199,3 +201,156 @@ def test_non_admin_cannot_modify_other_users_links(client: "SimpleClient") -> No
     )
     assert forbidden_update.status_code == 403
     assert forbidden_update.json()["detail"] == "无权操作该短链"
+
+
+def test_short_link_cache_follows_updates(client: "SimpleClient") -> None:
+    created = client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/v1", "code": "cached"},
+        auth=ADMIN_AUTH,
+    ).json()
+
+    for _ in range(2):
+        response = client.get("/cached", follow_redirects=False)
+        assert response.headers["location"] == "https://example.com/v1"
+
+    stats = client.get("/api/metrics", auth=ADMIN_AUTH).json()["short_link_cache"]
+    assert stats["hits"] >= 1
+    assert stats["misses"] >= 1
+
+    client.put(
+        f"/api/links/{created['id']}",
+        json={"code": "cached", "target_url": "https://example.com/v2"},
+        auth=ADMIN_AUTH,
+    )
+    updated = client.get("/cached", follow_redirects=False)
+    assert updated.headers["location"] == "https://example.com/v2"
+
+    client.delete(f"/api/links/{created['id']}", auth=ADMIN_AUTH)
+    removed = client.get("/cached", follow_redirects=False)
+    assert removed.status_code == 404
+
+
+def test_short_link_resolution_without_async_driver(client: "SimpleClient") -> None:
+    import asyncio
+
+    from backend.app.main import _resolve_short_link
+
+    client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/sync", "code": "sync"},
+        auth=ADMIN_AUTH,
+    )
+
+    target = asyncio.run(_resolve_short_link("sync", None))
+    assert target is not None
+    assert target.target_url == "https://example.com/sync"
+    assert asyncio.run(_resolve_short_link("absent", None)) is None
+
+
+def test_short_link_resolution_with_async_session(client: "SimpleClient", monkeypatch) -> None:
+    import asyncio
+
+    import pytest
+
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    from backend.app.cache import short_codes, short_link_cache
+    from backend.app.main import _resolve_short_link
+    from backend.app.models import ASYNC_DATABASE_URL
+
+    client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/async", "code": "async"},
+        auth=ADMIN_AUTH,
+    )
+    short_link_cache.clear()
+    # 让未命中的 code 也越过 Bloom 过滤器，真正经由 AsyncSession 查询。
+    monkeypatch.setattr(short_codes, "might_exist", lambda code: True)
+
+    async def resolve(*codes: str) -> list[object]:
+        engine = create_async_engine(ASYNC_DATABASE_URL)
+        try:
+            async with AsyncSession(engine) as session:
+                return [await _resolve_short_link(code, session) for code in codes]
+        finally:
+            await engine.dispose()
+
+    hit, miss = asyncio.run(resolve("async", "absent"))
+    assert hit is not None
+    assert hit.target_url == "https://example.com/async"
+    assert miss is None
+    assert short_link_cache.get("async") == hit
+
+
+def test_short_link_cache_policy(client: "SimpleClient") -> None:
+    client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/counted", "code": "counted", "cache_max_age": 0},
+        auth=ADMIN_AUTH,
+    )
+    client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/edge", "code": "edge", "cache_max_age": 60},
+        auth=ADMIN_AUTH,
+    )
+
+    for _ in range(2):
+        assert client.get("/counted", follow_redirects=False).headers["cache-control"] == "no-store"
+        assert client.get("/edge", follow_redirects=False).headers["cache-control"] == (
+            "public, max-age=60"
+        )
+
+    rejected = client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/bad", "code": "bad", "cache_max_age": -1},
+        auth=ADMIN_AUTH,
+    )
+    assert rejected.status_code == 422
+
+
+def test_list_short_links_paginates_with_cursor(client: "SimpleClient") -> None:
+    # 同一秒内创建的短链 created_at 相同，翻页依靠 id 区分边界。
+    codes = [f"page{index}" for index in range(5)]
+    for code in codes:
+        client.post("/api/links", json={"target_url": "https://example.com", "code": code}, auth=ADMIN_AUTH)
+
+    seen: list[str] = []
+    url = "/api/links?limit=2"
+    while True:
+        page = client.get(url, auth=ADMIN_AUTH)
+        assert page.status_code == 200
+        assert len(page.json()) <= 2
+        seen.extend(item["code"] for item in page.json())
+        cursor = page.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+        url = f"/api/links?limit=2&cursor={cursor}"
+
+    assert seen == list(reversed(codes))
+    assert [item["code"] for item in client.get("/api/links", auth=ADMIN_AUTH).json()] == seen
+
+    invalid = client.get("/api/links?limit=2&cursor=not-a-cursor", auth=ADMIN_AUTH)
+    assert invalid.status_code == 400
+
+
+def test_admin_link_table_loads_more_rows_by_cursor(client: "SimpleClient", monkeypatch) -> None:
+    from backend.app import views
+
+    monkeypatch.setattr(views, "ADMIN_PAGE_SIZE", 2)
+    for code in ("rowa", "rowb", "rowc"):
+        client.post("/api/links", json={"target_url": "https://example.com", "code": code}, auth=ADMIN_AUTH)
+
+    first = client.get("/admin/links/table", auth=ADMIN_AUTH)
+    assert first.status_code == 200
+    assert "<table" in first.text
+    assert "rowc" in first.text and "rowb" in first.text and "rowa" not in first.text
+    match = re.search(r'hx-get="(/admin/links/table\?cursor=[^"]+)"', first.text)
+    assert match is not None
+
+    more = client.get(match.group(1), auth=ADMIN_AUTH)
+    assert more.status_code == 200
+    assert "<table" not in more.text
+    assert "rowa" in more.text
+    assert "加载更多" not in more.text
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from backend.app.models import SessionLocal, ShortLink
+from backend.app.stats import summary_cache
+from backend.app.sync import ENTITY_SHORT_LINK, record_change
+
+ADMIN_AUTH = ("admin", "admin")
+
+
+def test_stats_are_scoped_to_owner(client: "SimpleClient") -> None:
+    client.post(
+        "/api/users",
+        json={"username": "owner", "email": "owner@example.com", "password": "ownerpass"},
+        auth=ADMIN_AUTH,
+    )
+    client.post("/api/links", json={"target_url": "https://example.com/a", "code": "mine"}, auth=("owner", "ownerpass"))
+    client.post("/api/links", json={"target_url": "https://example.com/b", "code": "theirs"}, auth=ADMIN_AUTH)
+    client.post(
+        "/api/subdomains",
+        json={"host": "stats.example.com", "target_url": "https://example.com", "code": 302},
+        auth=ADMIN_AUTH,
+    )
+    client.get("/mine", follow_redirects=False)
+    client.get("/mine", follow_redirects=False)
+
+    overall = client.get("/api/stats", auth=ADMIN_AUTH).json()
+    assert overall == {
+        "short_links": {"count": 2, "hits": 2},
+        "subdomains": {"count": 1, "hits": 0},
+        "users": {"count": 2},
+    }
+
+    own = client.get("/api/stats", auth=("owner", "ownerpass")).json()
+    assert own == {
+        "short_links": {"count": 1, "hits": 2},
+        "subdomains": {"count": 0, "hits": 0},
+    }
+
+
+def test_counts_are_reused_until_data_version_changes(client: "SimpleClient") -> None:
+    client.post("/api/links", json={"target_url": "https://example.com/a", "code": "one"}, auth=ADMIN_AUTH)
+    assert "(1)" in client.get("/admin/links/count", auth=ADMIN_AUTH).text
+
+    misses = summary_cache.stats()["misses"]
+    assert "(1)" in client.get("/admin/links/count", auth=ADMIN_AUTH).text
+    assert summary_cache.stats()["misses"] == misses
+
+    # 另一个 worker 的写入同样推进数据版本，缓存的计数随之失效。
+    with SessionLocal() as session:
+        session.add(ShortLink(code="two", target_url="https://example.com/b"))
+        record_change(session, ENTITY_SHORT_LINK, "two")
+        session.commit()
+
+    assert "(2)" in client.get("/admin/links/count", auth=ADMIN_AUTH).text
+    assert summary_cache.stats()["misses"] == misses + 1
+
+
+def test_count_badges_do_not_sum_hits(client: "SimpleClient") -> None:
+    from sqlalchemy import event
+
+    from backend.app.models import engine
+
+    statements: list[str] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement.lower())
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        assert "(0)" in client.get("/admin/links/count", auth=ADMIN_AUTH).text
+        assert "(0)" in client.get("/admin/subdomains/count", auth=ADMIN_AUTH).text
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert any("count(" in statement for statement in statements)
+    assert not any("sum(" in statement for statement in statements)
+    assert client.get("/api/stats", auth=ADMIN_AUTH).json()["short_links"] == {"count": 0, "hits": 0}
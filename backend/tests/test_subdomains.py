@@ -230,3 +230,116 @@ def test_non_admin_cannot_modify_other_subdomains(client: "SimpleClient") -> Non
     )
     assert forbidden_update.status_code == 403
     assert forbidden_update.json()["detail"] == "无权操作该子域"
+
+
+def test_host_redirect_follows_rule_updates(client: "SimpleClient") -> None:
+    created = client.post(
+        "/api/subdomains",
+        json={"host": "old.test", "target_url": "https://example.com/old"},
+        auth=ADMIN_AUTH,
+    ).json()
+
+    first = client.get("/", headers={"host": "old.test"}, follow_redirects=False)
+    assert first.status_code == 302
+    assert first.headers["location"] == "https://example.com/old"
+
+    client.put(
+        f"/api/subdomains/{created['id']}",
+        json={"host": "new.test", "target_url": "https://example.com/new", "code": 301},
+        auth=ADMIN_AUTH,
+    )
+
+    stale = client.get("/", headers={"host": "old.test"}, follow_redirects=False)
+    assert stale.status_code == 404
+
+    fresh = client.get("/", headers={"host": "new.test"}, follow_redirects=False)
+    assert fresh.status_code == 301
+    assert fresh.headers["location"] == "https://example.com/new"
+
+
+def test_wildcard_rules_use_longest_suffix(client: "SimpleClient") -> None:
+    for host, target in [
+        ("*.wild.test", "https://example.com/fallback"),
+        ("*.docs.wild.test", "https://docs.example.com"),
+        ("exact.docs.wild.test", "https://exact.example.com"),
+    ]:
+        created = client.post(
+            "/api/subdomains",
+            json={"host": host, "target_url": target},
+            auth=ADMIN_AUTH,
+        )
+        assert created.status_code == 201
+
+    cases = {
+        "a.wild.test": "https://example.com/fallback",
+        "a.b.wild.test": "https://example.com/fallback",
+        "v1.docs.wild.test": "https://docs.example.com",
+        "x.v1.docs.wild.test": "https://docs.example.com",
+        "exact.docs.wild.test": "https://exact.example.com",
+        "docs.wild.test": "https://example.com/fallback",
+    }
+    for host, location in cases.items():
+        response = client.get("/", headers={"host": host}, follow_redirects=False)
+        assert response.status_code == 302, host
+        assert response.headers["location"] == location, host
+
+    apex = client.get("/", headers={"host": "wild.test"}, follow_redirects=False)
+    assert apex.status_code == 404
+
+
+def test_wildcard_host_must_be_leftmost_label(client: "SimpleClient") -> None:
+    response = client.post(
+        "/api/subdomains",
+        json={"host": "docs.*.test", "target_url": "https://example.com"},
+        auth=ADMIN_AUTH,
+    )
+    assert response.status_code == 422
+
+
+def test_permanent_rule_cache_policy(client: "SimpleClient") -> None:
+    created = client.post(
+        "/api/subdomains",
+        data={
+            "host": "cached.test",
+            "target_url": "https://example.com/cached",
+            "code": "301",
+            "cache_max_age": "86400",
+            "cache_immutable": "1",
+        },
+        auth=ADMIN_AUTH,
+    )
+    assert created.status_code == 201
+    assert created.json()["cache_max_age"] == 86400
+
+    cold = client.get("/", headers={"host": "cached.test"}, follow_redirects=False)
+    warm = client.get("/", headers={"host": "cached.test"}, follow_redirects=False)
+    assert cold.headers["cache-control"] == "public, max-age=86400, immutable"
+    assert warm.headers["cache-control"] == cold.headers["cache-control"]
+
+    rejected = client.put(
+        f"/api/subdomains/{created.json()['id']}",
+        json={
+            "host": "cached.test",
+            "target_url": "https://example.com/cached",
+            "code": 302,
+            "cache_max_age": 60,
+            "cache_immutable": True,
+        },
+        auth=ADMIN_AUTH,
+    )
+    assert rejected.status_code == 422
+
+    updated = client.put(
+        f"/api/subdomains/{created.json()['id']}",
+        data={
+            "host": "cached.test",
+            "target_url": "https://example.com/cached",
+            "code": "302",
+            "cache_max_age": "",
+        },
+        auth=ADMIN_AUTH,
+    )
+    assert updated.status_code == 200
+    response = client.get("/", headers={"host": "cached.test"}, follow_redirects=False)
+    assert response.status_code == 302
+    assert response.headers.get("cache-control") is None
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from sqlalchemy import select
+
+from backend.app.cache import short_link_cache, subdomain_routes, user_cache
+from backend.app.models import DataChange, SessionLocal, ShortLink, SubdomainRedirect, User
+from backend.app.sync import (
+    ENTITY_SHORT_LINK,
+    ENTITY_SUBDOMAIN,
+    ENTITY_USER,
+    data_sync,
+    record_change,
+)
+
+ADMIN_AUTH = ("admin", "admin")
+
+
+def test_writes_record_data_changes(client: "SimpleClient") -> None:
+    data_sync.prime()
+    baseline = data_sync.version
+
+    client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/a", "code": "logged"},
+        auth=ADMIN_AUTH,
+    )
+    client.post(
+        "/api/subdomains",
+        json={"host": "logged.example.com", "target_url": "https://example.com", "code": 302},
+        auth=ADMIN_AUTH,
+    )
+
+    with SessionLocal() as session:
+        changes = session.execute(
+            select(DataChange.entity, DataChange.key)
+            .where(DataChange.id > baseline)
+            .order_by(DataChange.id)
+        ).all()
+    assert [tuple(row) for row in changes] == [
+        (ENTITY_SHORT_LINK, "logged"),
+        (ENTITY_SUBDOMAIN, "logged.example.com"),
+    ]
+
+
+def test_poll_applies_writes_from_other_workers(client: "SimpleClient") -> None:
+    client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/old", "code": "shared"},
+        auth=ADMIN_AUTH,
+    )
+    client.post(
+        "/api/subdomains",
+        json={"host": "shared.example.com", "target_url": "https://old.example.com", "code": 302},
+        auth=ADMIN_AUTH,
+    )
+    assert client.get("/shared", follow_redirects=False).headers["location"] == (
+        "https://example.com/old"
+    )
+    assert subdomain_routes.lookup("shared.example.com").target_url == "https://old.example.com"
+    data_sync.prime()
+    assert data_sync.poll() is False
+
+    # 模拟另一个 worker：直接改库并写入变更记录，不经过本进程的失效逻辑。
+    with SessionLocal() as session:
+        link = session.scalar(select(ShortLink).where(ShortLink.code == "shared"))
+        link.target_url = "https://example.com/new"
+        redirect = session.scalar(
+            select(SubdomainRedirect).where(SubdomainRedirect.host == "shared.example.com")
+        )
+        redirect.target_url = "https://new.example.com"
+        record_change(session, ENTITY_SHORT_LINK, "shared")
+        record_change(session, ENTITY_SUBDOMAIN, "shared.example.com")
+        session.commit()
+
+    assert short_link_cache.get("shared") is not None
+    assert data_sync.poll() is True
+    assert short_link_cache.get("shared", record_miss=False) is None
+    assert subdomain_routes.loaded
+    assert subdomain_routes.lookup("shared.example.com").target_url == "https://new.example.com"
+    assert client.get("/shared", follow_redirects=False).headers["location"] == (
+        "https://example.com/new"
+    )
+
+
+def test_poll_reloads_everything_after_falling_behind_retention(client: "SimpleClient") -> None:
+    data_sync.prime()
+    client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/a", "code": "first"},
+        auth=ADMIN_AUTH,
+    )
+    client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/b", "code": "second"},
+        auth=ADMIN_AUTH,
+    )
+    data_sync.prune(keep=1)
+
+    reloads = data_sync.stats()["full_reloads"]
+    assert data_sync.poll() is True
+    assert data_sync.stats()["full_reloads"] == reloads + 1
+    assert not subdomain_routes.loaded
+
+
+def test_poll_drops_cached_users_changed_elsewhere(client: "SimpleClient") -> None:
+    client.post("/admin/login", data={"username": "admin", "password": "admin"})
+    assert client.get("/admin", follow_redirects=False).status_code == 200
+    data_sync.prime()
+
+    with SessionLocal() as session:
+        admin = session.scalar(select(User).where(User.username == "admin"))
+        admin.session_version += 1
+        record_change(session, ENTITY_USER, str(admin.id))
+        session.commit()
+
+    assert client.get("/admin", follow_redirects=False).status_code == 200
+    assert data_sync.poll() is True
+    assert user_cache.stats()["size"] == 0
+    assert client.get("/admin", follow_redirects=False).status_code == 303
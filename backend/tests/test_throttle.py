@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from backend.app.throttle import SlidingWindowLimiter, auth_throttle, resolve_client_ip
+
+
+def test_sliding_window_expires_old_failures() -> None:
+    limiter = SlidingWindowLimiter(limit=3, window=60, max_keys=100, shards=4)
+    for now in (0, 10, 20):
+        limiter.hit("1.2.3.4", now=now)
+
+    assert limiter.retry_after("1.2.3.4", now=30) == 30
+    assert limiter.retry_after("1.2.3.4", now=61) == 0
+    assert limiter.retry_after("5.6.7.8", now=30) == 0
+
+
+def test_sliding_window_table_is_bounded() -> None:
+    limiter = SlidingWindowLimiter(limit=5, window=60, max_keys=8, shards=2)
+    for index in range(100):
+        limiter.hit(f"10.0.0.{index}", now=index)
+
+    stats = limiter.stats()
+    assert stats["keys"] <= 8
+    assert stats["evictions"] == 100 - stats["keys"]
+
+
+def test_failed_basic_auth_is_throttled_before_hashing(client: "SimpleClient", monkeypatch) -> None:
+    from backend.app import security
+
+    calls: list[str] = []
+    original = security.verify_password
+
+    def counting_verify(password: str, stored_hash: str) -> bool:
+        calls.append(password)
+        return original(password, stored_hash)
+
+    monkeypatch.setattr(security, "verify_password", counting_verify)
+    monkeypatch.setattr(auth_throttle.by_username, "limit", 3)
+    headers = {"x-real-ip": "203.0.113.7"}
+
+    for _ in range(3):
+        assert client.get("/api/links", auth=("admin", "nope"), headers=headers).status_code == 401
+    throttled = client.get("/api/links", auth=("admin", "admin"), headers=headers)
+    assert throttled.status_code == 429
+    assert int(throttled.headers["retry-after"]) > 0
+    assert len(calls) == 3
+
+    login = client.post(
+        "/admin/login",
+        data={"username": "admin", "password": "admin"},
+        headers=headers,
+        follow_redirects=False,
+    )
+    assert login.status_code == 429
+    assert "登录失败次数过多" in login.text
+    assert auth_throttle.stats()["username"]["blocked"] >= 2
+
+
+def test_username_limit_does_not_lock_out_other_clients(client: "SimpleClient", monkeypatch) -> None:
+    monkeypatch.setattr(auth_throttle.by_username, "limit", 3)
+    attacker = {"x-real-ip": "203.0.113.8"}
+    for _ in range(3):
+        assert client.get("/api/links", auth=("admin", "nope"), headers=attacker).status_code == 401
+    assert client.get("/api/links", auth=("admin", "admin"), headers=attacker).status_code == 429
+
+    owner = client.get("/api/links", auth=("admin", "admin"), headers={"x-real-ip": "198.51.100.1"})
+    assert owner.status_code == 200
+
+
+def test_forwarded_headers_are_only_trusted_from_proxies(client: "SimpleClient", monkeypatch) -> None:
+    assert resolve_client_ip("203.0.113.9", "1.1.1.1", "2.2.2.2") == "203.0.113.9"
+    assert resolve_client_ip("127.0.0.1", " 198.51.100.4 ", None) == "198.51.100.4"
+    # 最左侧的值可由客户端伪造，取最右侧不受信任的一跳。
+    assert resolve_client_ip("127.0.0.1", None, "6.6.6.6, 198.51.100.5, 127.0.0.1") == "198.51.100.5"
+    assert resolve_client_ip("127.0.0.1", None, None) == "127.0.0.1"
+
+    monkeypatch.setattr(auth_throttle.by_ip, "limit", 3)
+    direct = type(client)(client=("203.0.113.9", 4321))
+    for index in range(3):
+        headers = {"x-real-ip": f"10.9.0.{index}"}
+        assert direct.get("/api/links", auth=(f"nobody{index}", "nope"), headers=headers).status_code == 401
+    rotated = direct.get("/api/links", auth=("nobody9", "nope"), headers={"x-real-ip": "10.9.0.99"})
+    assert rotated.status_code == 429
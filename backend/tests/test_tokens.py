@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from backend.app.models import ApiToken, SessionLocal
+from backend.app.tokens import token_usage
+
+ADMIN_AUTH = ("admin", "admin")
+
+
+def _bearer(token: str) -> dict[str, str]:
+    return {"authorization": f"Bearer {token}"}
+
+
+def test_bearer_token_authenticates_without_password(client: "SimpleClient") -> None:
+    created = client.post(
+        "/api/tokens", json={"name": "ci", "expires_in_days": 7}, auth=ADMIN_AUTH
+    )
+    assert created.status_code == 201
+    body = created.json()
+    assert body["token"].startswith("ytl_")
+    assert body["scopes"] == ["read", "write"]
+
+    with SessionLocal() as session:
+        stored = session.scalar(select(ApiToken).where(ApiToken.id == body["id"]))
+        assert stored.token_hash != body["token"]
+        assert len(stored.token_hash) == 64
+
+    link = client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/ci", "code": "ci"},
+        headers=_bearer(body["token"]),
+    )
+    assert link.status_code == 201
+    assert link.json()["owner_username"] == "admin"
+
+    assert token_usage.stats()["pending"] == 1
+    listing = client.get("/api/tokens", auth=ADMIN_AUTH).json()
+    assert "token" not in listing[0]
+    assert listing[0]["last_used_at"] is not None
+    # 列表只叠加内存中的使用时间，写回由后台线程负责。
+    assert token_usage.stats()["pending"] == 1
+    with SessionLocal() as session:
+        assert session.get(ApiToken, body["id"]).last_used_at is None
+
+
+def test_read_only_and_revoked_tokens(client: "SimpleClient") -> None:
+    token = client.post(
+        "/api/tokens", data={"name": "reporting", "scopes": "read"}, auth=ADMIN_AUTH
+    ).json()
+
+    assert client.get("/api/links", headers=_bearer(token["token"])).status_code == 200
+    denied = client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/x"},
+        headers=_bearer(token["token"]),
+    )
+    assert denied.status_code == 403
+    assert client.post(
+        "/api/tokens", json={"name": "nested"}, headers=_bearer(token["token"])
+    ).status_code == 403
+
+    assert client.delete(f"/api/tokens/{token['id']}", auth=ADMIN_AUTH).status_code == 204
+    revoked = client.get("/api/links", headers=_bearer(token["token"]))
+    assert revoked.status_code == 401
+    assert revoked.headers["www-authenticate"] == "Bearer"
+
+
+def test_expired_tokens_are_rejected(client: "SimpleClient") -> None:
+    token = client.post("/api/tokens", json={"name": "old"}, auth=ADMIN_AUTH).json()
+    with SessionLocal() as session:
+        stored = session.get(ApiToken, token["id"])
+        stored.expires_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+        session.commit()
+
+    assert client.get("/api/links", headers=_bearer(token["token"])).status_code == 401
+    assert client.get("/api/links", headers=_bearer("ytl_unknown")).status_code == 401
+
+
+def test_token_lookup_loads_owner_in_one_query(client: "SimpleClient") -> None:
+    from sqlalchemy import event
+
+    from backend.app.models import engine
+    from backend.app.tokens import find_token
+
+    token = client.post("/api/tokens", json={"name": "joined"}, auth=ADMIN_AUTH).json()["token"]
+    statements: list[str] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement)
+
+    with SessionLocal() as session:
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            record = find_token(session, token)
+            assert record is not None and record.owner.username == "admin"
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+    assert len(statements) == 1
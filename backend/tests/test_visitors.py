@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from sqlalchemy import func, select
+
+from backend.app.models import SessionLocal, VisitorSketch
+from backend.app.visitors import (
+    REGISTER_COUNT,
+    VisitorSketches,
+    add_hash,
+    encode_registers,
+    estimate,
+    merge,
+    visitor_hash,
+)
+
+ADMIN_AUTH = ("admin", "admin")
+
+
+def test_estimate_is_close_and_mergeable() -> None:
+    whole = bytearray(REGISTER_COUNT)
+    halves = [bytearray(REGISTER_COUNT), bytearray(REGISTER_COUNT)]
+    for index in range(20000):
+        value = visitor_hash(f"10.1.{index // 256}.{index % 256}", "Mozilla/5.0")
+        add_hash(whole, value)
+        add_hash(halves[index % 2], value)
+
+    assert abs(estimate(whole) - 20000) < 20000 * 0.05
+    merge(halves[0], halves[1])
+    assert halves[0] == whole
+    assert len(encode_registers(whole)) <= REGISTER_COUNT
+
+    few = bytearray(REGISTER_COUNT)
+    for index in range(3):
+        add_hash(few, visitor_hash(f"192.0.2.{index}", None))
+    assert estimate(few) == 3
+    assert len(encode_registers(few)) < 100
+
+
+def test_redirects_count_distinct_visitors(client: "SimpleClient") -> None:
+    created = client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/uniq", "code": "uniq"},
+        auth=ADMIN_AUTH,
+    ).json()
+    visits = [
+        {"X-Real-IP": "198.51.100.1", "User-Agent": "a"},
+        {"X-Real-IP": "198.51.100.1", "User-Agent": "a"},
+        {"X-Real-IP": "198.51.100.1", "User-Agent": "b"},
+        {"X-Forwarded-For": "198.51.100.2, 10.0.0.1", "User-Agent": "a"},
+        {"X-Real-IP": "198.51.100.3", "User-Agent": "a"},
+    ]
+    for headers in visits:
+        assert client.get("/uniq", headers=headers, follow_redirects=False).status_code == 302
+
+    stats = client.get(f"/api/links/{created['id']}/visitors?days=7", auth=ADMIN_AUTH).json()
+    assert stats["total"] == 4
+    assert stats["window_uniques"] == 4
+    assert len(stats["days"]) == 7
+    assert [day["uniques"] for day in stats["days"]] == [0, 0, 0, 0, 0, 0, 4]
+    # 统计读取只叠加内存草图，不写回数据库。
+    with SessionLocal() as session:
+        assert session.scalar(select(func.count()).select_from(VisitorSketch)) == 0
+
+
+def test_workers_merge_sketches_without_double_counting(client: "SimpleClient") -> None:
+    created = client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/merged", "code": "merged"},
+        auth=ADMIN_AUTH,
+    ).json()
+    first, second = VisitorSketches(60, 1000), VisitorSketches(60, 1000)
+    for index in range(10):
+        first.record(created["id"], f"203.0.113.{index}", "ua")
+    for index in range(5, 15):
+        second.record(created["id"], f"203.0.113.{index}", "ua")
+    assert first.flush() == 2
+    assert second.flush() == 2
+
+    stats = client.get(f"/api/links/{created['id']}/visitors?days=1", auth=ADMIN_AUTH).json()
+    assert stats["total"] == 15
+    assert stats["days"][0]["uniques"] == 15
+
+    assert client.delete(f"/api/links/{created['id']}", auth=ADMIN_AUTH).status_code == 204
+    with SessionLocal() as session:
+        assert session.scalar(select(func.count()).select_from(VisitorSketch)) == 0
+
+
+def test_concurrent_flushes_do_not_lose_registers(client: "SimpleClient", monkeypatch) -> None:
+    import threading
+
+    from backend.app import visitors
+
+    created = client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/racing", "code": "racing"},
+        auth=ADMIN_AUTH,
+    ).json()
+    seed, first, second = (VisitorSketches(60, 1000) for _ in range(3))
+    seed.record(created["id"], "198.51.100.1", "ua")
+    seed.flush()
+    for index in range(10):
+        first.record(created["id"], f"203.0.113.{index}", "ua")
+    for index in range(10, 20):
+        second.record(created["id"], f"203.0.113.{index}", "ua")
+
+    # 第一个 worker 读到旧草图后、写回之前，让第二个 worker 尝试完成一次写回。
+    original = visitors.decode_registers
+    racer = threading.Thread(target=second.flush)
+
+    def interleaved(blob: bytes) -> bytearray:
+        if not racer.is_alive() and racer.ident is None:
+            racer.start()
+            racer.join(timeout=0.5)
+        return original(blob)
+
+    monkeypatch.setattr(visitors, "decode_registers", interleaved)
+    first.flush()
+    racer.join()
+
+    assert first.stats()["failed_flushes"] == second.stats()["failed_flushes"] == 0
+    stats = client.get(f"/api/links/{created['id']}/visitors?days=1", auth=ADMIN_AUTH).json()
+    assert stats["total"] == 21
+
+
+def test_deleting_a_link_drops_its_pending_sketches(client: "SimpleClient") -> None:
+    from backend.app.visitors import visitor_sketches
+
+    created = client.post(
+        "/api/links",
+        json={"target_url": "https://example.com/forgotten", "code": "forgotten"},
+        auth=ADMIN_AUTH,
+    ).json()
+    client.get("/forgotten", headers={"User-Agent": "a"}, follow_redirects=False)
+    assert visitor_sketches.stats()["pending"] == 1
+
+    assert client.delete(f"/api/links/{created['id']}", auth=ADMIN_AUTH).status_code == 204
+    assert visitor_sketches.flush() == 0
+    with SessionLocal() as session:
+        assert session.scalar(select(func.count()).select_from(VisitorSketch)) == 0
@@ -0,0 +1,29 @@
+#!/bin/sh
+set -eu
+
+# 轮询后端生成的子域跳转 map，变化后先 `nginx -t` 校验再平滑重载。
+MAP_DIR="${YETLA_MAP_DIR:-/etc/nginx/yetla}"
+INTERVAL="${YETLA_MAP_POLL_INTERVAL:-5}"
+
+snapshot() {
+    stat -c '%n %Y %s' "$MAP_DIR"/*.map 2>/dev/null | md5sum
+}
+
+watch_maps() {
+    last="$(snapshot)"
+    while sleep "$INTERVAL"; do
+        current="$(snapshot)"
+        if [ "$current" = "$last" ]; then
+            continue
+        fi
+        last="$current"
+        if nginx -t -q; then
+            nginx -s reload
+            echo "[entrypoint] 子域跳转 map 已更新，Nginx 已重载"
+        else
+            echo "[entrypoint] 子域跳转 map 校验失败，保留当前配置" >&2
+        fi
+    done
+}
+
+watch_maps &